@@ -0,0 +1,174 @@
+"""
+    Flat form of the AST, every node and token is a row of parallel arrays
+"""
+from array import array
+from dataclasses import fields
+from typing import Dict, List, Tuple
+
+from lexer import Token, TOKEN_TYPES
+from parser import (
+        AST_COUNT, BinOp, UnaryOp, Integer, Void, SetVariable, Variable, Block,
+        Program, Bool, Condition, Flow, FunctionDecl, FunctionCall,
+        ReturnStatement, While, String, ListLiteral, Index,
+        )
+
+# What each field of the nodes holds
+NODE = "node"
+NODES = "nodes"
+TOKEN = "token"
+TOKENS = "tokens"
+# The order of the classes is the kind of the node in the arena
+SCHEMA: Dict[type, Tuple[str, ...]] = {
+        BinOp: (NODE, TOKEN, NODE),
+        UnaryOp: (TOKEN, NODE),
+        Integer: (TOKEN,),
+        Void: (),
+        SetVariable: (TOKEN, NODE),
+        Variable: (TOKEN,),
+        Block: (NODES,),
+        Program: (NODES,),
+        Bool: (TOKEN,),
+        Condition: (NODE, NODE),
+        Flow: (NODE, NODES, NODE),
+        FunctionDecl: (TOKEN, TOKENS, NODE),
+        FunctionCall: (TOKEN, NODES),
+        ReturnStatement: (NODE,),
+        While: (NODE, NODE),
+        String: (TOKEN,),
+        ListLiteral: (TOKEN, NODES),
+        Index: (NODE, NODE),
+    }
+NODE_TYPES = list(SCHEMA)
+NODE_KINDS = {node_type: kind for kind, node_type in enumerate(NODE_TYPES)}
+# AST itself is never in a tree
+assert len(SCHEMA) == AST_COUNT - 1, "You forgot to flatten an AST"
+# Positions are unsigned, tokens without a position use this
+NO_POSITION = 0xFFFFFFFF
+
+
+class Arena:
+    """
+        A whole program as parallel arrays, node i has kind kinds[i] and its
+        fields are operands[starts[i]:starts[i + 1]]
+        Node fields are node indexes, token fields are token indexes and
+        lists are their length followed by their items
+        Token j has type token_types[j], position token_positions[j] and
+        value literals[token_values[j]], equal values are saved once
+        The root is the last node
+    """
+    def __init__(self):
+        self.kinds = array("B")
+        self.starts = array("I", [0])
+        self.operands = array("I")
+        self.token_types = array("B")
+        self.token_positions = array("I")
+        self.token_values = array("I")
+        self.literals: List = list()
+        self.literal_indexes: Dict = dict()
+
+    def __len__(self):
+        return len(self.kinds)
+
+    @classmethod
+    def from_program(cls, program: Program) -> "Arena":
+        """
+            Returns the arena of the program
+        """
+        arena = cls()
+        arena.add_node(program)
+        return arena
+
+    def add_token(self, token: Token) -> int:
+        """
+            Append a token and return its index
+        """
+        value = token.token_value
+        # The type is part of the key so 1, True and "1" are different
+        key = (type(value), value)
+        literal = self.literal_indexes.get(key)
+        if literal is None:
+            literal = len(self.literals)
+            self.literal_indexes[key] = literal
+            self.literals.append(value)
+        position = token.position
+        self.token_types.append(token.token_type.value)
+        self.token_positions.append(
+                NO_POSITION if position is None else position)
+        self.token_values.append(literal)
+        return len(self.token_types) - 1
+
+    def add_node(self, ast) -> int:
+        """
+            Append the children of the AST, then the AST and return its index
+        """
+        node_type = type(ast)
+        operands = list()
+        for field, attribute in zip(SCHEMA[node_type], fields(ast)):
+            value = getattr(ast, attribute.name)
+            if field == NODE:
+                operands.append(self.add_node(value))
+            elif field == TOKEN:
+                operands.append(self.add_token(value))
+            elif field == NODES:
+                operands.append(len(value))
+                operands.extend(self.add_node(child) for child in value)
+            else:
+                operands.append(len(value))
+                operands.extend(self.add_token(token) for token in value)
+        self.kinds.append(NODE_KINDS[node_type])
+        self.operands.extend(operands)
+        self.starts.append(len(self.operands))
+        return len(self.kinds) - 1
+
+    def token(self, index) -> Token:
+        """
+            Returns a new Token for the token at index
+        """
+        position = self.token_positions[index]
+        return Token(TOKEN_TYPES[self.token_types[index]],
+                     self.literals[self.token_values[index]],
+                     None if position == NO_POSITION else position)
+
+    def to_program(self) -> Program:
+        """
+            Returns the tree of the arena for the engines
+            The children come before their parents so every node is built
+            once in a single pass
+        """
+        nodes = list()
+        operands = self.operands
+        starts = self.starts
+        token = self.token
+        for index, kind in enumerate(self.kinds):
+            node_type = NODE_TYPES[kind]
+            cursor = starts[index]
+            values = list()
+            for field in SCHEMA[node_type]:
+                operand = operands[cursor]
+                cursor += 1
+                if field == NODE:
+                    values.append(nodes[operand])
+                elif field == TOKEN:
+                    values.append(token(operand))
+                elif field == NODES:
+                    values.append([nodes[child]
+                                   for child in operands[cursor:cursor + operand]])
+                    cursor += operand
+                else:
+                    values.append([token(child)
+                                   for child in operands[cursor:cursor + operand]])
+                    cursor += operand
+            nodes.append(node_type(*values))
+        return nodes[-1]
+
+    def nbytes(self) -> int:
+        """
+            Returns the size of the arrays in bytes, literals are not counted
+        """
+        return sum(
+                len(values) * values.itemsize
+                for values in (self.kinds, self.starts, self.operands,
+                               self.token_types, self.token_positions,
+                               self.token_values)
+                )
+
@@ -0,0 +1,70 @@
+"""
+    Bulk operations on lists for the built-in functions
+
+    Every operation runs over the whole list in C with the python builtins,
+    a loop of the program would run every item through the engine
+    Lists are never changed, the operations return new lists
+"""
+import operator
+from itertools import repeat
+
+
+def check_list(name, value):
+    """
+        Raise if the value is not a list
+    """
+    if not isinstance(value, list):
+        raise Exception(f"{name} takes a list but {value!r} was given")
+
+
+def total(values):
+    """
+        Returns the sum of the list
+    """
+    check_list("sum", values)
+    return sum(values)
+
+
+def elementwise(name, operation, left, right):
+    """
+        Returns the operation of every item of left with the item of right
+        at the same index, a right that is not a list is used for every
+        item
+    """
+    check_list(name, left)
+    if isinstance(right, list):
+        if len(right) != len(left):
+            raise Exception(f"{name} takes lists of the same length but"
+                            f" {len(left)} and {len(right)} were given")
+    else:
+        right = repeat(right, len(left))
+    return list(map(operation, left, right))
+
+
+def add_each(left, right):
+    """
+        Returns the sums of the items
+    """
+    return elementwise("addeach", operator.add, left, right)
+
+
+def mul_each(left, right):
+    """
+        Returns the products of the items
+    """
+    return elementwise("muleach", operator.mul, left, right)
+
+
+def sort(values):
+    """
+        Returns a sorted copy of the list
+    """
+    check_list("sort", values)
+    return sorted(values)
+
+
+def make_range(*arguments):
+    """
+        Returns the list of the integers of range(*arguments)
+    """
+    return list(range(*arguments))
@@ -0,0 +1,103 @@
+"""
+    Run many programs in one go
+
+    The programs are spread over a pool of processes that import the
+    engine once, the output of every program is captured and returned
+    with its exit status and the time it took
+"""
+import gc
+import io
+import sys
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stderr, redirect_stdout
+from dataclasses import dataclass
+from time import perf_counter
+from typing import Iterable, Iterator, List
+
+
+@dataclass
+class Result:
+    """
+        Output of a program, status is 0 when it ran without errors
+    """
+    path: str
+    status: int
+    stdout: str
+    stderr: str
+    seconds: float
+
+
+def load(engine):
+    """
+        Import the engine before the first program of a worker
+    """
+    # pylint: disable=import-outside-toplevel
+    from main import load_engine
+    load_engine(engine)
+
+
+def run_file(path, options) -> Result:
+    """
+        Run the file with the keyword arguments of parse_interpret_file
+        and capture what it writes
+    """
+    # pylint: disable=import-outside-toplevel
+    from main import parse_interpret_file
+    stdout = io.StringIO()
+    stderr = io.StringIO()
+    status = 0
+    start = perf_counter()
+    with redirect_stdout(stdout), redirect_stderr(stderr):
+        try:
+            parse_interpret_file(path, **options)
+        except SystemExit as error:
+            status = error.code if isinstance(error.code, int) else 1
+        except Exception:  # pylint: disable=broad-except
+            traceback.print_exc()
+            status = 1
+        finally:
+            # run_program freezes what the program leaves, the next
+            # program of the worker doesn't need it
+            gc.unfreeze()
+    seconds = perf_counter() - start
+    return Result(path, status, stdout.getvalue(), stderr.getvalue(), seconds)
+
+
+def run_files(paths: List[str], jobs=None, **options) -> Iterator[Result]:
+    """
+        Yields the results in the order of the paths
+        One job runs the files in this process
+    """
+    engine = options.get("engine", "walker")
+    if jobs == 1:
+        load(engine)
+        for path in paths:
+            yield run_file(path, options)
+        return
+    with ProcessPoolExecutor(max_workers=jobs, initializer=load,
+                             initargs=(engine,)) as executor:
+        yield from executor.map(run_file, paths,
+                                [options] * len(paths), chunksize=1)
+
+
+def report(results: Iterable[Result]) -> int:
+    """
+        Write the output of every result as it comes and a summary
+        Returns the exit status of the batch, 1 when a program failed
+    """
+    count = failed = 0
+    total = 0.0
+    for result in results:
+        sys.stdout.write(result.stdout)
+        sys.stdout.flush()
+        sys.stderr.write(result.stderr)
+        print(f"{result.path}: exit {result.status} in"
+              f" {result.seconds:.3f}s", file=sys.stderr)
+        count += 1
+        total += result.seconds
+        if result.status != 0:
+            failed += 1
+    print(f"{count} programs, {failed} failed, {total:.3f}s",
+          file=sys.stderr)
+    return 1 if failed else 0
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""
+    Benchmark runner
+
+    Times lexing, parsing and running every workload on every engine,
+    writes the results as json and compares them with a saved baseline
+    The exit code is 1 when a median is slower than the baseline by more
+    than the threshold
+
+    python benchmarks/run.py --save-baseline    # before a change
+    python benchmarks/run.py --output new.json  # after it
+"""
+import os
+import sys
+import gc
+import json
+import argparse
+import platform
+import statistics
+from contextlib import redirect_stdout
+from time import perf_counter
+
+DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(DIRECTORY))
+
+# pylint: disable=wrong-import-position
+from lexer import Lexer
+from parser import Parser
+from main import ENGINES, load_engine
+
+BASELINE = os.path.join(DIRECTORY, "baseline.json")
+DEFAULT_REPEAT = 5
+DEFAULT_THRESHOLD = 0.10
+# Stages that take less than this are too noisy to compare
+MIN_TIME = 0.005
+# Every call of the walker takes many python frames so its stack runs out
+# on the recursion workload, closure and python run out on deeper ones
+ALL_ENGINES = tuple(ENGINES)
+WORKLOADS = {
+        "fib_loop": ("fib_loop.sg", ALL_ENGINES),
+        "recursion": ("recursion.sg", ("vm", "closure", "python")),
+        "strings": ("strings.sg", ALL_ENGINES),
+        "elseif_chain": ("elseif_chain.sg", ALL_ENGINES),
+        "generated": (None, ALL_ENGINES),
+        }
+STAGES = ("lex", "parse", "run")
+
+
+def generate_source(functions=1000) -> str:
+    """
+        Returns a large program for the throughput of the lexer and the
+        parser, running it is cheap
+    """
+    lines = list()
+    for number in range(functions):
+        lines.append(f"func f{number}(a, b) {{")
+        lines.append("    var c = (b - 3) / 7")
+        lines.append(f"    var c = a * {number} + c")
+        lines.append(f"    if c > {number} {{")
+        lines.append(f'        var d = "function {number}"')
+        lines.append("    } elseif c == 0 {")
+        lines.append("        var c = c + 1")
+        lines.append("    } else {")
+        lines.append("        var c = 0 - c")
+        lines.append("    }")
+        lines.append("    return c")
+        lines.append("}")
+        lines.append(f"var v{number} = f{number}({number}, 2)")
+    return "\n".join(lines) + "\n"
+
+
+def read_workload(name) -> str:
+    """
+        Returns the source of the workload
+    """
+    filename, _ = WORKLOADS[name]
+    if filename is None:
+        return generate_source()
+    with open(os.path.join(DIRECTORY, filename)) as file:
+        return file.read()
+
+
+def time_once(text, engine):
+    """
+        Returns the seconds each stage took
+    """
+    gc.collect()
+    start = perf_counter()
+    tokens = list(Lexer(text))
+    lexed = perf_counter()
+    program = Parser(tokens).parse()
+    parsed = perf_counter()
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        load_engine(engine)(program).interpret()
+    ran = perf_counter()
+    return {"lex": lexed - start, "parse": parsed - lexed, "run": ran - parsed}
+
+
+def summarize(times):
+    """
+        Returns the statistics of the times of a stage
+    """
+    return {
+            "min": min(times),
+            "median": statistics.median(times),
+            "mean": statistics.mean(times),
+            "stdev": statistics.stdev(times) if len(times) > 1 else 0.0,
+            "times": times,
+            }
+
+
+def run_benchmarks(workloads, engines, repeat):
+    """
+        Returns the statistics of every stage of every workload and engine
+    """
+    results = dict()
+    for name in workloads:
+        text = read_workload(name)
+        _, supported = WORKLOADS[name]
+        for engine in engines:
+            if engine not in supported:
+                continue
+            # The first run warms up the caches and is not counted
+            time_once(text, engine)
+            runs = [time_once(text, engine) for _ in range(repeat)]
+            results[f"{name}/{engine}"] = {
+                    stage: summarize([times[stage] for times in runs])
+                    for stage in STAGES
+                    }
+            print(f"{name + '/' + engine:<24}", " ".join(
+                f"{stage} {results[f'{name}/{engine}'][stage]['median']:.4f}s"
+                for stage in STAGES
+                ), file=sys.stderr)
+    return results
+
+
+def compare(results, baseline, threshold):
+    """
+        Returns the lines of the stages that are slower than the baseline
+    """
+    regressions = list()
+    for key, stages in results.items():
+        if key not in baseline:
+            continue
+        for stage in STAGES:
+            old = baseline[key][stage]["median"]
+            new = stages[stage]["median"]
+            if old >= MIN_TIME and new > old * (1 + threshold):
+                regressions.append(f"{key} {stage}: {old:.4f}s -> {new:.4f}s"
+                                   f" ({new / old - 1:+.1%})")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--workloads",\
+            help="Comma separated workloads, choices: " + ", ".join(WORKLOADS))
+    parser.add_argument("--engines",\
+            help="Comma separated engines, choices: " + ", ".join(ENGINES))
+    parser.add_argument("--repeat",\
+            help="How many times every benchmark is timed",\
+            type=int,\
+            default=DEFAULT_REPEAT)
+    parser.add_argument("--output",\
+            help="File to write the results to")
+    parser.add_argument("--baseline",\
+            help="Results to compare with",\
+            default=BASELINE)
+    parser.add_argument("--threshold",\
+            help="Allowed slowdown of a median, 0.1 is 10%%",\
+            type=float,\
+            default=DEFAULT_THRESHOLD)
+    parser.add_argument("--save-baseline",\
+            help="Write the results to the baseline instead of comparing",\
+            action="store_true")
+    args = parser.parse_args()
+    workloads = args.workloads.split(",") if args.workloads else WORKLOADS
+    engines = args.engines.split(",") if args.engines else ENGINES
+
+    results = {
+            "python": platform.python_version(),
+            "repeat": args.repeat,
+            "benchmarks": run_benchmarks(workloads, engines, args.repeat),
+            }
+    if args.output is not None:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=4)
+    if args.save_baseline:
+        with open(args.baseline, "w") as file:
+            json.dump(results, file, indent=4)
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"There's no baseline at {args.baseline}", file=sys.stderr)
+        return 0
+    with open(args.baseline) as file:
+        baseline = json.load(file)
+    regressions = compare(results["benchmarks"], baseline["benchmarks"],
+                          args.threshold)
+    for regression in regressions:
+        print("Slower:", regression, file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+"""
+    Cache of parsed programs on disk, like __pycache__ for python
+    An entry is the arena of the optimized program and is used only if
+    the source, the passes and the cache version are the same
+"""
+import os
+import sys
+import marshal
+import hashlib
+from array import array
+from typing import Optional
+
+from arena import Arena
+from parser import Program
+import logs
+
+CACHE_DIRECTORY = "__sgcache__"
+SUFFIX = ".sgc"
+# Change it whenever the AST or the arena changes
+VERSION = 2
+ARRAYS = ("kinds", "starts", "operands",
+          "token_types", "token_positions", "token_values")
+
+
+def cache_key(text, passes=()) -> str:
+    """
+        Returns the hash of the source, the passes and the cache version
+        text is a str or the utf-8 bytes of the source, positions are
+        character offsets in one and byte offsets in the other so they
+        have different keys
+    """
+    mode = "str" if isinstance(text, str) else "bytes"
+    digest = hashlib.sha256()
+    digest.update(f"sagu {VERSION} {sys.byteorder} {mode}"
+                  f" {','.join(passes)}\0".encode())
+    if isinstance(text, str):
+        text = text.encode()
+    digest.update(text)
+    return digest.hexdigest()
+
+
+def cache_path(source_path, passes=(), directory=None) -> str:
+    """
+        Returns the path of the cache file of the source
+        The directory is __sgcache__ next to the source by default, every
+        list of passes has its own file
+    """
+    if directory is None:
+        directory = os.path.join(os.path.dirname(source_path), CACHE_DIRECTORY)
+    name = os.path.basename(source_path)
+    name = f"{name}.sagu-{VERSION}"
+    if passes:
+        tag = hashlib.sha256(",".join(passes).encode()).hexdigest()[:8]
+        name = f"{name}.opt-{tag}"
+    return os.path.join(directory, name + SUFFIX)
+
+
+def load(path, key) -> Optional[Program]:
+    """
+        Returns the program of the cache file or None if the file is
+        missing, broken or has another key
+    """
+    try:
+        with open(path, "rb") as file:
+            data = marshal.load(file)
+        version, entry_key, buffers, literals = data
+    except (OSError, EOFError, ValueError, TypeError):
+        return None
+    if version != VERSION or entry_key != key:
+        logs.trace("cache", "info", lambda: f"Cache {path} is stale")
+        return None
+    arena = Arena()
+    for name, buffer in zip(ARRAYS, buffers):
+        values = array(getattr(arena, name).typecode)
+        values.frombytes(buffer)
+        setattr(arena, name, values)
+    arena.literals = literals
+    logs.trace("cache", "info", lambda: f"Loaded the program from {path}")
+    return arena.to_program()
+
+
+def store(path, key, program) -> None:
+    """
+        Write the program to the cache file
+        Failing to write only means the next run parses again
+    """
+    arena = Arena.from_program(program)
+    buffers = tuple(getattr(arena, name).tobytes() for name in ARRAYS)
+    data = (VERSION, key, buffers, arena.literals)
+    temporary = f"{path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(temporary, "wb") as file:
+            marshal.dump(data, file)
+        # Readers see either the old file or the whole new one
+        os.replace(temporary, path)
+    except OSError as error:
+        logs.trace("cache", "error",
+                   lambda: f"Couldn't write the cache {path}: {error}")
+        try:
+            os.remove(temporary)
+        except OSError:
+            pass
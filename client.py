@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+    Thin client of the server, runs a file like main.py does but on a
+    warm server
+
+    client.py SOCKET FILE [OPTIONS]
+
+    The options are the ones of main.py that change how the program runs:
+    --engine, -O, --passes, --memo-size, --max-steps and --timeout, the
+    cache options are accepted and ignored
+    The stdin of the client is the stdin of the program when it is not a
+    terminal, the exit status is the status of the program
+    It only imports what talking to the server needs so it starts fast
+"""
+import os
+import sys
+import json
+import socket
+from typing import List, Tuple
+
+# Options of main.py, the request key of each and the type of its value
+OPTIONS = {
+        "--engine": ("engine", str),
+        "-O": ("optimization", int),
+        "--passes": ("passes",
+                     lambda value: [name for name in value.split(",") if name]),
+        "--memo-size": ("memo_size", int),
+        "--max-steps": ("max_steps", int),
+        "--timeout": ("timeout", float),
+        }
+# Options of main.py that don't matter to the server, it keeps the parsed
+# programs in memory
+IGNORED_FLAGS = {"--no-cache", "--mmap"}
+IGNORED_OPTIONS = {"--cache-dir"}
+
+
+def request(path, payload) -> dict:
+    """
+        Send the request to the server at path and returns its response
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.connect(path)
+        connection.sendall(json.dumps(payload).encode() + b"\n")
+        connection.shutdown(socket.SHUT_WR)
+        with connection.makefile("rb") as response:
+            return json.loads(response.readline())
+
+
+def parse_arguments(arguments) -> Tuple[dict, List[str]]:
+    """
+        Returns the request of the options and the other arguments
+        Options are written like main.py takes them, --name value,
+        --name=value and -O2
+    """
+    payload = dict()
+    positional = list()
+    arguments = iter(arguments)
+    for argument in arguments:
+        name, equals, value = argument.partition("=")
+        if argument.startswith("-O") and argument != "-O":
+            name, equals, value = "-O", "=", argument[2:]
+        if name in IGNORED_FLAGS and not equals:
+            continue
+        if name not in OPTIONS and name not in IGNORED_OPTIONS:
+            if argument.startswith("-"):
+                raise ValueError(f"Unknown option {argument}")
+            positional.append(argument)
+            continue
+        if not equals:
+            value = next(arguments, None)
+            if value is None:
+                raise ValueError(f"{name} needs a value")
+        if name in OPTIONS:
+            key, convert = OPTIONS[name]
+            payload[key] = convert(value)
+    return payload, positional
+
+
+def main() -> int:
+    try:
+        payload, arguments = parse_arguments(sys.argv[1:])
+    except ValueError as error:
+        print(f"{error}\n{__doc__}", file=sys.stderr)
+        return 2
+    if len(arguments) != 2:
+        print(__doc__, file=sys.stderr)
+        return 2
+    socket_path, file_path = arguments
+    # The server may run in another directory
+    payload["path"] = os.path.abspath(file_path)
+    if not sys.stdin.isatty():
+        payload["stdin"] = sys.stdin.read()
+    response = request(socket_path, payload)
+    sys.stdout.write(response["stdout"])
+    sys.stderr.write(response["stderr"])
+    return response["status"]
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,432 @@
+"""
+    Compile the parsed program into nested python closures
+
+    Every AST node becomes a function that takes the variable slots of the
+    running scope, the operators, the children and the slots are resolved
+    once while compiling so running the program is a single call
+"""
+from parser import AST_COUNT, Bool
+from lexer import TokenType
+from interpreter import BUILT_IN_FUNCTIONS, Declarations
+from resolver import UNDEFINED, resolve
+from strings import StringBuilder, concat
+from memo import Memo, DEFAULT_MEMO_SIZE, find_pure_functions
+import logs
+
+# pylint: disable=invalid-name
+# pylint: disable=unnecessary-lambda-assignment
+# The returned value is kept in a slot after the variables of the scope
+RETURN_SLOT = -1
+# The Declarations of the running call are kept before it
+DECLARATIONS_SLOT = -2
+
+
+def do_nothing(variables):
+    """
+        Compiled form of the empty statements
+    """
+
+
+def run_if(condition, block):
+    """
+        Returns the closure that runs the compiled block when the compiled
+        condition is true
+    """
+    def run_condition(variables):
+        if condition(variables):
+            block(variables)
+    return run_condition
+
+
+# ClosureCompiler
+assert AST_COUNT == 19, "You've forgotten to compile an AST into a closure"
+
+
+class ClosureCompiler:
+    """
+        Turns every AST into a closure, functions that are declared
+        while running are saved into the Declarations of their call, the
+        ones of the program into functions
+        With a budget the loops count a step for every iteration and the
+        function bodies a step for every call
+    """
+    def __init__(self, functions, resolution, scope, pure=(), memo=None,
+                 budget=None):
+        self.functions = functions
+        self.budget = budget
+        self.resolution = resolution
+        # Calls of the pure functions go through the caches of memo
+        self.pure = pure if memo is not None else ()
+        self.memo = memo
+        # Scope of the AST that is being compiled
+        self.scope = scope
+        # If the function that is being compiled declares functions
+        self.declares = False
+
+    def error(self, text):
+        """
+            Raise Error
+        """
+        raise Exception(text)
+
+    def compile(self, ast):
+        """
+            Compile the AST with the related compile_ method
+        """
+        func = getattr(self, "compile_" + type(ast).__name__)
+        return func(ast)
+
+    def compile_statements(self, ast_list):
+        """
+            Compile a list of statements into a single closure
+        """
+        statements = tuple(self.compile(ast) for ast in ast_list)
+        if not statements:
+            return do_nothing
+        if len(statements) == 1:
+            return statements[0]
+
+        def run_statements(variables):
+            for statement in statements:
+                statement(variables)
+        return run_statements
+
+    def compile_Program(self, ast):
+        """
+            Compile Program AST
+        """
+        return self.compile_statements(ast.ast_list)
+
+    def compile_Block(self, ast):
+        """
+            Compile Block AST
+        """
+        return self.compile_statements(ast.ast_list)
+
+    def compile_Void(self, ast):
+        """
+            Compile Void AST
+        """
+        return do_nothing
+
+    def compile_Integer(self, ast):
+        """
+            Compile Integer AST
+        """
+        value = ast.token.token_value
+        return lambda variables: value
+
+    def compile_String(self, ast):
+        """
+            Compile String AST
+        """
+        value = ast.token.token_value
+        return lambda variables: value
+
+    def compile_ListLiteral(self, ast):
+        """
+            Compile ListLiteral AST
+        """
+        elements = tuple(self.compile(element) for element in ast.elements)
+        return lambda variables: [element(variables) for element in elements]
+
+    def compile_Index(self, ast):
+        """
+            Compile Index AST
+        """
+        collection = self.compile(ast.collection)
+        index = self.compile(ast.index)
+        return lambda variables: collection(variables)[index(variables)]
+
+    def compile_Bool(self, ast):
+        """
+            Compile Bool AST
+        """
+        token_type = ast.token.token_type
+        if token_type == TokenType.TRUE:
+            return lambda variables: True
+        if token_type == TokenType.FALSE:
+            return lambda variables: False
+        return self.error("This is not a boolean")
+
+    def compile_Variable(self, ast):
+        """
+            Compile Variable AST
+        """
+        var_name = ast.token.token_value
+        slot = self.scope.slots[var_name]
+        error = self.error
+        if self.resolution.is_join(ast):
+
+            def load_joined(variables):
+                value = variables[slot]
+                if type(value) is StringBuilder:
+                    return value.flatten()
+                if value is UNDEFINED:
+                    error(f"Variable {var_name} is read before it is set")
+                return value
+            return load_joined
+        if not self.scope.is_checked(ast):
+            return lambda variables: variables[slot]
+
+        def load_checked(variables):
+            value = variables[slot]
+            if value is UNDEFINED:
+                error(f"Variable {var_name} is read before it is set")
+            return value
+        return load_checked
+
+    def compile_SetVariable(self, ast):
+        """
+            Compile SetVariable AST
+        """
+        slot = self.scope.slots[ast.token.token_value]
+        if self.resolution.is_append(ast):
+            right = self.compile(ast.expr.right_token)
+
+            def append_variable(variables):
+                variables[slot] = concat(variables[slot], right(variables))
+            return append_variable
+        var_expr = self.compile(ast.expr)
+
+        def set_variable(variables):
+            variables[slot] = var_expr(variables)
+        return set_variable
+
+    def compile_BinOp(self, ast):
+        """
+            Compile BinOp AST
+        """
+        left = self.compile(ast.left_token)
+        right = self.compile(ast.right_token)
+        op_token = ast.op_token.token_type
+        if op_token == TokenType.PLUS:
+            return lambda variables: left(variables) + right(variables)
+        if op_token == TokenType.MINUS:
+            return lambda variables: left(variables) - right(variables)
+        if op_token == TokenType.MUL:
+            return lambda variables: left(variables) * right(variables)
+        if op_token == TokenType.DIV:
+            return lambda variables: left(variables) // right(variables)
+        if op_token == TokenType.GTHAN:
+            return lambda variables: left(variables) > right(variables)
+        if op_token == TokenType.LTHAN:
+            return lambda variables: left(variables) < right(variables)
+        if op_token == TokenType.EQUALS:
+            return lambda variables: left(variables) == right(variables)
+        return self.error(f"Something in wrong in BinOp {ast}")
+
+    def compile_UnaryOp(self, ast):
+        """
+            Compile UnaryOp AST
+        """
+        right = self.compile(ast.right_token)
+        op_token = ast.op_token.token_type
+        if op_token == TokenType.PLUS:
+            return right
+        if op_token == TokenType.MINUS:
+            return lambda variables: -right(variables)
+        return self.error(f"Something in wrong in UnaryOp {ast}")
+
+    def compile_Condition(self, ast):
+        """
+            Compile Condition AST
+        """
+        return run_if(self.compile(ast.condition_expr),
+                      self.compile(ast.condition_block))
+
+    def compile_Flow(self, ast):
+        """
+            Compile Flow AST
+            Only the block of the first true condition runs
+        """
+        branches = tuple(
+                (self.compile(condition.condition_expr),
+                 self.compile(condition.condition_block))
+                for condition in (ast.if_condition, *ast.elseif)
+                )
+        else_condition = ast.else_block
+        else_expr = else_condition.condition_expr
+        if isinstance(else_expr, Bool) and \
+                else_expr.token.token_type == TokenType.TRUE:
+            otherwise = self.compile(else_condition.condition_block)
+        else:
+            otherwise = self.compile(else_condition)
+        if len(branches) == 1 and otherwise is do_nothing:
+            # The closures of the only branch are used as they are
+            return run_if(*branches[0])
+
+        def run_flow(variables):
+            for condition, block in branches:
+                if condition(variables):
+                    block(variables)
+                    return
+            otherwise(variables)
+        return run_flow
+
+    def compile_While(self, ast):
+        """
+            Compile While AST
+        """
+        condition = self.compile(ast.expression)
+        block = self.compile(ast.block)
+        if self.budget is not None:
+            step = self.budget.step
+
+            def run_limited_while(variables):
+                while condition(variables):
+                    step()
+                    block(variables)
+            return run_limited_while
+
+        def run_while(variables):
+            while condition(variables):
+                block(variables)
+        return run_while
+
+    def compile_FunctionDecl(self, ast):
+        """
+            Compile FunctionDecl AST
+            The body is compiled once, declaring only saves it
+        """
+        function_name = ast.function_name.token_value
+        scope = self.resolution.scope(ast)
+        outer_scope = self.scope
+        outer_declares = self.declares
+        self.scope = scope
+        self.declares = False
+        try:
+            block = self.compile(ast.function_block)
+            declares = self.declares
+        finally:
+            self.scope = outer_scope
+            self.declares = outer_declares
+        self.declares = True
+        if self.budget is not None:
+            block = self.limited(block)
+        # The slots after the parameters, the declarations slot and the
+        # return slot
+        padding = [UNDEFINED] * (len(scope.names) - len(scope.parameters))
+        padding += [None, None]
+        memoized = None
+        if function_name in self.pure:
+            # Pure functions don't declare functions, the caller sets the
+            # Declarations they were found in before calling
+            declared = [None]
+
+            def run_function(*values):
+                function_variables = list(values)
+                function_variables += padding
+                function_variables[DECLARATIONS_SLOT] = declared[0]
+                block(function_variables)
+                return function_variables[RETURN_SLOT]
+            memoized = (self.memo.wrap(function_name, run_function), declared)
+        function = (len(scope.parameters), padding, block, memoized, declares)
+
+        def declare_function(variables):
+            variables[DECLARATIONS_SLOT].declare(function_name, function)
+        return declare_function
+
+    def limited(self, block):
+        """
+            Returns the block that counts a step before it runs
+        """
+        step = self.budget.step
+
+        def run_limited(variables):
+            step()
+            block(variables)
+        return run_limited
+
+    def compile_FunctionCall(self, ast):
+        """
+            Compile FunctionCall AST
+        """
+        function_name = ast.function_name.token_value
+        arguments = tuple(self.compile(expr) for expr in ast.function_variables)
+        if function_name in BUILT_IN_FUNCTIONS:
+            builtin = BUILT_IN_FUNCTIONS[function_name]
+            if not arguments:
+                return lambda variables: builtin()
+            if len(arguments) == 1:
+                argument, = arguments
+                return lambda variables: builtin(argument(variables))
+            return lambda variables: builtin(
+                    *[argument(variables) for argument in arguments])
+        error = self.error
+        argument_count = len(arguments)
+
+        def call_function(variables):
+            function, declared = \
+                variables[DECLARATIONS_SLOT].find(function_name)
+            if function is None:
+                error(f"There's no function named {function_name}")
+            parameter_count, padding, block, memoized, declares = function
+            if argument_count < parameter_count:
+                error(f"Function {function_name} takes {parameter_count}"
+                      f" arguments but {argument_count} were given")
+            function_variables = [argument(variables) for argument in arguments]
+            # Parameters are the first slots, extra arguments are dropped
+            del function_variables[parameter_count:]
+            if memoized is not None:
+                memoized, declared_cell = memoized
+                declared_cell[0] = declared
+                return memoized(*function_variables)
+            function_variables += padding
+            # A function that declares nothing sees what its declaration
+            # sees
+            if declares:
+                function_variables[DECLARATIONS_SLOT] = \
+                    Declarations(parent=declared)
+            else:
+                function_variables[DECLARATIONS_SLOT] = declared
+            block(function_variables)
+            return function_variables[RETURN_SLOT]
+        return call_function
+
+    def compile_ReturnStatement(self, ast):
+        """
+            Compile ReturnStatement AST
+            Like the interpreter return only sets the returned value
+        """
+        expression = self.compile(ast.expression)
+
+        def set_return(variables):
+            variables[RETURN_SLOT] = expression(variables)
+        return set_return
+
+
+class ClosureInterpreter:
+    """
+        Runs the program with the same results as Interpreter by calling
+        the compiled closure of it
+    """
+    def __init__(self, ast, memo_size=DEFAULT_MEMO_SIZE, budget=None):
+        self.ast = ast
+        self.budget = budget
+        resolution = resolve(ast)
+        self.scope = resolution.scope(ast)
+        # Variables live in slots while running, this is filled after
+        self.global_variables = dict()
+        self.functions = dict()
+        self.memo = Memo(memo_size)
+        self.program = ClosureCompiler(self.functions, resolution,
+                                       self.scope, find_pure_functions(ast),
+                                       self.memo, budget).compile(ast)
+
+    def interpret(self):
+        """
+            Run the compiled program
+        """
+        variables = self.scope.new_variables()
+        variables += [Declarations(self.functions), None]
+        if self.budget is not None:
+            self.budget.start()
+        try:
+            self.program(variables)
+        finally:
+            self.global_variables = self.scope.to_dict(variables)
+        if logs.VERBOSITY:
+            print("Variables:", self.global_variables)
+            print("Functions:", self.functions.keys())
+        return variables[RETURN_SLOT]
@@ -0,0 +1,432 @@
+"""
+    Compile the parsed program into a flat bytecode for the vm
+"""
+from dataclasses import dataclass, field
+from typing import Any, List, Optional
+
+from parser import (
+        AST_COUNT, Bool, Block, FunctionCall, ReturnStatement, first_position,
+        )
+from lexer import TokenType
+from interpreter import BUILT_IN_FUNCTIONS
+from resolver import Resolution, Scope, resolve
+
+# pylint: disable=invalid-name
+# OPCODES
+# Ordered roughly by how often they show up in hot loops, the vm tests
+# them in the same order
+OPCODE_COUNT = 0
+
+LOAD_FAST = OPCODE_COUNT
+OPCODE_COUNT += 1
+LOAD_CONST = OPCODE_COUNT
+OPCODE_COUNT += 1
+STORE_FAST = OPCODE_COUNT
+OPCODE_COUNT += 1
+POP_JUMP_IF_FALSE = OPCODE_COUNT
+OPCODE_COUNT += 1
+JUMP = OPCODE_COUNT
+OPCODE_COUNT += 1
+BINARY_ADD = OPCODE_COUNT
+OPCODE_COUNT += 1
+BINARY_SUB = OPCODE_COUNT
+OPCODE_COUNT += 1
+COMPARE_LT = OPCODE_COUNT
+OPCODE_COUNT += 1
+COMPARE_GT = OPCODE_COUNT
+OPCODE_COUNT += 1
+COMPARE_EQ = OPCODE_COUNT
+OPCODE_COUNT += 1
+BINARY_MUL = OPCODE_COUNT
+OPCODE_COUNT += 1
+BINARY_DIV = OPCODE_COUNT
+OPCODE_COUNT += 1
+UNARY_NEGATIVE = OPCODE_COUNT
+OPCODE_COUNT += 1
+LOAD_CHECKED = OPCODE_COUNT
+OPCODE_COUNT += 1
+CALL_FUNCTION = OPCODE_COUNT
+OPCODE_COUNT += 1
+TAIL_CALL = OPCODE_COUNT
+OPCODE_COUNT += 1
+CALL_BUILTIN = OPCODE_COUNT
+OPCODE_COUNT += 1
+BINARY_SUBSCR = OPCODE_COUNT
+OPCODE_COUNT += 1
+BUILD_LIST = OPCODE_COUNT
+OPCODE_COUNT += 1
+# Appends to and reads of the variables that build strings
+INPLACE_ADD = OPCODE_COUNT
+OPCODE_COUNT += 1
+LOAD_JOINED = OPCODE_COUNT
+OPCODE_COUNT += 1
+POP_TOP = OPCODE_COUNT
+OPCODE_COUNT += 1
+STORE_RETURN = OPCODE_COUNT
+OPCODE_COUNT += 1
+MAKE_FUNCTION = OPCODE_COUNT
+OPCODE_COUNT += 1
+RETURN = OPCODE_COUNT
+OPCODE_COUNT += 1
+# Only emitted when the program is profiled
+PROFILE_ENTER = OPCODE_COUNT
+OPCODE_COUNT += 1
+PROFILE_EXIT = OPCODE_COUNT
+OPCODE_COUNT += 1
+PROFILE_LINE = OPCODE_COUNT
+OPCODE_COUNT += 1
+# Only emitted when the program runs with a budget
+CHECK_BUDGET = OPCODE_COUNT
+OPCODE_COUNT += 1
+
+assert OPCODE_COUNT == 29, "You forgot to name a new opcode"
+
+OPNAMES = {
+        value: name
+        for name, value in list(globals().items())
+        if name.isupper() and isinstance(value, int)
+        and name not in ("OPCODE_COUNT", "AST_COUNT")
+        }
+
+BINARY_OPCODES = {
+        TokenType.PLUS: BINARY_ADD,
+        TokenType.MINUS: BINARY_SUB,
+        TokenType.MUL: BINARY_MUL,
+        TokenType.DIV: BINARY_DIV,
+        TokenType.LTHAN: COMPARE_LT,
+        TokenType.GTHAN: COMPARE_GT,
+        TokenType.EQUALS: COMPARE_EQ,
+        }
+
+
+@dataclass
+class Code:
+    """
+        Container for a compiled program or function
+        ops and args are parallel arrays, args[i] is the operand of ops[i]
+        and is an index to consts or a slot when the opcode needs one
+        names[slot] is the name of the variable in the slot, parameters
+        are the first slots
+        declares is True when the code declares functions
+    """
+    name: str
+    parameters: List[str] = field(default_factory=list)
+    ops: List[int] = field(default_factory=list)
+    args: List[int] = field(default_factory=list)
+    consts: List[Any] = field(default_factory=list)
+    names: List[str] = field(default_factory=list)
+    declares: bool = False
+
+    def disassemble(self) -> str:
+        """
+            Returns a human readable listing of the code
+        """
+        lines = [f"Code {self.name}({', '.join(self.parameters)})"]
+        for position, (op, arg) in enumerate(zip(self.ops, self.args)):
+            lines.append(f"{position:>6} {OPNAMES[op]:<20} {arg}")
+        for const in self.consts:
+            if isinstance(const, Code):
+                lines.append(const.disassemble())
+        return "\n".join(lines)
+
+
+# Compiler
+assert AST_COUNT == 19, "You've forgotten to compile an AST"
+
+
+class Compiler:
+    """
+        Compiles an AST into Code objects, a new Code is created for every
+        function declaration
+        When profile is True every Code reports its calls to the profiler
+        and the statements of the loops report their runs, returned calls
+        are not tail calls so every call is timed
+        When limit is True every function starts and every loop jumps
+        back with CHECK_BUDGET
+    """
+    def __init__(self, resolution: Optional[Resolution] = None,
+                 profile=False, limit=False):
+        self.resolution = resolution
+        self.profile = profile
+        self.limit = limit
+        self.code = None
+        self.scope: Optional[Scope] = None
+        # The return that ends the function that is being compiled
+        self.tail = None
+
+    def error(self, text):
+        """
+            Raise Error
+        """
+        raise Exception(text)
+
+    def compile(self, ast, name="<program>", scope=None, position=0) -> Code:
+        """
+            Compile the given AST into a Code that ends with RETURN
+            The program is resolved first if there is no resolution
+            position is where the code starts in the source for profiling
+        """
+        if scope is None:
+            if self.resolution is None:
+                self.resolution = resolve(ast)
+            scope = self.resolution.scope(ast)
+        outer = self.code, self.scope, self.tail
+        self.code = Code(name, list(scope.parameters),
+                         names=list(scope.names))
+        self.scope = scope
+        self.tail = None
+        if isinstance(ast, Block) and ast.ast_list and \
+                isinstance(ast.ast_list[-1], ReturnStatement):
+            self.tail = ast.ast_list[-1]
+        try:
+            if self.profile:
+                self.emit(PROFILE_ENTER, self.const((name, position)))
+            if self.limit and isinstance(ast, Block):
+                # Only functions are compiled from a Block
+                self.emit(CHECK_BUDGET)
+            self.visit(ast)
+            if self.profile:
+                self.emit(PROFILE_EXIT)
+            self.emit(RETURN)
+            return self.code
+        finally:
+            self.code, self.scope, self.tail = outer
+
+    def visit(self, ast):
+        """
+            Visit the AST with the related compile_ method
+        """
+        func = getattr(self, "compile_" + type(ast).__name__)
+        return func(ast)
+
+    def emit(self, op, arg=0) -> int:
+        """
+            Append an instruction and return its position
+        """
+        self.code.ops.append(op)
+        self.code.args.append(arg)
+        return len(self.code.ops) - 1
+
+    def patch(self, position, target=None):
+        """
+            Point the jump at position to target, default is the next
+            instruction
+        """
+        if target is None:
+            target = len(self.code.ops)
+        self.code.args[position] = target
+
+    def const(self, value) -> int:
+        """
+            Returns the index of the constant, adds it if necessary
+        """
+        consts = self.code.consts
+        for index, const in enumerate(consts):
+            # True == 1 so the type has to be compared as well
+            if type(const) is type(value) and const == value:
+                return index
+        consts.append(value)
+        return len(consts) - 1
+
+    def compile_statements(self, ast_list, count_lines=False):
+        """
+            Compile a list of statements, values of the function calls
+            that are used as statements are thrown away
+            With count_lines every statement reports its runs to the
+            profiler
+        """
+        for ast in ast_list:
+            if count_lines:
+                position = first_position(ast)
+                if position is not None:
+                    self.emit(PROFILE_LINE, position)
+            self.visit(ast)
+            if isinstance(ast, FunctionCall):
+                self.emit(POP_TOP)
+
+    def compile_Program(self, ast):
+        """
+            Compile Program AST
+        """
+        self.compile_statements(ast.ast_list)
+
+    def compile_Block(self, ast):
+        """
+            Compile Block AST
+        """
+        self.compile_statements(ast.ast_list)
+
+    def compile_Void(self, ast):
+        """
+            Compile Void AST
+        """
+
+    def compile_Integer(self, ast):
+        """
+            Compile Integer AST
+        """
+        self.emit(LOAD_CONST, self.const(ast.token.token_value))
+
+    def compile_String(self, ast):
+        """
+            Compile String AST
+        """
+        self.emit(LOAD_CONST, self.const(ast.token.token_value))
+
+    def compile_ListLiteral(self, ast):
+        """
+            Compile ListLiteral AST
+        """
+        for element in ast.elements:
+            self.visit(element)
+        self.emit(BUILD_LIST, len(ast.elements))
+
+    def compile_Index(self, ast):
+        """
+            Compile Index AST
+        """
+        self.visit(ast.collection)
+        self.visit(ast.index)
+        self.emit(BINARY_SUBSCR)
+
+    def compile_Bool(self, ast):
+        """
+            Compile Bool AST
+        """
+        token_type = ast.token.token_type
+        if token_type == TokenType.TRUE:
+            self.emit(LOAD_CONST, self.const(True))
+        elif token_type == TokenType.FALSE:
+            self.emit(LOAD_CONST, self.const(False))
+        else:
+            self.error("This is not a boolean")
+
+    def compile_Variable(self, ast):
+        """
+            Compile Variable AST
+        """
+        slot = self.scope.slots[ast.token.token_value]
+        if self.resolution.is_join(ast):
+            self.emit(LOAD_JOINED, slot)
+        elif self.scope.is_checked(ast):
+            self.emit(LOAD_CHECKED, slot)
+        else:
+            self.emit(LOAD_FAST, slot)
+
+    def compile_SetVariable(self, ast):
+        """
+            Compile SetVariable AST
+        """
+        slot = self.scope.slots[ast.token.token_value]
+        if self.resolution.is_append(ast):
+            self.emit(LOAD_FAST, slot)
+            self.visit(ast.expr.right_token)
+            self.emit(INPLACE_ADD)
+        else:
+            self.visit(ast.expr)
+        self.emit(STORE_FAST, slot)
+
+    def compile_BinOp(self, ast):
+        """
+            Compile BinOp AST
+        """
+        op = BINARY_OPCODES.get(ast.op_token.token_type)
+        if op is None:
+            self.error(f"Something in wrong in BinOp {ast}")
+        self.visit(ast.left_token)
+        self.visit(ast.right_token)
+        self.emit(op)
+
+    def compile_UnaryOp(self, ast):
+        """
+            Compile UnaryOp AST
+        """
+        op_token = ast.op_token.token_type
+        self.visit(ast.right_token)
+        if op_token == TokenType.MINUS:
+            self.emit(UNARY_NEGATIVE)
+        elif op_token != TokenType.PLUS:
+            self.error(f"Something in wrong in UnaryOp {ast}")
+
+    def compile_Condition(self, ast, end_jumps=None):
+        """
+            Compile Condition AST, when end_jumps is given a jump to the
+            end of the flow is added after the block and saved in it
+        """
+        expr = ast.condition_expr
+        always = isinstance(expr, Bool) and \
+            expr.token.token_type == TokenType.TRUE
+        if always:
+            self.visit(ast.condition_block)
+            return
+        self.visit(expr)
+        skip = self.emit(POP_JUMP_IF_FALSE)
+        self.visit(ast.condition_block)
+        if end_jumps is not None:
+            end_jumps.append(self.emit(JUMP))
+        self.patch(skip)
+
+    def compile_Flow(self, ast):
+        """
+            Compile Flow AST
+            Only the block of the first true condition runs
+        """
+        end_jumps = list()
+        self.compile_Condition(ast.if_condition, end_jumps)
+        for elseif in ast.elseif:
+            self.compile_Condition(elseif, end_jumps)
+        self.compile_Condition(ast.else_block)
+        for end_jump in end_jumps:
+            self.patch(end_jump)
+
+    def compile_While(self, ast):
+        """
+            Compile While AST
+        """
+        start = len(self.code.ops)
+        self.visit(ast.expression)
+        exit_jump = self.emit(POP_JUMP_IF_FALSE)
+        self.compile_statements(ast.block.ast_list, self.profile)
+        if self.limit:
+            self.emit(CHECK_BUDGET)
+        self.emit(JUMP, start)
+        self.patch(exit_jump)
+
+    def compile_FunctionDecl(self, ast):
+        """
+            Compile FunctionDecl AST
+        """
+        function = self.compile(ast.function_block,
+                                ast.function_name.token_value,
+                                self.resolution.scope(ast),
+                                first_position(ast) or 0)
+        self.code.declares = True
+        self.emit(MAKE_FUNCTION, self.const(function))
+
+    def compile_FunctionCall(self, ast, call_op=CALL_FUNCTION):
+        """
+            Compile FunctionCall AST
+        """
+        function_name = ast.function_name.token_value
+        for expr in ast.function_variables:
+            self.visit(expr)
+        argc = len(ast.function_variables)
+        if function_name in BUILT_IN_FUNCTIONS:
+            builtin = BUILT_IN_FUNCTIONS[function_name]
+            self.emit(CALL_BUILTIN, self.const((builtin, argc)))
+        else:
+            self.emit(call_op, self.const((function_name, argc)))
+
+    def compile_ReturnStatement(self, ast):
+        """
+            Compile ReturnStatement AST
+            Like the interpreter return only sets the returned value
+            A call that is returned by the last statement of a function
+            is a TAIL_CALL, the vm may run it in the frame of the function
+        """
+        if ast is self.tail and isinstance(ast.expression, FunctionCall) \
+                and not self.profile:
+            self.compile_FunctionCall(ast.expression, TAIL_CALL)
+        else:
+            self.visit(ast.expression)
+        self.emit(STORE_RETURN)
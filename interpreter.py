@@ -1,12 +1,61 @@
 """
     The script that interprets the parsed file
 """
-from parser import AST_COUNT
+import operator
+import _thread
+from contextlib import contextmanager
+from functools import partial
+
+from parser import AST_COUNT, Integer, Variable
 from lexer import TokenType
+from resolver import resolve
+from strings import StringBuilder, concat, joined
+import strings
 import logs
 
 # pylint: disable=invalid-name
 # pylint: disable=no-self-use
+
+
+class Console(_thread._local):
+    """
+        The streams print writes to and input reads from, every thread has
+        its own, None is the stream of sys
+        It is the thread local of threading without importing threading
+    """
+    stdout = None
+    stdin = None
+
+    @contextmanager
+    def redirect(self, stdout, stdin):
+        """
+            Use the streams in the running thread
+        """
+        self.stdout = stdout
+        self.stdin = stdin
+        try:
+            yield
+        finally:
+            self.stdout = None
+            self.stdin = None
+
+
+CONSOLE = Console()
+
+
+def read_line(prompt=""):
+    """
+        input that reads from the stream of the console
+    """
+    if CONSOLE.stdin is None:
+        return input(prompt)
+    print(prompt, end="", file=CONSOLE.stdout)
+    line = CONSOLE.stdin.readline()
+    if not line:
+        raise EOFError("EOF when reading a line")
+    return line[:-1] if line.endswith("\n") else line
+
+
 handle_function = 0
 
 # Handle bin print
@@ -17,7 +66,7 @@ def handle_bin_print(*args):
     """
         Handles the built-in function print
     """
-    print(*args)
+    print(*args, file=CONSOLE.stdout)
 
 
 # Handle bin input
@@ -28,18 +77,132 @@ def handle_bin_input(*args):
     """
         Handles the built-in function input
     """
-    return input(*args)
+    return read_line(*args)
+
+
+# Handle bin len
+handle_function += 1
+
+
+def handle_bin_len(*args):
+    """
+        Handles the built-in function len
+    """
+    return strings.length(*args)
+
+
+# Handle bin sum
+handle_function += 1
+
+
+def handle_bin_sum(*args):
+    """
+        Handles the built-in function sum
+    """
+    import arrays
+    return arrays.total(*args)
+
+
+# Handle bin range
+handle_function += 1
+
+
+def handle_bin_range(*args):
+    """
+        Handles the built-in function range
+    """
+    import arrays
+    return arrays.make_range(*args)
+
+
+# Handle bin addeach
+handle_function += 1
+
+
+def handle_bin_addeach(*args):
+    """
+        Handles the built-in function addeach
+    """
+    import arrays
+    return arrays.add_each(*args)
+
+
+# Handle bin muleach
+handle_function += 1
+
+
+def handle_bin_muleach(*args):
+    """
+        Handles the built-in function muleach
+    """
+    import arrays
+    return arrays.mul_each(*args)
+
+
+# Handle bin sort
+handle_function += 1
+
+
+def handle_bin_sort(*args):
+    """
+        Handles the built-in function sort
+    """
+    import arrays
+    return arrays.sort(*args)
+
+
+# Handle bin substr
+handle_function += 1
+
+
+def handle_bin_substr(*args):
+    """
+        Handles the built-in function substr
+    """
+    return strings.substr(*args)
+
+
+# Handle bin join
+handle_function += 1
+
+
+def handle_bin_join(*args):
+    """
+        Handles the built-in function join
+    """
+    return strings.join(*args)
 
 
 BUILT_IN_FUNCTIONS = {
         "print": handle_bin_print,
-        "input": handle_bin_input
+        "input": handle_bin_input,
+        "len": handle_bin_len,
+        "sum": handle_bin_sum,
+        "range": handle_bin_range,
+        "addeach": handle_bin_addeach,
+        "muleach": handle_bin_muleach,
+        "sort": handle_bin_sort,
+        "substr": handle_bin_substr,
+        "join": handle_bin_join,
         }
 
 assert handle_function == len(BUILT_IN_FUNCTIONS),\
         "You forgot to write a handle_bin function\
         for new BUILT_IN_FUNCTION"
 
+# Operations of the quickened BinOp ASTs
+INT_OPERATIONS = {
+        TokenType.PLUS: operator.add,
+        TokenType.MINUS: operator.sub,
+        TokenType.MUL: operator.mul,
+        TokenType.DIV: operator.floordiv,
+        TokenType.GTHAN: operator.gt,
+        TokenType.LTHAN: operator.lt,
+        TokenType.EQUALS: operator.eq,
+        }
+# A BinOp is quickened after its operands were ints this many times
+QUICKEN_AFTER = 16
+
 
 class Walker:
     """
@@ -49,27 +212,121 @@ class Walker:
         """
             Walk the parsed
         """
-        logs.print_done("AST:", ast)
-        ast_name = "walk_" + type(ast).__name__
-        logs.print_debug(ast_name)
-        func = getattr(self, ast_name)
+        func = getattr(self, "walk_" + type(ast).__name__)
         return func(ast)
 
+    def traced_walk(self, ast):
+        """
+            walk that traces the AST, it replaces walk when the walker
+            tracing is on
+        """
+        logs.trace("walker", "debug", lambda: f"walk_{type(ast).__name__}")
+        return Walker.walk(self, ast)
+
+
+class Frame:
+    """
+        Variables, functions and return value of a running function call
+        functions is created when the call declares its first function
+        parent is the frame the called function was declared in
+    """
+    __slots__ = ("variables", "functions", "parent", "to_return")
+
+    def __init__(self, variables, functions=None, parent=None):
+        self.variables = variables
+        self.functions = functions
+        self.parent = parent
+        self.to_return = None
+
+
+class Declarations:
+    """
+        The functions declared in a running call for the engines that keep
+        the variables of the call in slots, functions is created when the
+        call declares its first function
+        parent is the Declarations of the call the called function was
+        declared in
+    """
+    __slots__ = ("functions", "parent")
+
+    def __init__(self, functions=None, parent=None):
+        self.functions = functions
+        self.parent = parent
+
+    def declare(self, name, function):
+        """
+            Save the function of the name
+        """
+        if self.functions is None:
+            self.functions = dict()
+        self.functions[name] = function
+
+    def find(self, name):
+        """
+            Returns the function of the name and the Declarations it is
+            in, the parents are searched after the running call
+            Both are None when there is no function of the name
+        """
+        declarations = self
+        while declarations is not None:
+            functions = declarations.functions
+            if functions is not None:
+                function = functions.get(name)
+                if function is not None:
+                    return function, declarations
+            declarations = declarations.parent
+        return None, None
+
 
 # Interpreter
-assert AST_COUNT == 17, "You've forgotten to interpret an AST"
+assert AST_COUNT == 19, "You've forgotten to interpret an AST"
 
 
 class Interpreter(Walker):
     """
         Main class that interprets the parsed tokens
+        With a budget every loop iteration and every call is a step
+        A BinOp whose operands keep being ints is quickened, it runs a
+        handler made for it that skips the operator checks and reads its
+        variable and integer operands without walking them
     """
-    def __init__(self, ast):
+    def __init__(self, ast, memo_size=None, budget=None):
         self.ast = ast
+        # The walker keeps variables by name, resolving reports the
+        # variables that are never set before anything runs and finds the
+        # appends to strings
+        self.resolution = resolve(ast)
         self.global_variables = dict()
         self.functions = dict()
-        logs.print_info(self.ast)
-        self.to_return = None
+        self.tracing = logs.enabled("walker")
+        if self.tracing:
+            self.walk = self.traced_walk
+        self.budget = budget
+        if budget is not None:
+            self.walk_While = self.limited_walk_While
+            self.call = self.limited_call
+        logs.trace("walker", "info", lambda: self.ast)
+        # Every call runs on this interpreter with its own frame
+        self.frame = Frame(self.global_variables, self.functions)
+        # Parameter names of the declarations, built once
+        self.parameters = dict()
+        # Only the functions of the program are memoized, memo is imported
+        # when there are any
+        self.pure = set()
+        self.memo = None
+        if len(self.resolution.scopes) > 1:
+            from memo import Memo, find_pure_functions
+            self.pure = find_pure_functions(ast)
+            self.memo = Memo(memo_size)
+        # Cached calls of the pure declarations
+        self.memoized = dict()
+        # Handlers of the quickened BinOp ASTs and how many times the
+        # others saw int operands
+        self.quickened = dict()
+        self.int_counts = dict()
+        # The declaration each call site called last with its parameters
+        # and cached call
+        self.call_sites = dict()
 
     def error(self, text):
         """
@@ -81,11 +338,18 @@ class Interpreter(Walker):
         """
             Interpret the given list of tokens
         """
-        self.walk(self.ast)
+        if self.budget is not None:
+            self.budget.start()
+        try:
+            self.walk(self.ast)
+        finally:
+            for name, value in self.global_variables.items():
+                if type(value) is StringBuilder:
+                    self.global_variables[name] = value.flatten()
         if logs.VERBOSITY:
             print("Variables:", self.global_variables)
             print("Functions:", self.functions.keys())
-        return self.to_return
+        return self.frame.to_return
 
     def walk_Integer(self, ast):
         """
@@ -97,10 +361,14 @@ class Interpreter(Walker):
         """
             Handle BinOp AST
         """
+        quickened = self.quickened.get(id(ast))
+        if quickened is not None:
+            return quickened()
         left_value = self.walk(ast.left_token)
         op_token = ast.op_token.token_type
-        logs.print_info(op_token)
         right_value = self.walk(ast.right_token)
+        if type(left_value) is int and type(right_value) is int:
+            self.count_ints(ast)
         if op_token == TokenType.PLUS:
             return left_value + right_value
         if op_token == TokenType.MINUS:
@@ -117,6 +385,50 @@ class Interpreter(Walker):
             return left_value == right_value
         return self.error(f"Something in wrong in BinOp {ast}")
 
+    def count_ints(self, ast):
+        """
+            Count that the operands of the BinOp AST were ints and quicken
+            it when they were QUICKEN_AFTER times
+        """
+        key = id(ast)
+        count = self.int_counts.get(key, 0) + 1
+        self.int_counts[key] = count
+        if count < QUICKEN_AFTER:
+            return
+        operation = INT_OPERATIONS.get(ast.op_token.token_type)
+        if operation is None:
+            return
+        left = self.operand(ast.left_token)
+        right = self.operand(ast.right_token)
+
+        def quickened():
+            left_value = left()
+            right_value = right()
+            if type(left_value) is int and type(right_value) is int:
+                return operation(left_value, right_value)
+            # Deoptimize, the AST counts again from zero
+            self.quickened.pop(key, None)
+            self.int_counts[key] = 0
+            return operation(left_value, right_value)
+
+        self.quickened[key] = quickened
+
+    def operand(self, ast):
+        """
+            Returns a function that returns the value of an operand of a
+            quickened BinOp, variables and integers are not walked unless
+            the walker is traced
+        """
+        if not self.tracing:
+            if isinstance(ast, Integer):
+                value = ast.token.token_value
+                return lambda: value
+            if isinstance(ast, Variable) and \
+                    not self.resolution.is_join(ast):
+                name = ast.token.token_value
+                return lambda: self.frame.variables[name]
+        return partial(self.walk, ast)
+
     def walk_UnaryOp(self, ast):
         """
             Handle UnaryOp AST
@@ -154,15 +466,22 @@ class Interpreter(Walker):
             Handle SetVariable AST
         """
         var_name = ast.token.token_value
+        if self.resolution.is_append(ast):
+            variables = self.frame.variables
+            variables[var_name] = concat(variables[var_name],
+                                         self.walk(ast.expr.right_token))
+            return
         var_expr = self.walk(ast.expr)
-        self.global_variables[var_name] = var_expr
+        self.frame.variables[var_name] = var_expr
 
     def walk_Variable(self, ast):
         """
             Handle Variable AST
         """
         var_name = ast.token.token_value
-        return self.global_variables[var_name]
+        if self.resolution.is_join(ast):
+            return joined(self.frame.variables[var_name])
+        return self.frame.variables[var_name]
 
     def walk_Bool(self, ast):
         """
@@ -180,17 +499,11 @@ class Interpreter(Walker):
         """
             Handle Flow AST
         """
-        if_condition = self.walk(ast.if_condition.condition_expr)
-        elseif_condition = False
-        self.walk(ast.if_condition)
-        if not if_condition:
-            for elseif in ast.elseif:
-                elseif_condition = self.walk(elseif.condition_expr)
-                self.walk(elseif.condition_block)
-                if elseif_condition:
-                    break
-        if not if_condition and not elseif_condition:
-            self.walk(ast.else_block)
+        for condition in (ast.if_condition, *ast.elseif):
+            if self.walk(condition.condition_expr):
+                self.walk(condition.condition_block)
+                return
+        self.walk(ast.else_block)
 
     def walk_Condition(self, ast):
         """
@@ -204,43 +517,105 @@ class Interpreter(Walker):
             Handle FunctionDecl AST
         """
         function_name = ast.function_name.token_value
-        self.functions[function_name] = ast
+        frame = self.frame
+        if frame.functions is None:
+            frame.functions = dict()
+        frame.functions[function_name] = ast
+        # Nodes are not hashable, they live as long as the interpreter
+        if id(ast) not in self.parameters:
+            parameters = [
+                    place.token_value
+                    for place in ast.function_variables
+                    ]
+            self.parameters[id(ast)] = parameters
+            if function_name in self.pure:
+                # A pure function is declared once, the caller finds it
+                # again in the frame it was declared in
+                self.memoized[id(ast)] = self.memo.wrap(
+                        function_name,
+                        lambda *values: self.call(
+                            ast, dict(zip(parameters, values)),
+                            self.find_function(function_name)[1]))
+
+    def find_function(self, function_name):
+        """
+            Returns the declaration of the function the running call sees
+            and the frame it was declared in, a call sees the functions
+            declared in it and in the frames its function was declared in
+            Both are None when there is no function of the name
+        """
+        frame = self.frame
+        while frame is not None:
+            functions = frame.functions
+            if functions is not None:
+                function = functions.get(function_name)
+                if function is not None:
+                    return function, frame
+            frame = frame.parent
+        return None, None
 
     def walk_FunctionCall(self, ast):
         """
             Handle FunctionCall AST
+            The call site keeps the declaration it called, it is used again
+            while the name still finds the same declaration
         """
         # TODO: Find a better way to call functions
         function_name = ast.function_name.token_value
-        assert len(BUILT_IN_FUNCTIONS) == 2,\
+        assert len(BUILT_IN_FUNCTIONS) == 10,\
             "You forgot to handle the walk_FunctionCall\
             for new BUILT_IN_FUNCTION"
-        if function_name in BUILT_IN_FUNCTIONS:
-            function_arguments = list()
-            for expr in ast.function_variables:
-                function_arguments.append(self.walk(expr))
-            return BUILT_IN_FUNCTIONS[function_name](*function_arguments)
-        function_variables = ast.function_variables
-        function = self.functions[function_name]
-        function_block = function.function_block
-        function_variable_places = [
-            place.token_value
-            for place in function.function_variables
-                ]
-        logs.print_error("Funciton variables:", function_variable_places)
-        variables = dict()
-        zipped = zip(function_variable_places, function_variables)
-        for var_name, var_value in zipped:
-            variables[var_name] = self.walk(var_value)
-        new_interpreter = Interpreter(function_block)
-        new_interpreter.global_variables = variables
-        return new_interpreter.interpret()
+        builtin = BUILT_IN_FUNCTIONS.get(function_name)
+        if builtin is not None:
+            return builtin(*[self.walk(expr)
+                             for expr in ast.function_variables])
+        function, declared = self.find_function(function_name)
+        site = self.call_sites.get(id(ast))
+        if site is None or site[0] is not function:
+            if function is None:
+                return self.error(f"There's no function named {function_name}")
+            site = (function, self.parameters[id(function)],
+                    self.memoized.get(id(function)))
+            self.call_sites[id(ast)] = site
+        _, parameters, memoized = site
+        if memoized is not None:
+            return memoized(*[
+                    self.walk(var_value)
+                    for _, var_value in zip(parameters, ast.function_variables)
+                    ])
+        return self.call(function, {
+                name: self.walk(var_value)
+                for name, var_value in zip(parameters, ast.function_variables)
+                }, declared)
+
+    def call(self, function, variables, parent):
+        """
+            Run the FunctionDecl in a new frame with the variables of its
+            parameters and return its value, parent is the frame it was
+            declared in
+        """
+        frame = Frame(variables, parent=parent)
+        caller = self.frame
+        self.frame = frame
+        try:
+            self.walk(function.function_block)
+        finally:
+            self.frame = caller
+        return frame.to_return
+
+    def limited_call(self, function, variables, parent):
+        """
+            call that counts a step, it replaces call when there is a
+            budget
+        """
+        self.budget.step()
+        return Interpreter.call(self, function, variables, parent)
 
     def walk_ReturnStatement(self, ast):
         """
             Handle ReturnStatement AST
         """
-        self.to_return = self.walk(ast.expression)
+        self.frame.to_return = self.walk(ast.expression)
 
     def walk_While(self, ast):
         """
@@ -251,8 +626,32 @@ class Interpreter(Walker):
         while self.walk(expression):
             self.walk(block)
 
+    def limited_walk_While(self, ast):
+        """
+            walk_While that counts a step for every iteration, it replaces
+            walk_While when there is a budget
+        """
+        expression = ast.expression
+        block = ast.block
+        step = self.budget.step
+        while self.walk(expression):
+            step()
+            self.walk(block)
+
     def walk_String(self, ast):
         """
             Handle String AST
         """
         return ast.token.token_value
+
+    def walk_ListLiteral(self, ast):
+        """
+            Handle ListLiteral AST
+        """
+        return [self.walk(element) for element in ast.elements]
+
+    def walk_Index(self, ast):
+        """
+            Handle Index AST
+        """
+        return self.walk(ast.collection)[self.walk(ast.index)]
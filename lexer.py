@@ -1,9 +1,10 @@
 """
     Lex a text into tokens
 """
+import re
 from enum import Enum, auto
-from dataclasses import dataclass
-from typing import Union
+from dataclasses import dataclass, field
+from typing import Optional, Tuple, Union
 
 
 class TokenType(Enum):
@@ -50,15 +51,18 @@ class TokenType(Enum):
 
     # BUILT-IN DATA TYPES
     STRING_LITERAL = auto()
+    LBRACKET = auto()
+    RBRACKET = auto()
 
 
-@dataclass
+@dataclass(slots=True)
 class Token:
     """
         Container for token
     """
     token_type: TokenType
     token_value: Union[int, str, None]
+    position: Optional[int] = field(default=None, compare=False)
 
 
 BUILT_IN_WORDS = {
@@ -72,8 +76,90 @@ BUILT_IN_WORDS = {
         "return": TokenType.RETURN,
         "while": TokenType.WHILE,
     }
-DIGITS = "1234567890"
-IGNORE_CHARACTERS = "\n "
+SINGLE_CHARACTER_TOKENS = {
+        "+": TokenType.PLUS,
+        "-": TokenType.MINUS,
+        "*": TokenType.MUL,
+        "/": TokenType.DIV,
+        "(": TokenType.LPAREN,
+        ")": TokenType.RPAREN,
+        "<": TokenType.LTHAN,
+        ">": TokenType.GTHAN,
+        "=": TokenType.SET,
+        "{": TokenType.BLOCK_START,
+        "}": TokenType.BLOCK_END,
+        ",": TokenType.SEP,
+        "[": TokenType.LBRACKET,
+        "]": TokenType.RBRACKET,
+    }
+# Leading spaces and newlines are skipped, every token is one group
+# Words are alphanumeric like str.isalnum, strings end at the first quote
+# that has no backslash before it or at the end of the text
+TOKEN_PATTERN = re.compile(r"""
+        [\n ]*
+        (?:
+            (?P<integer>[0-9]+)
+            | (?P<word>[^\W_]+)
+            | "(?P<string>(?:\\"|[^"])*)"?
+            | (?P<equals>==)
+            | (?P<single>[-+*/()<>={},\[\]])
+            | (?P<eof>\Z)
+            | (?P<error>.)
+        )
+        """, re.VERBOSE | re.DOTALL)
+# The same pattern for utf-8 bytes, bytes patterns only know ascii
+# so every non ascii byte is allowed in words and checked after decoding
+BYTES_TOKEN_PATTERN = re.compile(rb"""
+        [\n ]*
+        (?:
+            (?P<integer>[0-9]+)
+            | (?P<word>(?:[^\W_]|[\x80-\xff])+)
+            | "(?P<string>(?:\\"|[^"])*)"?
+            | (?P<equals>==)
+            | (?P<single>[-+*/()<>={},\[\]])
+            | (?P<eof>\Z)
+            | (?P<error>.)
+        )
+        """, re.VERBOSE | re.DOTALL)
+SINGLE_BYTE_TOKENS = {
+        character.encode(): (token_type, character)
+        for character, token_type in SINGLE_CHARACTER_TOKENS.items()
+    }
+
+
+def get_line_column(text, position) -> Tuple[int, int]:
+    """
+        Returns the line and column of the position, both start from 1
+    """
+    line_start = text.rfind("\n", 0, position) + 1
+    return text.count("\n", 0, position) + 1, position - line_start + 1
+
+
+def decode_string_literal(string) -> str:
+    """
+        Returns the value of the text between the quotes
+        Escaped quotes become quotes and the rest is unicode_escape decoded,
+        plain ascii strings are already their own value
+    """
+    if "\\" not in string and string.isascii():
+        return string
+    string = string.replace('\\"', '"')
+    return string.encode().decode("unicode_escape")
+
+
+def decode_bytes_literal(string) -> str:
+    """
+        decode_string_literal for the utf-8 bytes between the quotes
+    """
+    if b"\\" not in string and string.isascii():
+        return string.decode("ascii")
+    string = string.replace(b'\\"', b'"')
+    return string.decode("unicode_escape")
+
+
+assert len(TokenType) == 28, "You forgot to implement a token"
+assert len(BUILT_IN_WORDS) == 9, "You've forgotten to lex\
+        a new builtin word"
 
 
 class Lexer:
@@ -82,9 +168,9 @@ class Lexer:
     """
     def __init__(self, text):
         self.text = text
-        self.position = -1
-        self.current_char = None
-        self.advance()
+        # Only updated when there is an error
+        self.position = 0
+        self.matches = TOKEN_PATTERN.finditer(text)
 
     def error(self, text):
         """
@@ -93,204 +179,93 @@ class Lexer:
         position = self.position
         raise Exception(f"At position {position}" + text)
 
-    def advance(self):
-        """
-            Advance the position and sets the new character
-            according to this position
-        """
-        self.position += 1
-        if self.position < len(self.text):
-            self.current_char = self.text[self.position]
-        else:
-            self.current_char = None
-
-    def in_range(self):
-        """
-            Return if position in text range
-        """
-        return self.position < len(self.text)
-
-    def peek(self):
+    def __iter__(self):
         """
-            Returns the next position char without advancing the pointer
+            Yields the tokens lazily until and including EOF
         """
-        position = self.position + 1
-        if self.position < len(self.text):
-            return self.text[position]
-        return None
+        while True:
+            token = self.get_next_token()
+            yield token
+            if token.token_type == TokenType.EOF:
+                return
 
-    def get_integer(self):
-        """
-            Returns an integer from text
-        """
-        integer = ""
-        while self.current_char and self.current_char in DIGITS:
-            integer += self.current_char
-            self.advance()
-        return int(integer)
-
-    def get_math_token(self):
+    def get_next_token(self):
         """
-            Returns a token related to math exprs
+            Returns the next token from string with the position of its
+            first character
         """
-        if self.current_char == "+":
-            token_type = TokenType.PLUS
-            token_value = "+"
-            token = Token(token_type, token_value)
-            self.advance()
-            return token
-        if self.current_char == "-":
-            token_type = TokenType.MINUS
-            token_value = "-"
-            token = Token(token_type, token_value)
-            self.advance()
-            return token
-        if self.current_char == "*":
-            token_type = TokenType.MUL
-            token_value = "*"
-            token = Token(token_type, token_value)
-            self.advance()
-            return token
-        if self.current_char == "/":
-            token_type = TokenType.DIV
-            token_value = "/"
-            token = Token(token_type, token_value)
-            self.advance()
-            return token
-        if self.current_char == "(":
-            token_type = TokenType.LPAREN
-            token_value = "("
-            token = Token(token_type, token_value)
-            self.advance()
-            return token
-        if self.current_char == ")":
-            token_type = TokenType.RPAREN
-            token_value = ")"
-            token = Token(token_type, token_value)
-            self.advance()
-            return token
-        raise Exception("There's something really wrong")
+        match = next(self.matches, None)
+        if match is None:
+            # Every call after the end of the text returns EOF
+            return Token(TokenType.EOF, None, len(self.text))
+        return self.match_token(match)
 
-    def get_word_token(self):
+    def match_token(self, match):
         """
-            Returns a word or built-in word
+            Returns the token of a match of TOKEN_PATTERN
         """
-        word = ""
-        while self.current_char and self.current_char.isalnum():
-            word += self.current_char
-            self.advance()
-        token_type = TokenType.WORD
-
-        assert len(BUILT_IN_WORDS) == 9, "You've forgotten to lex\
-                a new builtin word"
-        token_type = BUILT_IN_WORDS.get(word, token_type)
+        kind = match.lastgroup
+        value = match.group(kind)
+        position = match.start(kind)
+        if kind == "word":
+            return Token(BUILT_IN_WORDS.get(value, TokenType.WORD), value,
+                         position)
+        if kind == "single":
+            return Token(SINGLE_CHARACTER_TOKENS[value], value, position)
+        if kind == "integer":
+            return Token(TokenType.INTEGER, int(value), position)
+        if kind == "string":
+            # The position of the string is its opening quote
+            return Token(TokenType.STRING_LITERAL,
+                         decode_string_literal(value), position - 1)
+        if kind == "equals":
+            return Token(TokenType.EQUALS, value, position)
+        if kind == "eof":
+            return Token(TokenType.EOF, None, position)
+        self.position = position
+        return self.error(f"Unreachable character {value}")
 
-        return Token(token_type, word)
+class BytesLexer(Lexer):
+    """
+        Lexer for utf-8 bytes like objects such as an mmap of the file
+        Nothing is decoded until it is sliced into a token and positions
+        are byte offsets
+    """
+    def __init__(self, text):
+        # pylint: disable=super-init-not-called
+        self.text = text
+        self.position = 0
+        self.matches = BYTES_TOKEN_PATTERN.finditer(text)
 
-    def get_string_literal(self) -> str:
+    def match_token(self, match):
         """
-            Starts the pointer at quote and advances once
-            then advances and combines every thing until
-            it finds a quote that didn't have a backslash before
-            and returns the unicode_escaped value of this
-            string
+            Returns the token of a match of BYTES_TOKEN_PATTERN
         """
-        self.advance()  # Point after the quote
-        string = ""
-        while self.current_char and self.current_char != '"':
-            if self.current_char == "\\" and self.peek() == '"':
-                string += '"'
-                self.advance()
-                self.advance()
-                continue
-            string += self.current_char
-            self.advance()
-        string = string.encode().decode("unicode_escape")
-        return string
-
-    def get_next_token(self):
-        """Returns the next token from string"""
-        assert len(TokenType) == 26, "You forgot to implement a token"
-        while self.current_char:
-            if self.current_char in DIGITS:
-                token_type = TokenType.INTEGER
-                token_value = self.get_integer()
-                token = Token(token_type, token_value)
-                # self.advance()
-                return token
-            if self.current_char in "+-/*()":
-                # Mathematical tokens
-                return self.get_math_token()
-            if self.current_char.isalnum():
-                # Word tokens
-                return self.get_word_token()
-            # Logical operators
-            if self.current_char == "=" and self.peek() == "=":
-                token_type = TokenType.EQUALS
-                token_value = "=="
-                token = Token(token_type, token_value)
-                self.advance()
-                self.advance()
-                return token
-            if self.current_char == "<":
-                token_type = TokenType.LTHAN
-                token_value = "<"
-                token = Token(token_type, token_value)
-                self.advance()
-                return token
-            if self.current_char == ">":
-                token_type = TokenType.GTHAN
-                token_value = ">"
-                token = Token(token_type, token_value)
-                self.advance()
-                return token
-            if self.current_char == "=":
-                token_type = TokenType.SET
-                token_value = "="
-                token = Token(token_type, token_value)
-                self.advance()
-                return token
-            if self.current_char == "=":
-                token_type = TokenType.SET
-                token_value = "="
-                token = Token(token_type, token_value)
-                self.advance()
-                return token
-            if self.current_char == "=":
-                token_type = TokenType.SET
-                token_value = "="
-                token = Token(token_type, token_value)
-                self.advance()
-                return token
-            if self.current_char == "{":
-                token_type = TokenType.BLOCK_START
-                token_value = "{"
-                token = Token(token_type, token_value)
-                self.advance()
-                return token
-            if self.current_char == "}":
-                token_type = TokenType.BLOCK_END
-                token_value = "}"
-                token = Token(token_type, token_value)
-                self.advance()
-                return token
-
-            if self.current_char == ",":
-                token_type = TokenType.SEP
-                token_value = ","
-                token = Token(token_type, token_value)
-                self.advance()
-                return token
-            if self.current_char == '"':
-                token_type = TokenType.STRING_LITERAL
-                token_value = self.get_string_literal()
-                token = Token(token_type, token_value)
-                self.advance()  # RETURN
-                return token
+        kind = match.lastgroup
+        value = match.group(kind)
+        position = match.start(kind)
+        if kind == "word":
+            value = value.decode()
+            if value.isascii() or value.isalnum():
+                return Token(BUILT_IN_WORDS.get(value, TokenType.WORD),
+                             value, position)
+        elif kind == "single":
+            token_type, value = SINGLE_BYTE_TOKENS[value]
+            return Token(token_type, value, position)
+        elif kind == "integer":
+            return Token(TokenType.INTEGER, int(value), position)
+        elif kind == "string":
+            # The position of the string is its opening quote
+            return Token(TokenType.STRING_LITERAL,
+                         decode_bytes_literal(value), position - 1)
+        elif kind == "equals":
+            return Token(TokenType.EQUALS, "==", position)
+        elif kind == "eof":
+            return Token(TokenType.EOF, None, position)
+        else:
+            value = value.decode(errors="replace")
+        self.position = position
+        return self.error(f"Unreachable character {value}")
 
-            if self.current_char in IGNORE_CHARACTERS:
-                self.advance()
-                continue
-            self.error(f"Unreachable character {self.current_char}")
 
-        return Token(TokenType.EOF, None)
+TOKEN_TYPES = {token_type.value: token_type for token_type in TokenType}
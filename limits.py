@@ -0,0 +1,85 @@
+"""
+    Stop programs that run too long
+
+    The engines count a step at every loop back edge and every function
+    call when they are given a Budget, engines without one don't count
+"""
+from time import monotonic
+
+# How many steps run between two readings of the clock
+CLOCK_INTERVAL = 1024
+
+
+class ExecutionLimitExceeded(Exception):
+    """
+        Raised when a program runs more steps or longer than its budget
+        steps is how many steps it ran
+    """
+    def __init__(self, text, steps):
+        super().__init__(text)
+        self.steps = steps
+
+
+class Budget:
+    """
+        Allows max_steps steps and timeout seconds from start, None is
+        no limit
+        cancelled is called whenever the clock is read, the program stops
+        when it returns True
+        step only compares two numbers until a limit may be reached
+    """
+    __slots__ = ("max_steps", "timeout", "cancelled", "steps", "deadline",
+                 "next_check")
+
+    def __init__(self, max_steps=None, timeout=None, cancelled=None):
+        self.max_steps = max_steps
+        self.timeout = timeout
+        self.cancelled = cancelled
+        self.steps = 0
+        self.deadline = None
+        self.next_check = 0
+
+    def start(self):
+        """
+            Start counting from zero, the deadline is timeout seconds
+            from now
+        """
+        self.steps = 0
+        if self.timeout is not None:
+            self.deadline = monotonic() + self.timeout
+        self.next_check = 0
+        self.check()
+
+    def step(self):
+        """
+            Count a step
+        """
+        self.steps += 1
+        if self.steps >= self.next_check:
+            self.check()
+
+    def check(self):
+        """
+            Raise ExecutionLimitExceeded if a limit is reached and set the
+            step of the next check
+        """
+        if self.max_steps is not None and self.steps > self.max_steps:
+            raise ExecutionLimitExceeded(
+                    f"Execution stopped after {self.steps} steps, the"
+                    f" limit is {self.max_steps} steps", self.steps)
+        next_check = self.steps + CLOCK_INTERVAL
+        if self.cancelled is not None and self.cancelled():
+            raise ExecutionLimitExceeded(
+                    f"Execution stopped after {self.steps} steps, it was"
+                    " cancelled", self.steps)
+        if self.deadline is not None:
+            if monotonic() > self.deadline:
+                raise ExecutionLimitExceeded(
+                        f"Execution stopped after {self.steps} steps, the"
+                        f" limit is {self.timeout} seconds", self.steps)
+        elif self.cancelled is None:
+            next_check = None
+        if self.max_steps is not None:
+            if next_check is None or next_check > self.max_steps + 1:
+                next_check = self.max_steps + 1
+        self.next_check = next_check
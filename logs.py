@@ -2,18 +2,110 @@
    ://github.com/python/typeshed
     A module to use logging and printing
 """
-from colorama import Fore, init
-init(autoreset=True)
+import sys
+from collections import deque
 DEBUG = False and True
 VERBOSITY = False
 
+# Tracing
+# A trace is kept when its level is at least LEVEL and its category is in
+# CATEGORIES, None turns tracing off and lets every category in
+LEVELS = {
+        "debug": 10,
+        "done": 20,
+        "info": 30,
+        "error": 40,
+        }
+# Names of the colorama colors
+COLORS = {
+        "debug": "YELLOW",
+        "done": "GREEN",
+        "info": "BLUE",
+        "error": "RED",
+        }
+LEVEL = None
+CATEGORIES = None
+# The last traces are kept here to be dumped on error
+BUFFER = None
+# Print the traces as they come
+ECHO = False
+
+
+# colorama is imported when the first colored line is printed
+COLORAMA = None
+
+
+def color(level) -> str:
+    """
+        Returns the escape code of the color of the level
+    """
+    global COLORAMA  # pylint: disable=global-statement
+    if COLORAMA is None:
+        # pylint: disable=import-outside-toplevel
+        import colorama
+        colorama.init(autoreset=True)
+        COLORAMA = colorama
+    return getattr(COLORAMA.Fore, COLORS[level])
+
+
+def configure(level=None, categories=None, buffer_size=0, echo=True):
+    """
+        Set up tracing, configure() turns it off
+        Engines check enabled when they are created, the ones that are
+        created before don't trace
+    """
+    global LEVEL, CATEGORIES, BUFFER, ECHO  # pylint: disable=global-statement
+    LEVEL = LEVELS[level] if level is not None else None
+    CATEGORIES = frozenset(categories) if categories is not None else None
+    BUFFER = deque(maxlen=buffer_size) if buffer_size > 0 else None
+    ECHO = echo
+
+
+def enabled(category, level="debug") -> bool:
+    """
+        Returns if the traces of the category and the level are kept
+    """
+    if LEVEL is None or LEVELS[level] < LEVEL:
+        return False
+    return CATEGORIES is None or category in CATEGORIES
+
+
+def trace(category, level, message, *args):
+    """
+        Keep a trace, message can be a function that returns the message
+        so it is only built when the trace is kept
+        Hot loops should check enabled once instead of calling this
+    """
+    if not enabled(category, level):
+        return
+    if callable(message):
+        message = message()
+    text = " ".join(str(part) for part in (message, *args))
+    if BUFFER is not None:
+        BUFFER.append((category, level, text))
+    if ECHO:
+        print(color(level) + f"[{level.upper()}] {category}:", text)
+
+
+def dump(file=None):
+    """
+        Write the traces in the buffer and empty it
+    """
+    if BUFFER is None:
+        return
+    if file is None:
+        file = sys.stderr
+    while BUFFER:
+        category, level, text = BUFFER.popleft()
+        print(f"[{level.upper()}] {category}: {text}", file=file)
+
 
 def print_error(*args, **kwargs):
     """
         Print wrapper to write errors
     """
     if DEBUG:
-        print(Fore.RED + "[ERROR]: ", *args, **kwargs)
+        print(color("error") + "[ERROR]: ", *args, **kwargs)
 
 
 def print_info(*args, **kwargs):
@@ -21,7 +113,7 @@ def print_info(*args, **kwargs):
         Print wrapper to write info
     """
     if DEBUG:
-        print(Fore.BLUE + "[INFO]: ", *args, **kwargs)
+        print(color("info") + "[INFO]: ", *args, **kwargs)
 
 
 def print_done(*args, **kwargs):
@@ -29,7 +121,7 @@ def print_done(*args, **kwargs):
         Print wrapper to write completes
     """
     if DEBUG:
-        print(Fore.GREEN + "[DONE]", *args, **kwargs)
+        print(color("done") + "[DONE]", *args, **kwargs)
 
 
 def print_debug(*args, **kwargs):
@@ -37,4 +129,4 @@ def print_debug(*args, **kwargs):
         Print wrapper to write debugs
     """
     if DEBUG:
-        print(Fore.YELLOW + "[DEBUG]", *args, **kwargs)
+        print(color("debug") + "[DEBUG]", *args, **kwargs)
@@ -4,29 +4,114 @@
 """
 import sys
 import os
-import argparse
+import gc
+import importlib
 import logs
+from contextlib import contextmanager
 
-from lexer import Lexer
+from lexer import Lexer, BytesLexer
 from parser import Parser, Token
-from interpreter import Interpreter
 
-from typing import List
+from typing import Iterator
 
-def lex_to_tokens(text) -> List[Token]:
-    lexer = Lexer(text)
-    token = lexer.get_next_token()
-    tokens = list([token])
-    while token.token_value:
-        token = lexer.get_next_token()
-        tokens.append(token)
-    return tokens
+def lex_to_tokens(text) -> Iterator[Token]:
+    # Tokens are lexed while they are consumed
+    if isinstance(text, str):
+        return iter(Lexer(text))
+    return iter(BytesLexer(text))
 
-def interpret(string):
-    tokens = lex_to_tokens(string)
-    parser = Parser(tokens)
-    interpreter = Interpreter(parser.parse())
-    interpreter.interpret()
+# Module and class of the engines, an engine is imported when it runs so
+# starting up doesn't import all of them
+ENGINES = {
+        "walker": ("interpreter", "Interpreter"),
+        "vm": ("vm", "VM"),
+        "closure": ("closure", "ClosureInterpreter"),
+        "python": ("transpiler", "PythonInterpreter"),
+        }
+
+def load_engine(engine):
+    module, name = ENGINES[engine]
+    return getattr(importlib.import_module(module), name)
+
+def optimize(program, passes=()):
+    if not passes:
+        return program
+    from optimizer import PassManager
+    pass_manager = PassManager(passes)
+    program = pass_manager.run(program)
+    logs.trace("optimizer", "info",\
+            lambda: "Optimizations:\n" + pass_manager.report())
+    return program
+
+def parse(text, passes=()):
+    # Nothing that points into text outlives this call so a mapped
+    # file can be closed once the program is parsed
+    parser = Parser(lex_to_tokens(text))
+    return optimize(parser.parse(), passes)
+
+# Sources shorter than this parse faster than the cache modules import
+CACHE_MIN_SIZE = 4096
+
+def parse_cached(path, text, passes=(), cache_dir=None, use_cache=True):
+    # Unchanged sources are loaded from the cache without lexing or parsing
+    if not use_cache or len(text) < CACHE_MIN_SIZE:
+        return parse(text, passes)
+    import cache
+    key = cache.cache_key(text, passes)
+    cache_path = cache.cache_path(os.path.join(PATH, path), passes, cache_dir)
+    program = cache.load(cache_path, key)
+    if program is None:
+        program = parse(text, passes)
+        cache.store(cache_path, key, program)
+    return program
+
+def make_interpreter(program, engine="walker", text=None,\
+        memo_size=None, profiler=None, budget=None):
+    if profiler is not None:
+        # Only the vm can be profiled, the bytecode gets the profile hooks
+        return load_engine("vm")(program, memo_size=memo_size,\
+                profiler=profiler, budget=budget)
+    if engine == "python":
+        # Pass the text so errors can show the line and column
+        return load_engine(engine)(program, text, memo_size=memo_size,\
+                budget=budget)
+    return load_engine(engine)(program, memo_size=memo_size, budget=budget)
+
+def make_budget(max_steps=None, timeout=None):
+    # Engines without a budget don't count steps at all
+    if max_steps is None and timeout is None:
+        return None
+    from limits import Budget
+    return Budget(max_steps, timeout)
+
+def run_program(program, engine="walker", text=None,\
+        memo_size=None, stats=False, profile=False,\
+        profile_output=None, max_steps=None, timeout=None):
+    profiler = None
+    if profile:
+        from profiler import Profiler
+        profiler = Profiler()
+    interpreter = make_interpreter(program, engine, text, memo_size, profiler,\
+            make_budget(max_steps, timeout))
+    # The tree and whatever the engine compiled live until the program
+    # ends, the cyclic collector doesn't have to scan them again
+    gc.freeze()
+    try:
+        interpreter.interpret()
+    finally:
+        if stats:
+            # The walker makes no caches for a program without functions
+            memo = interpreter.memo
+            print("Memoized functions:", file=sys.stderr)
+            print("No memoized functions" if memo is None else memo.report(),\
+                    file=sys.stderr)
+        if profiler is not None:
+            print(profiler.report(text), file=sys.stderr)
+            if profile_output is not None:
+                profiler.dump(profile_output, text)
+
+def interpret(string, engine="walker", passes=()):
+    run_program(parse(string, passes), engine, string)
 
 PATH = "."
 def usage():
@@ -34,21 +119,62 @@ def usage():
 def read_file(path: str) -> None:
     with open(os.path.join(PATH, path)) as file:
         return file.read()
-def lex_parse_interpret(text: str) -> None:
-    interpret(text)
 
-def print_the_tokens(filename) -> None:
-    text = read_file(filename)
+@contextmanager
+def open_source(path: str, use_mmap=False):
+    # Yields the text of the file or a read only mmap of its bytes
+    if not use_mmap:
+        yield read_file(path)
+        return
+    with open(os.path.join(PATH, path), "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            # Empty files can't be mapped
+            yield b""
+            return
+        import mmap
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            yield buffer
+def lex_parse_interpret(text: str, engine="walker", passes=()) -> None:
+    interpret(text, engine, passes)
+
+def print_the_tokens(filename, use_mmap=False) -> None:
     print("TOKENS")
-    tokens = lex_to_tokens(text)
-    print(*tokens, sep="\n")
+    # Every token is printed as soon as it is lexed, a mapped file stays
+    # open until the last one
+    with open_source(filename, use_mmap) as text:
+        for token in lex_to_tokens(text):
+            print(token)
 
-def print_the_parsing(filename) -> None:
-    text = read_file(filename)
+def print_the_parsing(filename, passes=(), use_mmap=False, cache_dir=None,\
+        use_cache=True) -> None:
     print("PARSING")
-    tokens = lex_to_tokens(text)
-    parser = Parser(tokens)
-    print(parser.parse())
+    with open_source(filename, use_mmap) as text:
+        program = parse_cached(filename, text, passes, cache_dir, use_cache)
+    print(program)
+
+def print_the_python(filename, passes=(), use_mmap=False, cache_dir=None,\
+        use_cache=True) -> None:
+    with open_source(filename, use_mmap) as text:
+        program = parse_cached(filename, text, passes, cache_dir, use_cache)
+        if not isinstance(text, str):
+            text = None
+    from transpiler import Transpiler
+    print(Transpiler().transpile(program).annotated(text))
+
+def parse_interpret_file(filename, engine="walker", passes=(),\
+        use_mmap=False, cache_dir=None, use_cache=True,\
+        memo_size=None, stats=False, profile=False,\
+        profile_output=None, max_steps=None, timeout=None) -> None:
+    with open_source(filename, use_mmap) as text:
+        program = parse_cached(filename, text, passes, cache_dir, use_cache)
+        if not isinstance(text, str):
+            text = None
+    run_program(program, engine, text, memo_size, stats, profile,\
+            profile_output, max_steps, timeout)
+
+def start_repl() -> None:
+    from repl import Repl
+    Repl().run()
 
 def parse_arguments() -> None:
     arguments = sys.argv
@@ -57,9 +183,14 @@ def parse_arguments() -> None:
         sys.exit()
     file_name, *arguments = arguments
     program_name, *arguments = arguments
-    lex_parse_interpret(read_file(program_name))
+    # Same as the defaults of parse_arguments_argparse
+    parse_interpret_file(program_name)
 
 def parse_arguments_argparse() -> None:
+    import argparse
+    import cache
+    from optimizer import PASSES, OPTIMIZATION_LEVELS
+    from memo import DEFAULT_MEMO_SIZE
     parser = argparse.ArgumentParser()
     # Handle positional file name
     positional_file_name = "file_path"
@@ -67,7 +198,18 @@ def parse_arguments_argparse() -> None:
 
     # Add positional file name
     parser.add_argument(positional_file_name,\
-            help=positional_file_name_help)
+            help=positional_file_name_help + ", the repl starts without it",\
+            nargs="?")
+
+    # Handle positional file names of a batch
+    positional_more_file_names = "more_file_paths"
+    positional_more_file_names_help = "More files to run as a batch, quoted\
+            glob patterns are expanded"
+
+    # Add positional file names of a batch
+    parser.add_argument(positional_more_file_names,\
+            help=positional_more_file_names_help,\
+            nargs="*")
 
     # Handle verbosity
     debug = "--debug"
@@ -95,22 +237,296 @@ def parse_arguments_argparse() -> None:
             help=is_parse_help,\
             action="store_true")
 
+    # Add emit python option
+    is_emit_python = "--emit-python"
+    is_emit_python_help = "Print the python source the file is transpiled to"
+
+    # Add emit python argument
+    parser.add_argument(is_emit_python,\
+            help=is_emit_python_help,\
+            action="store_true")
+
+    # Add engine option
+    engine = "--engine"
+    engine_help = "Engine that runs the file"
+
+    # Add engine argument
+    parser.add_argument(engine,\
+            help=engine_help,\
+            choices=ENGINES,\
+            default="walker")
+
+    # Add optimization level option, -O0 -O1 -O2
+    optimization = "-O"
+    optimization_help = "Optimization level"
+
+    # Add optimization level argument
+    parser.add_argument(optimization,\
+            help=optimization_help,\
+            dest="optimization",\
+            type=int,\
+            choices=OPTIMIZATION_LEVELS,\
+            default=0)
+
+    # Add passes option
+    passes = "--passes"
+    passes_help = "Comma separated optimization passes to run instead of\
+            the ones of the level, choices: " + ", ".join(PASSES)
+
+    # Add passes argument
+    parser.add_argument(passes,\
+            help=passes_help)
+
+    # Add mmap option
+    is_mmap = "--mmap"
+    is_mmap_help = "Lex the file from a memory map of its bytes instead of\
+            reading it into a string, the file must be utf-8"
+
+    # Add mmap argument
+    parser.add_argument(is_mmap,\
+            help=is_mmap_help,\
+            action="store_true")
+
+    # Add no cache option
+    no_cache = "--no-cache"
+    no_cache_help = "Always lex and parse the file, don't read or write\
+            the cache of parsed programs, files shorter than "\
+            + str(CACHE_MIN_SIZE) + " characters are never cached"
+
+    # Add no cache argument
+    parser.add_argument(no_cache,\
+            help=no_cache_help,\
+            action="store_true")
+
+    # Add cache directory option
+    cache_dir = "--cache-dir"
+    cache_dir_help = "Directory of the cache of parsed programs, "\
+            + cache.CACHE_DIRECTORY + " next to the file by default"
+
+    # Add cache directory argument
+    parser.add_argument(cache_dir,\
+            help=cache_dir_help)
+
+    # Add memo size option
+    memo_size = "--memo-size"
+    memo_size_help = "How many results of each pure function are cached,\
+            0 turns caching off"
+
+    # Add memo size argument
+    parser.add_argument(memo_size,\
+            help=memo_size_help,\
+            type=int,\
+            default=DEFAULT_MEMO_SIZE)
+
+    # Add stats option
+    is_stats = "--stats"
+    is_stats_help = "Print the hits and misses of the caches of the pure\
+            functions after running"
+
+    # Add stats argument
+    parser.add_argument(is_stats,\
+            help=is_stats_help,\
+            action="store_true")
+
+    # Add profile option
+    is_profile = "--profile"
+    is_profile_help = "Run the file on the vm and print the calls and the\
+            time of every function and the hits of the lines in loops"
+
+    # Add profile argument
+    parser.add_argument(is_profile,\
+            help=is_profile_help,\
+            action="store_true")
+
+    # Add profile output option
+    profile_output = "--profile-output"
+    profile_output_help = "Also write the profile to this file, json when\
+            it ends with .json and pstats otherwise"
+
+    # Add profile output argument
+    parser.add_argument(profile_output,\
+            help=profile_output_help)
+
+    # Add max steps option
+    max_steps = "--max-steps"
+    max_steps_help = "Stop the program after this many loop iterations and\
+            function calls"
+
+    # Add max steps argument
+    parser.add_argument(max_steps,\
+            help=max_steps_help,\
+            type=int)
+
+    # Add timeout option
+    timeout = "--timeout"
+    timeout_help = "Stop the program after it runs this many seconds"
+
+    # Add timeout argument
+    parser.add_argument(timeout,\
+            help=timeout_help,\
+            type=float)
+
+    # Add jobs option
+    jobs = "--jobs"
+    jobs_help = "Run the files as a batch on this many processes, the\
+            number of cpus by default"
+
+    # Add jobs argument
+    parser.add_argument(jobs,\
+            help=jobs_help,\
+            type=int)
+
+    # Add files from option
+    files_from = "--files-from"
+    files_from_help = "Also run the files listed in this file, one on every\
+            line, - reads the list from stdin"
+
+    # Add files from argument
+    parser.add_argument(files_from,\
+            help=files_from_help)
+
+    # Add serve option
+    serve = "--serve"
+    serve_help = "Run the programs that client.py sends to the unix\
+            socket at this path instead of running a file"
+
+    # Add serve argument
+    parser.add_argument(serve,\
+            help=serve_help)
+
+    # Add concurrency option
+    concurrency = "--concurrency"
+    concurrency_help = "How many programs the server runs at the same time"
+
+    # Add concurrency argument
+    parser.add_argument(concurrency,\
+            help=concurrency_help,\
+            type=int,\
+            default=4)
+
+    # Add trace option
+    trace = "--trace"
+    trace_help = "Trace the run, only the traces of this level and above\
+            are written"
+
+    # Add trace argument
+    parser.add_argument(trace,\
+            help=trace_help,\
+            choices=logs.LEVELS)
+
+    # Add trace categories option
+    trace_categories = "--trace-categories"
+    trace_categories_help = "Comma separated categories to trace, all of\
+            them by default: parser, walker, cache, optimizer, transpiler"
+
+    # Add trace categories argument
+    parser.add_argument(trace_categories,\
+            help=trace_categories_help)
+
+    # Add trace buffer option
+    trace_buffer = "--trace-buffer"
+    trace_buffer_help = "Keep the last this many traces in memory and\
+            write them only if the run fails"
+
+    # Add trace buffer argument
+    parser.add_argument(trace_buffer,\
+            help=trace_buffer_help,\
+            type=int,\
+            default=0)
+
     args = parser.parse_args()
+    if args.passes is not None:
+        passes = [name for name in args.passes.split(",") if name]
+    else:
+        passes = OPTIMIZATION_LEVELS[args.optimization]
 
 
 
     # Check verbosity
     logs.DEBUG = args.debug
-    if args.lex:
-        print_the_tokens(args.file_path)
+    level = "debug" if args.debug else args.trace
+    if level is None and args.trace_buffer > 0:
+        level = "debug"
+    if level is not None:
+        categories = None
+        if args.trace_categories is not None:
+            categories = args.trace_categories.split(",")
+        logs.configure(level, categories, args.trace_buffer,\
+                echo=args.trace_buffer <= 0)
+    try:
+        run_arguments(args, passes)
+    except SystemExit as error:
+        # Batches and the server exit with 0 when they end normally
+        if error.code not in (None, 0):
+            logs.dump()
+        raise
+    except BaseException:
+        logs.dump()
+        raise
+
+def batch_file_paths(args) -> list:
+    patterns = list()
+    if args.file_path is not None:
+        patterns.append(args.file_path)
+    patterns.extend(args.more_file_paths)
+    if args.files_from == "-":
+        patterns.extend(line.strip() for line in sys.stdin)
+    elif args.files_from is not None:
+        with open(args.files_from) as file:
+            patterns.extend(line.strip() for line in file)
+    import glob
+    paths = list()
+    for pattern in patterns:
+        if not pattern:
+            continue
+        if glob.has_magic(pattern):
+            paths.extend(sorted(glob.glob(pattern)))
+        else:
+            paths.append(pattern)
+    return paths
+
+def run_batch(args, passes) -> None:
+    from batch import run_files, report
+    results = run_files(batch_file_paths(args), args.jobs,\
+            engine=args.engine, passes=passes, use_mmap=args.mmap,\
+            cache_dir=args.cache_dir, use_cache=not args.no_cache,\
+            memo_size=args.memo_size, stats=args.stats,\
+            max_steps=args.max_steps, timeout=args.timeout)
+    sys.exit(report(results))
+
+def run_arguments(args, passes) -> None:
+    if args.serve is not None:
+        from server import serve
+        serve(args.serve, args.concurrency, args.max_steps, args.timeout)
+    elif args.more_file_paths or args.jobs is not None\
+            or args.files_from is not None:
+        run_batch(args, passes)
+    elif args.file_path is None:
+        start_repl()
+    elif args.lex:
+        print_the_tokens(args.file_path, args.mmap)
     elif args.parse:
-        print_the_parsing(args.file_path)
+        print_the_parsing(args.file_path, passes, args.mmap,\
+                args.cache_dir, not args.no_cache)
+    elif args.emit_python:
+        print_the_python(args.file_path, passes, args.mmap,\
+                args.cache_dir, not args.no_cache)
     else:
-        lex_parse_interpret(read_file(args.file_path))
+        parse_interpret_file(args.file_path, args.engine, passes, args.mmap,\
+                args.cache_dir, not args.no_cache, args.memo_size, args.stats,\
+                args.profile or args.profile_output is not None,\
+                args.profile_output, args.max_steps, args.timeout)
 
 
 def main() -> None:
-    parse_arguments_argparse()
+    # Running a file without options is the common case, it doesn't need
+    # argparse
+    if len(sys.argv) == 1:
+        start_repl()
+    elif len(sys.argv) == 2 and not sys.argv[1].startswith("-"):
+        parse_arguments()
+    else:
+        parse_arguments_argparse()
 
 if __name__ == "__main__":
     main()
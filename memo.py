@@ -0,0 +1,185 @@
+"""
+    Find the pure functions of a program and cache their results
+
+    A function is pure when it doesn't declare functions and only calls
+    pure functions, functions can only read their own variables so the
+    same arguments always give the same result
+"""
+from collections import OrderedDict, namedtuple
+from functools import lru_cache
+from typing import Dict, List, Optional, Set, Tuple
+
+from parser import FunctionCall, FunctionDecl, iter_nodes
+
+DEFAULT_MEMO_SIZE = 256
+# Built-in functions without side effects, print and input are not
+PURE_BUILT_IN_FUNCTIONS: Set[str] = {
+        "len", "sum", "range", "addeach", "muleach", "sort", "substr",
+        "join",
+        }
+
+
+def find_pure_functions(program) -> Set[str]:
+    """
+        Returns the names of the pure functions
+        A name that is declared more than once is never pure
+    """
+    declarations: Dict[str, List[FunctionDecl]] = dict()
+    for node in iter_nodes(program):
+        if isinstance(node, FunctionDecl):
+            name = node.function_name.token_value
+            declarations.setdefault(name, list()).append(node)
+    calls: Dict[str, Set[str]] = dict()
+    for name, declared in declarations.items():
+        if len(declared) != 1:
+            continue
+        called = set()
+        for node in iter_nodes(declared[0].function_block):
+            if isinstance(node, FunctionDecl):
+                break
+            if isinstance(node, FunctionCall):
+                called.add(node.function_name.token_value)
+        else:
+            calls[name] = called - PURE_BUILT_IN_FUNCTIONS
+    # Recursive functions are pure until they call an impure one
+    pure = set(calls)
+    changed = True
+    while changed:
+        changed = False
+        for name in list(pure):
+            if not calls[name] <= pure:
+                pure.discard(name)
+                changed = True
+    return pure
+
+
+def is_hashable(value) -> bool:
+    """
+        Returns if the value can be a key of the caches
+    """
+    try:
+        hash(value)
+    except TypeError:
+        return False
+    return True
+
+
+CacheInfo = namedtuple("CacheInfo", ["hits", "misses", "maxsize", "currsize"])
+# Returned by LRUCache.get when the key is missing
+MISSING = object()
+
+
+def memo_key(arguments) -> tuple:
+    """
+        Returns the key of the arguments, the types are part of it like
+        lru_cache(typed=True)
+    """
+    return (*arguments, *map(type, arguments))
+
+
+class LRUCache:
+    """
+        Least recently used cache with the counters of lru_cache, for
+        engines that can't call through a python function
+    """
+    def __init__(self, size):
+        self.size = size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """
+            Returns the value of the key or MISSING
+            Unhashable keys raise TypeError
+        """
+        value = self.entries.get(key, MISSING)
+        if value is MISSING:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self.entries.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        """
+            Save the value, the least recently used one is evicted when
+            the cache is full
+        """
+        self.entries[key] = value
+        if len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+    def cache_info(self) -> CacheInfo:
+        """
+            Returns the counters like lru_cache
+        """
+        return CacheInfo(self.hits, self.misses, self.size, len(self.entries))
+
+
+class Memo:
+    """
+        A least recently used cache of size results for every pure
+        function, a size of 0 turns caching off and None is the default
+        True and 1 are different arguments
+    """
+    def __init__(self, size=None):
+        self.size = DEFAULT_MEMO_SIZE if size is None else size
+        self.caches = dict()
+        self.memoized = dict()
+
+    def wrap(self, name, function):
+        """
+            Returns function with a cache, the same name always gets the
+            same cache
+        """
+        if self.size <= 0:
+            return function
+        memoized = self.memoized.get(name)
+        if memoized is not None:
+            return memoized
+        cached = lru_cache(maxsize=self.size, typed=True)(function)
+
+        def memoized(*arguments):
+            try:
+                return cached(*arguments)
+            except TypeError:
+                if is_hashable(arguments):
+                    raise
+                return function(*arguments)
+        self.caches[name] = cached
+        self.memoized[name] = memoized
+        return memoized
+
+    def cache(self, name) -> Optional[LRUCache]:
+        """
+            Returns the LRUCache of the function or None if caching is off
+            Engines that use it get and put the results themselves
+        """
+        if self.size <= 0:
+            return None
+        cache = self.caches.get(name)
+        if cache is None:
+            cache = self.caches[name] = LRUCache(self.size)
+        return cache
+
+    def stats(self) -> List[Tuple[str, int, int, int]]:
+        """
+            Returns the name, hits, misses and size of every cache
+        """
+        stats = list()
+        for name, cached in self.caches.items():
+            info = cached.cache_info()
+            stats.append((name, info.hits, info.misses, info.currsize))
+        return stats
+
+    def report(self) -> str:
+        """
+            Returns a readable summary of the stats
+        """
+        if not self.caches:
+            return "No memoized functions"
+        return "\n".join(
+                f"{name:<10} {hits} hits {misses} misses {size} cached"
+                for name, hits, misses, size in self.stats()
+                )
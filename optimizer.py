@@ -0,0 +1,378 @@
+"""
+    Optimization passes that rewrite the parsed program before it runs
+"""
+from dataclasses import fields, replace
+from typing import Dict, List, Optional, Tuple
+
+from parser import (
+        AST_COUNT, AST, Integer, Bool, String, SetVariable, Block, Program,
+        Condition, Flow, FunctionDecl, FunctionCall, Void, iter_nodes,
+        )
+from lexer import TokenType, Token
+import logs
+
+# pylint: disable=invalid-name
+LITERALS = (Integer, Bool, String)
+
+BINARY_OPERATIONS = {
+        TokenType.PLUS: lambda left, right: left + right,
+        TokenType.MINUS: lambda left, right: left - right,
+        TokenType.MUL: lambda left, right: left * right,
+        TokenType.DIV: lambda left, right: left // right,
+        TokenType.GTHAN: lambda left, right: left > right,
+        TokenType.LTHAN: lambda left, right: left < right,
+        TokenType.EQUALS: lambda left, right: left == right,
+        }
+
+
+def is_literal(ast) -> bool:
+    """
+        Returns if the AST is a constant
+    """
+    return isinstance(ast, LITERALS)
+
+
+def literal_value(ast):
+    """
+        Returns the value of a literal AST like the interpreter does
+    """
+    if isinstance(ast, Bool):
+        return ast.token.token_type == TokenType.TRUE
+    return ast.token.token_value
+
+
+def make_literal(value, position=None) -> Optional[AST]:
+    """
+        Returns a literal AST for the value or None if there is no literal
+        for its type
+    """
+    if isinstance(value, bool):
+        if value:
+            return Bool(Token(TokenType.TRUE, "true", position))
+        return Bool(Token(TokenType.FALSE, "false", position))
+    if isinstance(value, int):
+        return Integer(Token(TokenType.INTEGER, value, position))
+    if isinstance(value, str):
+        return String(Token(TokenType.STRING_LITERAL, value, position))
+    return None
+
+
+def static_truth(ast) -> Optional[bool]:
+    """
+        Returns the truth of a constant condition and None for the others
+    """
+    if is_literal(ast):
+        return bool(literal_value(ast))
+    return None
+
+
+def first_token(ast) -> Optional[Token]:
+    """
+        Returns the first token of a literal or variable
+    """
+    return getattr(ast, "token", None)
+
+
+def count_nodes(ast) -> int:
+    """
+        Returns the number of AST nodes in the tree
+    """
+    if isinstance(ast, list):
+        return sum(count_nodes(child) for child in ast)
+    if not isinstance(ast, AST):
+        return 0
+    return 1 + sum(
+            count_nodes(getattr(ast, child.name))
+            for child in fields(ast)
+            )
+
+
+class Transformer:
+    """
+        Main class for the passes, visit returns the rewritten AST
+        statements that visit to None are removed from their list
+    """
+    def visit(self, ast):
+        """
+            Visit the AST with the related visit_ method
+        """
+        func = getattr(self, "visit_" + type(ast).__name__, None)
+        if func is None:
+            return self.generic_visit(ast)
+        return func(ast)
+
+    def visit_list(self, ast_list):
+        """
+            Visit every AST of the list and drop the removed ones
+        """
+        new_list = list()
+        for ast in ast_list:
+            if isinstance(ast, AST):
+                ast = self.visit(ast)
+                if ast is None:
+                    continue
+            new_list.append(ast)
+        return new_list
+
+    def generic_visit(self, ast):
+        """
+            Visit the children and return a copy if any of them changed
+        """
+        changes = dict()
+        for child in fields(ast):
+            value = getattr(ast, child.name)
+            if isinstance(value, AST):
+                new_value = self.visit(value)
+            elif isinstance(value, list):
+                new_value = self.visit_list(value)
+                if len(new_value) == len(value) and \
+                        all(a is b for a, b in zip(new_value, value)):
+                    new_value = value
+            else:
+                continue
+            if new_value is not value:
+                changes[child.name] = new_value
+        if changes:
+            return replace(ast, **changes)
+        return ast
+
+
+# Passes
+assert AST_COUNT == 19, "You've forgotten to optimize an AST"
+
+
+class ConstantFolding(Transformer):
+    """
+        Computes the operations whose operands are literals
+        Operations that fail are left to fail while running
+    """
+    def visit_BinOp(self, ast):
+        """
+            Fold BinOp AST
+        """
+        ast = self.generic_visit(ast)
+        left, right = ast.left_token, ast.right_token
+        operation = BINARY_OPERATIONS.get(ast.op_token.token_type)
+        if operation is None or not is_literal(left) or not is_literal(right):
+            return ast
+        left_value, right_value = literal_value(left), literal_value(right)
+        if ast.op_token.token_type == TokenType.MUL and \
+                (isinstance(left_value, str) or isinstance(right_value, str)):
+            # Repeating strings can make huge constants
+            return ast
+        try:
+            value = operation(left_value, right_value)
+        except (TypeError, ZeroDivisionError):
+            return ast
+        return make_literal(value, first_token(left).position) or ast
+
+    def visit_UnaryOp(self, ast):
+        """
+            Fold UnaryOp AST
+        """
+        ast = self.generic_visit(ast)
+        right = ast.right_token
+        if not is_literal(right):
+            return ast
+        value = literal_value(right)
+        op_token = ast.op_token
+        try:
+            if op_token.token_type == TokenType.PLUS:
+                value = +value
+            elif op_token.token_type == TokenType.MINUS:
+                value = -value
+            else:
+                return ast
+        except TypeError:
+            return ast
+        return make_literal(value, op_token.position) or ast
+
+
+class ConstantPropagation(Transformer):
+    """
+        Replaces the variables that are assigned only once with a literal
+        by the literal
+        Only the reads that come after the assignment in the same scope
+        are replaced, the program and each function are separate scopes
+    """
+    def __init__(self):
+        self.constants: Dict[str, AST] = dict()
+
+    def scope(self, ast_list, parameters=()) -> List[AST]:
+        """
+            Propagate the constants of a scope
+        """
+        outer_constants = self.constants
+        self.constants = dict()
+        assignments = {name: 1 for name in parameters}
+        for ast in iter_nodes(ast_list, enter_functions=False):
+            if isinstance(ast, SetVariable):
+                name = ast.token.token_value
+                assignments[name] = assignments.get(name, 0) + 1
+        new_list = list()
+        try:
+            for ast in ast_list:
+                ast = self.visit(ast)
+                new_list.append(ast)
+                if isinstance(ast, SetVariable) and is_literal(ast.expr) \
+                        and assignments[ast.token.token_value] == 1:
+                    self.constants[ast.token.token_value] = ast.expr
+        finally:
+            self.constants = outer_constants
+        return new_list
+
+    def visit_Program(self, ast):
+        """
+            Propagate Program AST
+        """
+        return Program(self.scope(ast.ast_list))
+
+    def visit_FunctionDecl(self, ast):
+        """
+            Propagate FunctionDecl AST
+        """
+        parameters = [place.token_value for place in ast.function_variables]
+        block = Block(self.scope(ast.function_block.ast_list, parameters))
+        return replace(ast, function_block=block)
+
+    def visit_Variable(self, ast):
+        """
+            Propagate Variable AST
+        """
+        constant = self.constants.get(ast.token.token_value)
+        if constant is None:
+            return ast
+        return make_literal(literal_value(constant), ast.token.position)
+
+
+class DeadBranchElimination(Transformer):
+    """
+        Removes the branches of flows and the loops whose conditions are
+        constant false, a constant true condition ends its flow
+    """
+    def visit_Flow(self, ast):
+        """
+            Eliminate Flow AST
+        """
+        ast = self.generic_visit(ast)
+        branches: List[Tuple[AST, AST]] = list()
+        otherwise = None
+        for condition in (ast.if_condition, *ast.elseif, ast.else_block):
+            truth = static_truth(condition.condition_expr)
+            if truth is False:
+                continue
+            if truth is True:
+                otherwise = condition.condition_block
+                break
+            branches.append(condition)
+        if otherwise is None or isinstance(otherwise, Void):
+            if not branches:
+                return None
+            otherwise = Void()
+        if not branches:
+            return otherwise
+        else_block = Condition(Bool(Token(TokenType.TRUE, "true")), otherwise)
+        return Flow(branches[0], branches[1:], else_block)
+
+    def visit_While(self, ast):
+        """
+            Eliminate While AST
+        """
+        ast = self.generic_visit(ast)
+        if static_truth(ast.expression) is False:
+            return None
+        return ast
+
+
+class DeadFunctionElimination(Transformer):
+    """
+        Removes the function declarations that are never called from the
+        program or from the functions it calls
+    """
+    def __init__(self):
+        self.called = set()
+
+    def visit_Program(self, ast):
+        """
+            Find the called functions and eliminate the others
+        """
+        declarations = dict()
+        for node in iter_nodes(ast.ast_list):
+            if isinstance(node, FunctionDecl):
+                name = node.function_name.token_value
+                declarations.setdefault(name, list()).append(node)
+        pending = [ast.ast_list]
+        while pending:
+            for node in iter_nodes(pending.pop(), enter_functions=False):
+                if not isinstance(node, FunctionCall):
+                    continue
+                name = node.function_name.token_value
+                if name in self.called:
+                    continue
+                self.called.add(name)
+                for declaration in declarations.get(name, ()):
+                    pending.append(declaration.function_block.ast_list)
+        return self.generic_visit(ast)
+
+    def visit_FunctionDecl(self, ast):
+        """
+            Eliminate FunctionDecl AST
+        """
+        if ast.function_name.token_value not in self.called:
+            return None
+        return self.generic_visit(ast)
+
+
+PASSES = {
+        "fold": ConstantFolding,
+        "propagate": ConstantPropagation,
+        "branches": DeadBranchElimination,
+        "functions": DeadFunctionElimination,
+        }
+
+OPTIMIZATION_LEVELS = {
+        0: [],
+        1: ["fold", "branches"],
+        2: ["fold", "propagate", "fold", "branches", "functions"],
+        }
+
+
+class PassManager:
+    """
+        Runs the passes in order and saves how many nodes each removed
+    """
+    def __init__(self, passes):
+        for name in passes:
+            if name not in PASSES:
+                raise Exception(f"There's no optimization pass named {name}")
+        self.passes = list(passes)
+        self.stats: List[Tuple[str, int]] = list()
+
+    @classmethod
+    def from_level(cls, level):
+        """
+            Returns a PassManager with the passes of the -O level
+        """
+        return cls(OPTIMIZATION_LEVELS[level])
+
+    def run(self, program):
+        """
+            Returns the optimized program
+        """
+        for name in self.passes:
+            before = count_nodes(program)
+            program = PASSES[name]().visit(program)
+            removed = before - count_nodes(program)
+            self.stats.append((name, removed))
+            logs.trace("optimizer", "info", "Optimization pass", name,
+                       "removed", removed, "nodes")
+        return program
+
+    def report(self) -> str:
+        """
+            Returns a readable summary of the stats
+        """
+        return "\n".join(
+                f"{name:<10} removed {removed} nodes"
+                for name, removed in self.stats
+                )
@@ -1,7 +1,7 @@
-from typing import List, Union
-from dataclasses import dataclass
+from collections import deque
+from typing import List, Optional, Union
+from dataclasses import dataclass, fields
 import logs
-from logs import print_error, print_done, print_debug
 from lexer import TokenType, Token
 
 
@@ -9,13 +9,13 @@ AST_COUNT = 0
 # AST NODES
 
 AST_COUNT += 1
-@dataclass
+@dataclass(frozen=True, slots=True)
 class AST:
     """ Main AST class """
     pass
 
 AST_COUNT += 1
-@dataclass
+@dataclass(frozen=True, slots=True)
 class BinOp(AST):
     """
         AST class for operations for binary operations like:
@@ -30,7 +30,7 @@ class BinOp(AST):
     right_token: Union[AST, TokenType]
 
 AST_COUNT += 1
-@dataclass
+@dataclass(frozen=True, slots=True)
 class UnaryOp(AST):
     """
         AST class for Unary Operations
@@ -41,7 +41,7 @@ class UnaryOp(AST):
     right_token: Union[AST, TokenType]
 
 AST_COUNT += 1
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Integer(AST):
     """
         AST container for Integers
@@ -49,7 +49,7 @@ class Integer(AST):
     token: Union[AST, TokenType]
 
 AST_COUNT += 1
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Void(AST):
     """
         AST for none
@@ -57,7 +57,7 @@ class Void(AST):
     pass
 
 AST_COUNT += 1
-@dataclass
+@dataclass(frozen=True, slots=True)
 class SetVariable(AST):
     """
         AST variable for setting variables
@@ -66,7 +66,7 @@ class SetVariable(AST):
     expr: AST
 
 AST_COUNT += 1
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Variable(AST):
     """
         AST for return variable
@@ -74,7 +74,7 @@ class Variable(AST):
     token: Token
 
 AST_COUNT += 1
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Block(AST):
     """
         AST for blocks
@@ -82,7 +82,7 @@ class Block(AST):
     ast_list: List[AST]
 
 AST_COUNT += 1
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Program(AST):
     """
         AST class for whole program
@@ -90,7 +90,7 @@ class Program(AST):
     ast_list: List[AST]
 
 AST_COUNT += 1
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Bool(AST):
     """
         AST container for Boolean
@@ -98,7 +98,7 @@ class Bool(AST):
     token: Token
 
 AST_COUNT += 1
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Condition(AST):
     """
         AST for conditions
@@ -110,7 +110,7 @@ class Condition(AST):
     condition_block: Block
 
 AST_COUNT += 1
-@dataclass
+@dataclass(frozen=True, slots=True)
 class Flow(AST):
     """
         AST for if elseif else statement
@@ -120,7 +120,7 @@ class Flow(AST):
     else_block: AST
 
 AST_COUNT += 1
-@dataclass
+@dataclass(frozen=True, slots=True)
 class FunctionDecl(AST):
     """
         AST for declaring functions
@@ -130,7 +130,7 @@ class FunctionDecl(AST):
     function_block: Block
 
 AST_COUNT += 1
-@dataclass
+@dataclass(frozen=True, slots=True)
 class FunctionCall(AST):
     """
         AST for calling function
@@ -139,7 +139,7 @@ class FunctionCall(AST):
     function_variables: AST
 
 AST_COUNT += 1
-@dataclass
+@dataclass(frozen=True, slots=True)
 class ReturnStatement(AST):
     """
         AST for return statements in functions
@@ -147,7 +147,7 @@ class ReturnStatement(AST):
     expression: AST
 
 AST_COUNT += 1
-@dataclass
+@dataclass(frozen=True, slots=True)
 class While(AST):
     """
         AST for while loops
@@ -156,20 +156,78 @@ class While(AST):
     block: Block
 
 AST_COUNT += 1
-@dataclass
+@dataclass(frozen=True, slots=True)
 class String(AST):
     """
         AST container string_literals
     """
     token: AST
 
-assert AST_COUNT == 17, f"You forgot to handle an AST {AST_COUNT}"
+AST_COUNT += 1
+@dataclass(frozen=True, slots=True)
+class ListLiteral(AST):
+    """
+        AST for list literals
+        token is the LBRACKET
+    """
+    token: Token
+    elements: List[AST]
+
+AST_COUNT += 1
+@dataclass(frozen=True, slots=True)
+class Index(AST):
+    """
+        AST for reading an item of a list or a string
+    """
+    collection: AST
+    index: AST
+
+assert AST_COUNT == 19, f"You forgot to handle an AST {AST_COUNT}"
+def first_position(ast) -> Optional[int]:
+    """
+        Returns the position of the first token of the AST
+    """
+    if isinstance(ast, Token):
+        return ast.position
+    if isinstance(ast, list):
+        children = ast
+    elif isinstance(ast, AST):
+        children = [getattr(ast, child.name) for child in fields(ast)]
+    else:
+        return None
+    for child in children:
+        position = first_position(child)
+        if position is not None:
+            return position
+    return None
+def iter_nodes(ast, enter_functions=True):
+    """
+        Yields every AST in the tree, the bodies of the function
+        declarations are skipped when enter_functions is False
+    """
+    if isinstance(ast, list):
+        for child in ast:
+            yield from iter_nodes(child, enter_functions)
+        return
+    if not isinstance(ast, AST):
+        return
+    yield ast
+    if isinstance(ast, FunctionDecl) and not enter_functions:
+        return
+    for child in fields(ast):
+        yield from iter_nodes(getattr(ast, child.name), enter_functions)
 class Parser:
+    """
+        Parses any iterable of tokens, a Lexer is parsed while it lexes
+        Only the tokens that are peeked are kept in lookahead
+        The eaten tokens are traced only if the parser tracing is on when
+        it is created
+    """
     def __init__(self, tokens):
-        self.tokens = tokens
-        print_debug("="*200)
-        print_debug(*self.tokens, sep="\n")
-        print_debug("="*200)
+        if logs.enabled("parser"):
+            self.eat = self.traced_eat
+        self.tokens = iter(tokens)
+        self.lookahead = deque()
         self.position = -1
         self.current_token = None
         self.next_token()
@@ -183,33 +241,47 @@ class Parser:
             Parse the whole self.text
         """
         return self.program()
+    def read_token(self):
+        """
+            Returns the next token of the iterator, EOF when it is over
+        """
+        token = next(self.tokens, None)
+        if token is None:
+            logs.trace("parser", "done",
+                       "There are no tokens left, returning EOF")
+            return Token(TokenType.EOF, None)
+        return token
     def next_token(self):
         """
             advances and sets the current_token
         """
         self.position += 1
-        if self.position >= len(self.tokens):
-            print_done(f"Tokens of these makes the wrong {self.tokens}")
-
-        self.current_token = self.tokens[self.position]
+        if self.lookahead:
+            self.current_token = self.lookahead.popleft()
+        else:
+            self.current_token = self.read_token()
     def eat(self, token_type: TokenType):
         """
             Checks if given token is true and advances token
             else gives and error
         """
-        print_debug(self.current_token)
         if self.current_token.token_type == token_type:
             self.next_token()
         else:
             self.error(f"Unexpected token ({self.current_token}) expected ({token_type})")
+    def traced_eat(self, token_type: TokenType):
+        """
+            eat that traces the token
+        """
+        logs.trace("parser", "debug", self.current_token)
+        Parser.eat(self, token_type)
     def peek(self):
         """
             Returns the next token without advancing
         """
-        position = self.position + 1
-        if position < len(self.tokens):
-            return self.tokens[position]
-        return None
+        if not self.lookahead:
+            self.lookahead.append(self.read_token())
+        return self.lookahead[0]
     def get_ast_list(self, isfunction=False):
         """
             Returns a bundle of AST's
@@ -287,14 +359,14 @@ class Parser:
                 TokenType.TRUE,
                 TokenType.FALSE,
                 TokenType.WORD,
-                TokenType.STRING_LITERAL)
+                TokenType.STRING_LITERAL,
+                TokenType.LBRACKET)
         if self.current_token.token_type in expr:
             function_variables.append(self.logical())
         while self.current_token.token_type == TokenType.SEP:
             self.eat(TokenType.SEP)
             function_variables.append(self.expr())
         self.eat(TokenType.RPAREN)
-        print_done(function_variables)
         function_call = FunctionCall(function_name, function_variables)
         return function_call
     def variable_bundle(self):
@@ -327,7 +399,7 @@ class Parser:
         elseif_condition_list = list()
         while self.current_token.token_type == TokenType.ELSEIF:
             self.eat(TokenType.ELSEIF)
-            elseif_expr = self.expr()
+            elseif_expr = self.logical()
             elseif_block = self.block()
             elseif_condition = Condition(elseif_expr, elseif_block)
             elseif_condition_list.append(elseif_condition)
@@ -369,9 +441,7 @@ class Parser:
             Does the math and logical
         """
         node = self.expr()
-        print_error(self.current_token)
         while self.current_token.token_type in (TokenType.EQUALS, TokenType.LTHAN, TokenType.GTHAN):
-            print_error("LOGICAL")
             token = self.current_token
             if token.token_type == TokenType.EQUALS:
                 self.eat(TokenType.EQUALS)
@@ -411,7 +481,6 @@ class Parser:
         """
             Factor part of logical
         """
-        print_debug("FACTOR", self.current_token)
         if self.current_token.token_type == TokenType.INTEGER:
             token = self.current_token
             self.eat(TokenType.INTEGER)
@@ -429,11 +498,13 @@ class Parser:
             self.eat(TokenType.LPAREN)
             node = self.expr()
             self.eat(TokenType.RPAREN)
-            return node
+            return self.index(node)
         if self.current_token.token_type in (TokenType.WORD, TokenType.TRUE, TokenType.FALSE):
-            return self.get_variable()
+            return self.index(self.get_variable())
         if self.current_token.token_type == TokenType.STRING_LITERAL:
-            return self.get_variable()
+            return self.index(self.get_variable())
+        if self.current_token.token_type == TokenType.LBRACKET:
+            return self.index(self.list_literal())
         if self.current_token.token_type == TokenType.EOF:
             self.error(f"This is a empty string, current_token: {self.current_token}")
         return self.error(f"Unreachable token {self.current_token}")
@@ -461,4 +532,28 @@ class Parser:
             return String(token)
         self.eat(TokenType.WORD)
         return Variable(token)
-
+    def list_literal(self):
+        """
+            Returns the expressions separated with SEP(,) between the
+            brackets as ListLiteral
+        """
+        token = self.current_token
+        self.eat(TokenType.LBRACKET)
+        elements = list()
+        if self.current_token.token_type != TokenType.RBRACKET:
+            elements.append(self.logical())
+        while self.current_token.token_type == TokenType.SEP:
+            self.eat(TokenType.SEP)
+            elements.append(self.logical())
+        self.eat(TokenType.RBRACKET)
+        return ListLiteral(token, elements)
+    def index(self, node):
+        """
+            Returns the node with the indexes that follow it, a[1][2]
+            reads the item 2 of the item 1 of a
+        """
+        while self.current_token.token_type == TokenType.LBRACKET:
+            self.eat(TokenType.LBRACKET)
+            node = Index(node, self.logical())
+            self.eat(TokenType.RBRACKET)
+        return node
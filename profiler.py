@@ -0,0 +1,234 @@
+"""
+    Count the calls and the time of every function and the hits of the
+    statements in loops while the vm runs
+
+    The compiler only emits the PROFILE_ opcodes when it is asked to, so
+    programs that are not profiled run the same bytecode as before
+"""
+import json
+import marshal
+from time import perf_counter
+from typing import Dict, List, Tuple
+
+from lexer import get_line_column
+
+# Name of the code that runs the statements outside the functions
+PROGRAM_NAME = "<program>"
+# File name of the entries in the pstats file
+FILENAME = "<sagu>"
+
+
+class FunctionStats:
+    """
+        Counters of a function
+        calls counts every call, primitive_calls the ones that are not
+        made while the function is already running
+        inclusive time has the time of the called functions, exclusive
+        time doesn't
+    """
+    __slots__ = ("name", "position", "calls", "primitive_calls",
+                 "inclusive", "exclusive", "callers", "active")
+
+    @property
+    def key(self) -> Tuple[str, int]:
+        """
+            Returns the name and the position of the declaration, nested
+            functions of the same name are different functions
+        """
+        return self.name, self.position
+
+    def __init__(self, name, position):
+        self.name = name
+        self.position = position
+        self.calls = 0
+        self.primitive_calls = 0
+        self.inclusive = 0.0
+        self.exclusive = 0.0
+        # Key of the caller to [calls, primitive_calls, exclusive,
+        # inclusive] of the calls it made
+        self.callers: Dict[Tuple[str, int], List] = dict()
+        # How many calls of the function are running
+        self.active = 0
+
+
+class Profiler:
+    """
+        Collects the stats of a run, the vm calls enter when a function
+        starts, exit when it returns and line for the statements of loops
+        functions are found by the name and the position of their
+        declaration
+    """
+    def __init__(self, clock=perf_counter):
+        self.clock = clock
+        self.functions: Dict[Tuple[str, int], FunctionStats] = dict()
+        # Position of the statement to how many times it ran
+        self.lines: Dict[int, int] = dict()
+        # [stats, start, time of the called functions] of running calls
+        self.running: List[list] = list()
+
+    def enter(self, name, position):
+        """
+            Start timing a call of the function
+        """
+        key = name, position
+        stats = self.functions.get(key)
+        if stats is None:
+            stats = self.functions[key] = FunctionStats(name, position)
+        stats.active += 1
+        self.running.append([stats, self.clock(), 0.0])
+
+    def exit(self):
+        """
+            Stop timing the running call
+        """
+        stats, start, children = self.running.pop()
+        elapsed = self.clock() - start
+        exclusive = elapsed - children
+        stats.active -= 1
+        primitive = stats.active == 0
+        stats.calls += 1
+        stats.exclusive += exclusive
+        if primitive:
+            # Recursive calls are already in the time of the outer call
+            stats.primitive_calls += 1
+            stats.inclusive += elapsed
+        if self.running:
+            caller = self.running[-1]
+            caller[2] += elapsed
+            counters = stats.callers.setdefault(caller[0].key,
+                                                [0, 0, 0.0, 0.0])
+            counters[0] += 1
+            counters[2] += exclusive
+            if primitive:
+                counters[1] += 1
+                counters[3] += elapsed
+
+    def line(self, position):
+        """
+            Count a run of the statement at position
+        """
+        lines = self.lines
+        lines[position] = lines.get(position, 0) + 1
+
+    def finish(self):
+        """
+            Stop the calls that are still running, used when the program
+            ends with an error
+        """
+        while self.running:
+            self.exit()
+
+    def stats(self) -> List[FunctionStats]:
+        """
+            Returns the stats of the functions, the slowest first
+        """
+        return sorted(self.functions.values(),
+                      key=lambda stats: stats.exclusive, reverse=True)
+
+    def line_hits(self, text=None) -> List[Tuple[int, int]]:
+        """
+            Returns the line and the hits of the profiled lines, the
+            positions are used instead of lines when there is no text
+        """
+        hits: Dict[int, int] = dict()
+        for position, count in self.lines.items():
+            line = locate(text, position)
+            hits[line] = hits.get(line, 0) + count
+        return sorted(hits.items(), key=lambda item: (-item[1], item[0]))
+
+    def report(self, text=None) -> str:
+        """
+            Returns a readable table of the stats
+        """
+        where = "line" if text is not None else "position"
+        lines = [f"{'calls':>10} {'exclusive':>12} {'inclusive':>12}"
+                 f" {where:>8}  function"]
+        for stats in self.stats():
+            calls = str(stats.calls)
+            if stats.primitive_calls != stats.calls:
+                calls += f"/{stats.primitive_calls}"
+            lines.append(f"{calls:>10} {stats.exclusive:>12.6f}"
+                         f" {stats.inclusive:>12.6f}"
+                         f" {locate(text, stats.position):>8}  {stats.name}")
+        line_hits = self.line_hits(text)
+        if line_hits:
+            lines.append("")
+            lines.append(f"{'hits':>10} {where:>8}")
+            for line, count in line_hits:
+                lines.append(f"{count:>10} {line:>8}")
+        return "\n".join(lines)
+
+    def to_json(self, text=None) -> dict:
+        """
+            Returns the stats as a dictionary that can be dumped to json
+        """
+        return {
+                "functions": [
+                    {
+                        "name": stats.name,
+                        "line": locate(text, stats.position),
+                        "calls": stats.calls,
+                        "primitive_calls": stats.primitive_calls,
+                        "exclusive": stats.exclusive,
+                        "inclusive": stats.inclusive,
+                        "callers": [
+                            {"name": name,
+                             "line": locate(text, position),
+                             "calls": counters[0],
+                             "exclusive": counters[2],
+                             "inclusive": counters[3]}
+                            for (name, position), counters
+                            in stats.callers.items()
+                            ],
+                        }
+                    for stats in self.stats()
+                    ],
+                "lines": [
+                    {"line": line, "hits": count}
+                    for line, count in self.line_hits(text)
+                    ],
+                }
+
+    def to_pstats(self, text=None) -> dict:
+        """
+            Returns the stats in the format of cProfile, the marshal dump
+            of it can be loaded by pstats.Stats
+        """
+        keys = {
+                key: (FILENAME, locate(text, stats.position), stats.name)
+                for key, stats in self.functions.items()
+                }
+        return {
+                keys[key]: (
+                    stats.primitive_calls, stats.calls, stats.exclusive,
+                    stats.inclusive,
+                    {
+                        keys[caller]: (counters[1], counters[0],
+                                       counters[2], counters[3])
+                        for caller, counters in stats.callers.items()
+                        }
+                    )
+                for key, stats in self.functions.items()
+                }
+
+    def dump(self, path, text=None):
+        """
+            Write the stats to path, json when it ends with .json and
+            pstats otherwise
+        """
+        if path.endswith(".json"):
+            with open(path, "w") as file:
+                json.dump(self.to_json(text), file, indent=4)
+        else:
+            with open(path, "wb") as file:
+                marshal.dump(self.to_pstats(text), file)
+
+
+def locate(text, position) -> int:
+    """
+        Returns the line of the position or the position itself when
+        there is no text
+    """
+    if text is None:
+        return position
+    return get_line_column(text, position)[0]
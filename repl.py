@@ -0,0 +1,125 @@
+"""
+    Read, evaluate and print loop
+
+    Every input is lexed, parsed and compiled on its own and runs on the
+    same vm, so the variables and the functions of the inputs before it
+    are kept
+"""
+from lexer import Lexer, TokenType
+from parser import Parser, Program, ReturnStatement
+from vm import VM
+
+PROMPT = "sagu> "
+CONTINUATION_PROMPT = "....> "
+
+
+def brace_depth(text) -> int:
+    """
+        Returns how many blocks are open at the end of the text
+        Text that can't be lexed is complete, running it shows the error
+    """
+    depth = 0
+    try:
+        for token in Lexer(text):
+            if token.token_type == TokenType.BLOCK_START:
+                depth += 1
+            elif token.token_type == TokenType.BLOCK_END:
+                depth -= 1
+    except Exception:  # pylint: disable=broad-except
+        return 0
+    return depth
+
+
+class Repl:
+    """
+        Runs the inputs one after another on one vm
+        Pure functions are not cached, a later input can declare the
+        function again
+    """
+    def __init__(self):
+        self.vm = VM(Program([]), memo_size=0)
+        self.lines = list()
+
+    @property
+    def global_variables(self):
+        """
+            Returns the variables that are set by the inputs
+        """
+        return self.vm.global_variables
+
+    @property
+    def functions(self):
+        """
+            Returns the functions that are declared by the inputs
+        """
+        return self.vm.functions
+
+    def parse(self, text) -> Program:
+        """
+            Returns the program of the text, an input that is a single
+            expression returns its value
+        """
+        parser = Parser(Lexer(text))
+        try:
+            expression = parser.logical()
+        except Exception:  # pylint: disable=broad-except
+            expression = None
+        if expression is not None and \
+                parser.current_token.token_type == TokenType.EOF:
+            return Program([ReturnStatement(expression)])
+        parser = Parser(Lexer(text))
+        program = parser.parse()
+        if parser.current_token.token_type != TokenType.EOF:
+            parser.error(f"There's something wrong {parser.current_token}")
+        return program
+
+    def execute(self, text):
+        """
+            Run the text and return its value
+        """
+        self.vm.load(self.parse(text))
+        return self.vm.interpret()
+
+    def feed(self, line):
+        """
+            Add a line to the input, the input runs when its blocks are
+            closed
+            Returns if the input is complete and its value
+        """
+        self.lines.append(line)
+        text = "\n".join(self.lines)
+        if brace_depth(text) > 0:
+            return False, None
+        self.lines = list()
+        return True, self.execute(text)
+
+    def run(self):
+        """
+            Read the lines until the end of the input
+        """
+        prompt = PROMPT
+        while True:
+            try:
+                line = input(prompt)
+            except EOFError:
+                print()
+                return
+            except KeyboardInterrupt:
+                print()
+                self.lines = list()
+                prompt = PROMPT
+                continue
+            # Ctrl-C stops a running input, the variables it set are kept
+            try:
+                complete, value = self.feed(line)
+            except KeyboardInterrupt:
+                self.lines = list()
+                complete, value = True, None
+                print("\nInterrupted")
+            except Exception as error:  # pylint: disable=broad-except
+                self.lines = list()
+                complete, value = True, None
+                print(f"Error: {error}")
+            if complete and value is not None:
+                print(repr(value))
+            prompt = PROMPT if complete else CONTINUATION_PROMPT
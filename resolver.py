@@ -0,0 +1,320 @@
+"""
+    Give every variable of a scope a numeric slot before running
+
+    The program and every function declaration are scopes, a function
+    call never sees the variables of its caller so scopes don't nest.
+    Reading a variable that is never set in its scope is reported before
+    anything runs, reads that may run before the first set are marked so
+    the engines check them
+    Appends to the variables that hold strings are marked so the engines
+    build the string in place, see strings
+"""
+from typing import Dict, List, Set
+
+from parser import AST_COUNT, Bool, Program, SetVariable, iter_nodes
+from lexer import TokenType
+from strings import find_appends, joined
+
+
+class Undefined:
+    """
+        Value of the slots that are not set yet
+    """
+    def __repr__(self):
+        return "<undefined>"
+
+
+UNDEFINED = Undefined()
+
+
+class Scope:
+    """
+        Slots of a program or a function, parameters come first
+        checked has the ids of the Variable ASTs that may read UNDEFINED
+    """
+    def __init__(self, parameters: List[str]):
+        self.parameters = list(parameters)
+        self.names: List[str] = list()
+        self.slots: Dict[str, int] = dict()
+        self.checked: Set[int] = set()
+        for name in parameters:
+            self.add(name)
+
+    def add(self, name) -> int:
+        """
+            Returns the slot of the name, adds it if necessary
+        """
+        slot = self.slots.get(name)
+        if slot is None:
+            slot = len(self.names)
+            self.slots[name] = slot
+            self.names.append(name)
+        return slot
+
+    def is_checked(self, ast) -> bool:
+        """
+            Returns if the read of the Variable AST has to be checked
+        """
+        return id(ast) in self.checked
+
+    def new_variables(self) -> list:
+        """
+            Returns the slots of a new run of the scope
+        """
+        return [UNDEFINED] * len(self.names)
+
+    def to_dict(self, variables) -> dict:
+        """
+            Returns the set slots as a name to value dict
+        """
+        return {
+                name: joined(value)
+                for name, value in zip(self.names, variables)
+                if value is not UNDEFINED
+                }
+
+
+class Resolution:
+    """
+        Scopes of the program, AST nodes are not hashable so they are
+        found by their id while the program is alive
+        appends has the ids of the SetVariable ASTs that append to a
+        string and joins the ids of the Variable ASTs that read it
+    """
+    def __init__(self):
+        self.scopes: Dict[int, Scope] = dict()
+        self.appends: Set[int] = set()
+        self.joins: Set[int] = set()
+
+    def scope(self, ast) -> Scope:
+        """
+            Returns the scope of a Program or a FunctionDecl AST
+        """
+        return self.scopes[id(ast)]
+
+    def is_append(self, ast) -> bool:
+        """
+            Returns if the SetVariable AST appends to a string
+        """
+        return id(ast) in self.appends
+
+    def is_join(self, ast) -> bool:
+        """
+            Returns if the Variable AST reads a string that is appended to
+        """
+        return id(ast) in self.joins
+
+
+# Resolver
+assert AST_COUNT == 19, "You've forgotten to resolve an AST"
+
+
+class Resolver:
+    """
+        Walks every scope in the order it runs and keeps the names that
+        are surely set at each point in defined
+        predefined are the names that are set before the program runs,
+        they are the first slots of its scope
+    """
+    def __init__(self, predefined=()):
+        self.predefined = list(predefined)
+        self.resolution = Resolution()
+        self.scope = None
+        self.defined: Set[str] = set()
+        self.errors: List[str] = list()
+
+    def error(self, text):
+        """
+            Raise Error
+        """
+        raise Exception(text)
+
+    def resolve(self, program) -> Resolution:
+        """
+            Returns the scopes of the program, raises if it reads a
+            variable that is never set
+        """
+        self.visit(program)
+        if self.errors:
+            self.error("\n".join(self.errors))
+        return self.resolution
+
+    def resolve_scope(self, ast, ast_list, parameters):
+        """
+            Give the names of a scope their slots and resolve its reads
+        """
+        scope = Scope(parameters)
+        for node in iter_nodes(ast_list, enter_functions=False):
+            if isinstance(node, SetVariable):
+                scope.add(node.token.token_value)
+        self.resolution.scopes[id(ast)] = scope
+        outer = self.scope, self.defined
+        self.scope, self.defined = scope, set(parameters)
+        try:
+            for node in ast_list:
+                self.visit(node)
+        finally:
+            self.scope, self.defined = outer
+        appends, joins = find_appends(ast_list, parameters, scope)
+        self.resolution.appends |= appends
+        self.resolution.joins |= joins
+
+    def visit(self, ast):
+        """
+            Visit the AST with the related resolve_ method
+        """
+        func = getattr(self, "resolve_" + type(ast).__name__)
+        return func(ast)
+
+    def resolve_block(self, ast):
+        """
+            Resolve a block that may not run, names it sets are not
+            surely set after it
+        """
+        defined = set(self.defined)
+        self.visit(ast)
+        self.defined = defined
+
+    def resolve_Program(self, ast):
+        """
+            Resolve Program AST
+        """
+        self.resolve_scope(ast, ast.ast_list, self.predefined)
+
+    def resolve_Block(self, ast):
+        """
+            Resolve Block AST
+        """
+        for node in ast.ast_list:
+            self.visit(node)
+
+    def resolve_Void(self, ast):
+        """
+            Resolve Void AST
+        """
+
+    def resolve_Integer(self, ast):
+        """
+            Resolve Integer AST
+        """
+
+    def resolve_String(self, ast):
+        """
+            Resolve String AST
+        """
+
+    def resolve_Bool(self, ast):
+        """
+            Resolve Bool AST
+        """
+
+    def resolve_ListLiteral(self, ast):
+        """
+            Resolve ListLiteral AST
+        """
+        for element in ast.elements:
+            self.visit(element)
+
+    def resolve_Index(self, ast):
+        """
+            Resolve Index AST
+        """
+        self.visit(ast.collection)
+        self.visit(ast.index)
+
+    def resolve_Variable(self, ast):
+        """
+            Resolve Variable AST
+        """
+        name = ast.token.token_value
+        if name not in self.scope.slots:
+            self.errors.append(
+                    f"At position {ast.token.position}: variable {name} is"
+                    " never set")
+        elif name not in self.defined:
+            self.scope.checked.add(id(ast))
+
+    def resolve_SetVariable(self, ast):
+        """
+            Resolve SetVariable AST
+        """
+        self.visit(ast.expr)
+        self.defined.add(ast.token.token_value)
+
+    def resolve_BinOp(self, ast):
+        """
+            Resolve BinOp AST
+        """
+        self.visit(ast.left_token)
+        self.visit(ast.right_token)
+
+    def resolve_UnaryOp(self, ast):
+        """
+            Resolve UnaryOp AST
+        """
+        self.visit(ast.right_token)
+
+    def resolve_Condition(self, ast):
+        """
+            Resolve Condition AST
+        """
+        expr = ast.condition_expr
+        self.visit(expr)
+        if isinstance(expr, Bool) and expr.token.token_type == TokenType.TRUE:
+            self.visit(ast.condition_block)
+        else:
+            self.resolve_block(ast.condition_block)
+
+    def resolve_Flow(self, ast):
+        """
+            Resolve Flow AST
+            A name is surely set after the flow if every branch sets it
+        """
+        entry = self.defined
+        branches = list()
+        for condition in (ast.if_condition, *ast.elseif):
+            # Conditions can't set variables so every branch starts with
+            # the names of the entry
+            self.defined = set(entry)
+            self.visit(condition.condition_expr)
+            self.visit(condition.condition_block)
+            branches.append(self.defined)
+        self.defined = set(entry)
+        self.visit(ast.else_block)
+        branches.append(self.defined)
+        self.defined = set.intersection(*branches)
+
+    def resolve_While(self, ast):
+        """
+            Resolve While AST
+        """
+        self.visit(ast.expression)
+        self.resolve_block(ast.block)
+
+    def resolve_FunctionDecl(self, ast):
+        """
+            Resolve FunctionDecl AST
+        """
+        parameters = [place.token_value for place in ast.function_variables]
+        self.resolve_scope(ast, ast.function_block.ast_list, parameters)
+
+    def resolve_FunctionCall(self, ast):
+        """
+            Resolve FunctionCall AST
+        """
+        for expr in ast.function_variables:
+            self.visit(expr)
+
+    def resolve_ReturnStatement(self, ast):
+        """
+            Resolve ReturnStatement AST
+        """
+        self.visit(ast.expression)
+
+
+def resolve(program: Program, predefined=()) -> Resolution:
+    """
+        Returns the scopes of the program
+    """
+    return Resolver(predefined).resolve(program)
+
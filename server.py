@@ -0,0 +1,160 @@
+"""
+    Run programs for clients over a unix socket
+
+    A request is one line of json and so is its response, the server keeps
+    the engines imported and the parsed programs in memory so a request
+    only pays for running the program
+    Every request runs on a new engine, requests don't share variables or
+    functions
+    A request stops when it runs longer than its timeout or its client
+    disconnects, so a runaway program can't keep a slot forever
+"""
+import io
+import os
+import sys
+import json
+import select
+import signal
+import threading
+import traceback
+import socketserver
+from time import perf_counter
+
+import cache
+from main import make_interpreter, parse
+from interpreter import CONSOLE
+from limits import Budget
+from memo import DEFAULT_MEMO_SIZE, MISSING, LRUCache
+from optimizer import OPTIMIZATION_LEVELS
+
+DEFAULT_CONCURRENCY = 4
+# Seconds a request runs when neither it nor the server sets a timeout
+DEFAULT_TIMEOUT = 60.0
+# How many parsed programs are kept
+DEFAULT_PROGRAM_CACHE_SIZE = 256
+
+
+class Handler(socketserver.StreamRequestHandler):
+    """
+        Reads a request and writes its response
+    """
+    def handle(self):
+        line = self.rfile.readline()
+        # The client may close its writing side after the request, only a
+        # hang up means it is gone
+        poller = select.poll()
+        poller.register(self.connection, 0)
+        def disconnected():
+            return bool(poller.poll(0))
+        try:
+            response = self.server.execute(json.loads(line), disconnected)
+        except Exception as error:  # pylint: disable=broad-except
+            response = {"status": 2, "stdout": "",
+                        "stderr": f"Bad request: {error!r}\n",
+                        "result": None, "seconds": 0.0}
+        try:
+            self.wfile.write(json.dumps(response).encode() + b"\n")
+        except OSError:
+            # Nobody is waiting for the response
+            pass
+
+
+class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """
+        Runs at most concurrency requests at the same time, the others
+        wait for a slot
+        max_steps and timeout are the limits of the requests that don't
+        set their own, a timeout of None is DEFAULT_TIMEOUT
+    """
+    daemon_threads = True
+
+    def __init__(self, path, concurrency=DEFAULT_CONCURRENCY,
+                 program_cache_size=DEFAULT_PROGRAM_CACHE_SIZE,
+                 max_steps=None, timeout=None):
+        self.slots = threading.BoundedSemaphore(concurrency)
+        self.max_steps = max_steps
+        self.timeout = DEFAULT_TIMEOUT if timeout is None else timeout
+        self.programs = LRUCache(program_cache_size)
+        self.programs_lock = threading.Lock()
+        super().__init__(path, Handler)
+
+    def program(self, text, passes):
+        """
+            Returns the parsed program of the text
+        """
+        key = cache.cache_key(text, passes)
+        with self.programs_lock:
+            program = self.programs.get(key)
+        if program is MISSING:
+            program = parse(text, passes)
+            with self.programs_lock:
+                self.programs.put(key, program)
+        return program
+
+    def execute(self, request, cancelled=None) -> dict:
+        """
+            Run the source or the file at the path of the request with
+            its stdin and returns what it wrote, its value and the time
+            it took
+            The request stops when cancelled returns True
+        """
+        if "source" in request:
+            text = request["source"]
+        else:
+            with open(request["path"]) as file:
+                text = file.read()
+        passes = request.get("passes")
+        if passes is None:
+            passes = OPTIMIZATION_LEVELS[request.get("optimization", 0)]
+        engine = request.get("engine", "walker")
+        memo_size = request.get("memo_size", DEFAULT_MEMO_SIZE)
+        max_steps = request.get("max_steps")
+        if max_steps is None:
+            max_steps = self.max_steps
+        timeout = request.get("timeout")
+        if timeout is None:
+            timeout = self.timeout
+        stdout = io.StringIO()
+        stderr = io.StringIO()
+        stdin = io.StringIO(request.get("stdin", ""))
+        status = 0
+        result = None
+        with self.slots:
+            start = perf_counter()
+            # print and input of the request use its own streams, sys is
+            # left alone
+            with CONSOLE.redirect(stdout, stdin):
+                try:
+                    program = self.program(text, tuple(passes))
+                    interpreter = make_interpreter(
+                            program, engine, text, memo_size,
+                            budget=Budget(max_steps, timeout, cancelled))
+                    result = interpreter.interpret()
+                except Exception:  # pylint: disable=broad-except
+                    traceback.print_exc(file=stderr)
+                    status = 1
+            seconds = perf_counter() - start
+        if not isinstance(result, (int, str, type(None))):
+            result = repr(result)
+        return {"status": status, "stdout": stdout.getvalue(),
+                "stderr": stderr.getvalue(), "result": result,
+                "seconds": seconds}
+
+
+def serve(path, concurrency=DEFAULT_CONCURRENCY, max_steps=None,
+          timeout=None):
+    """
+        Serve requests on the socket at path until interrupted
+    """
+    if os.path.exists(path):
+        # Left by a server that didn't stop cleanly
+        os.unlink(path)
+    server = Server(path, concurrency, max_steps=max_steps, timeout=timeout)
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        os.unlink(path)
@@ -0,0 +1,182 @@
+"""
+    Build strings in place
+
+    var s = s + t copies s, a loop that appends to a string is quadratic
+    in its length. The variables that only hold strings and are appended
+    to keep a StringBuilder instead, it saves the parts and joins them
+    when the variable is read
+    Only the appends and len and substr see the StringBuilder, every
+    other read gets the string
+"""
+from typing import Dict, List, Set, Tuple
+
+from parser import (
+        BinOp, FunctionCall, SetVariable, String, Variable, iter_nodes,
+        )
+from lexer import TokenType
+
+# Built-in functions that take a StringBuilder as their first argument
+BUILDER_FUNCTIONS = ("len", "substr")
+# Built-in functions that return strings
+STRING_FUNCTIONS = ("substr", "join", "input")
+
+
+class StringBuilder:
+    """
+        A string kept as its parts, length is the length of the string
+    """
+    __slots__ = ("parts", "length")
+
+    def __init__(self, parts: List[str]):
+        self.parts = parts
+        self.length = sum(map(len, parts))
+
+    def __repr__(self):
+        return repr(self.flatten())
+
+    def append(self, text):
+        """
+            Append the text to the end
+        """
+        self.parts.append(text)
+        self.length += len(text)
+
+    def flatten(self) -> str:
+        """
+            Returns the string, the parts are joined into one so the next
+            read doesn't join them again
+        """
+        parts = self.parts
+        if len(parts) == 1:
+            return parts[0]
+        text = "".join(parts)
+        self.parts = [text]
+        return text
+
+
+def concat(left, right):
+    """
+        Returns left + right, appending a string to a string returns a
+        StringBuilder and appending to a StringBuilder changes it
+    """
+    if type(right) is str:
+        if type(left) is StringBuilder:
+            left.append(right)
+            return left
+        if type(left) is str:
+            return StringBuilder([left, right])
+    return joined(left) + right
+
+
+def joined(value):
+    """
+        Returns the string of a StringBuilder, other values as they are
+    """
+    if type(value) is StringBuilder:
+        return value.flatten()
+    return value
+
+
+def length(value) -> int:
+    """
+        Returns the length of the value, a StringBuilder isn't joined
+    """
+    if type(value) is StringBuilder:
+        return value.length
+    return len(value)
+
+
+def substr(text, start, count=None) -> str:
+    """
+        Returns count characters of the text from start, the rest of the
+        text when count is not given
+    """
+    text = joined(text)
+    if not isinstance(text, str):
+        raise Exception(f"substr takes a string but {text!r} was given")
+    if count is None:
+        return text[start:]
+    return text[start:start + count]
+
+
+def join(values, separator="") -> str:
+    """
+        Returns the items of the list as strings with the separator
+        between them
+    """
+    if not isinstance(values, list):
+        raise Exception(f"join takes a list but {values!r} was given")
+    return separator.join(map(str, values))
+
+
+def is_string(ast, strings) -> bool:
+    """
+        Returns if the expression is surely a string or an error, strings
+        are the names of the variables that only hold strings
+    """
+    if isinstance(ast, String):
+        return True
+    if isinstance(ast, Variable):
+        return ast.token.token_value in strings
+    if isinstance(ast, FunctionCall):
+        return ast.function_name.token_value in STRING_FUNCTIONS
+    if isinstance(ast, BinOp) and ast.op_token.token_type == TokenType.PLUS:
+        # A string plus anything else is an error
+        return is_string(ast.left_token, strings) or \
+            is_string(ast.right_token, strings)
+    return False
+
+
+def is_append(ast) -> bool:
+    """
+        Returns if the SetVariable AST is var name = name + expression
+    """
+    expr = ast.expr
+    return isinstance(expr, BinOp) and \
+        expr.op_token.token_type == TokenType.PLUS and \
+        isinstance(expr.left_token, Variable) and \
+        expr.left_token.token.token_value == ast.token.token_value
+
+
+def find_appends(ast_list, parameters, scope) -> Tuple[Set[int], Set[int]]:
+    """
+        Returns the ids of the SetVariable ASTs of the scope that append
+        to a string and the ids of the Variable ASTs that join it
+        A variable holds only strings if every set of it is a string,
+        parameters may hold anything
+    """
+    assignments: Dict[str, List[SetVariable]] = dict()
+    for node in iter_nodes(ast_list, enter_functions=False):
+        if isinstance(node, SetVariable):
+            assignments.setdefault(node.token.token_value, list()).append(node)
+    strings = set(assignments) - set(parameters)
+    changed = True
+    while changed:
+        changed = False
+        for name in list(strings):
+            if not all(is_string(node.expr, strings)
+                       for node in assignments[name]):
+                strings.discard(name)
+                changed = True
+    appends = set()
+    builders = set()
+    for name in strings:
+        for node in assignments[name]:
+            # The append reads the variable, it has to be set before
+            if is_append(node) and not scope.is_checked(node.expr.left_token):
+                appends.add(id(node))
+                builders.add(name)
+    joins = set()
+    if not builders:
+        return appends, joins
+    skipped = set()
+    for node in iter_nodes(ast_list, enter_functions=False):
+        if id(node) in appends:
+            skipped.add(id(node.expr.left_token))
+        elif isinstance(node, FunctionCall) and node.function_variables and \
+                node.function_name.token_value in BUILDER_FUNCTIONS:
+            skipped.add(id(node.function_variables[0]))
+        elif isinstance(node, Variable) and id(node) not in skipped and \
+                node.token.token_value in builders:
+            joins.add(id(node))
+    return appends, joins
@@ -0,0 +1,63 @@
+from typing import List
+from lexer import Token, Lexer, TokenType
+from logs import print_info
+from parser import Parser
+from arena import Arena
+from main import ENGINES, load_engine
+
+def lex_to_tokens(text) -> List[Token]:
+    lexer = Lexer(text)
+    token = lexer.get_next_token()
+    tokens = list([token])
+    while token.token_type != TokenType.EOF:
+        token = lexer.get_next_token()
+        tokens.append(token)
+    return tokens
+
+def run(engine, program):
+    interpreter = engine(program)
+    result = interpreter.interpret()
+    return result, interpreter.global_variables
+
+def test_arena_round_trip():
+    strings = [
+        "",
+        "var hesa = 3 * true + -false",
+        'var a = "x" + "y" var b = a == "xy" var c = 1 var d = "1"',
+        "var hesa = 1 + 2 * 3 if hesa < 7 {var a = 1} elseif hesa == 7 {var a = 2} else {var a = 3}",
+        "func hesa (a, b) {var a = 12 return a + b} var a = hesa(12 + 23, true) {var b = a}",
+        """func sumn(count) {
+            var sum = 0
+            var counter = 0
+            while counter < count {
+                var counter = counter + 1
+                var sum = counter + sum
+            }
+            return sum
+        }
+        var sum = sumn(10)""",
+        "var a = [1, [2, 3], []] var b = a[1][0] var c = len(a)",
+    ]
+    for string in strings:
+        print_info(f"Testing string({string})")
+        program = Parser(lex_to_tokens(string)).parse()
+        arena = Arena.from_program(program)
+        rebuilt = arena.to_program()
+        assert rebuilt == program
+        # Token doesn't compare positions
+        assert [ast.token.position for ast in rebuilt.ast_list if hasattr(ast, "token")] ==\
+                [ast.token.position for ast in program.ast_list if hasattr(ast, "token")]
+        for name in ENGINES:
+            engine = load_engine(name)
+            assert run(engine, rebuilt) == run(engine, program), (name, string)
+
+def test_arena_literals():
+    program = Parser(lex_to_tokens('var a = 1 var b = "1" var c = true var d = 1')).parse()
+    arena = Arena.from_program(program)
+    # Equal values are saved once
+    assert arena.literals == ["a", 1, "b", "1", "c", "true", "d"]
+    assert arena.to_program().ast_list[1].token.position == 14
+
+if __name__ == "__main__":
+    test_arena_round_trip()
+    test_arena_literals()
@@ -0,0 +1,36 @@
+import pytest
+from arrays import add_each, mul_each, sort, total
+from main import parse, load_engine
+
+ENGINES = ["walker", "vm", "closure", "python"]
+
+def run(engine, string):
+    interpreter = load_engine(engine)(parse(string))
+    interpreter.interpret()
+    return interpreter.global_variables
+
+def test_arrays_builtins():
+    assert total([1, 2, 3]) == 6
+    assert add_each([1, 2], [10, 20]) == [11, 22]
+    assert add_each(["a", "b"], "!") == ["a!", "b!"]
+    assert mul_each([1, 2], 3) == [3, 6]
+    assert sort([3, 1, 2]) == [1, 2, 3]
+    with pytest.raises(Exception, match="same length"):
+        add_each([1], [1, 2])
+    with pytest.raises(Exception, match="takes a list"):
+        total(3)
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_arrays_engines(engine):
+    string = """var scores = muleach(range(5), 10)
+    var top = sort(addeach(scores, [5, 4, 3, 2, 1]))
+    var best = top[len(top) - 1]
+    var total = sum(top)
+    var nested = [[1, 2], [3, 4]][1]"""
+    assert run(engine, string) == {
+            "scores": [0, 10, 20, 30, 40],
+            "top": [5, 14, 23, 32, 41],
+            "best": 41,
+            "total": 115,
+            "nested": [3, 4],
+            }
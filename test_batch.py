@@ -0,0 +1,20 @@
+import pytest
+from batch import run_files
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_batch_runs_in_order(tmp_path, jobs):
+    paths = list()
+    for number in range(5):
+        path = tmp_path / f"program{number}.sg"
+        path.write_text(f"var a = {number} * 2 print(a)")
+        paths.append(str(path))
+    bad = tmp_path / "bad.sg"
+    bad.write_text("print(b)")
+    paths.insert(2, str(bad))
+    results = list(run_files(paths, jobs, engine="vm", use_cache=False))
+    assert [result.path for result in results] == paths
+    assert [result.status for result in results] == [0, 0, 1, 0, 0, 0]
+    assert [result.stdout for result in results] ==\
+            ["0\n", "2\n", "", "4\n", "6\n", "8\n"]
+    assert "variable b is never set" in results[2].stderr
+    assert all(result.seconds >= 0 for result in results)
@@ -0,0 +1,56 @@
+from logs import print_info
+import cache
+import main
+
+def test_cache_round_trip(tmp_path):
+    string = 'func hesa (a, b) {return a + b} var a = hesa(12, true) var b = "x"'
+    print_info(f"Testing string({string})")
+    program = main.parse(string)
+    path = str(tmp_path / "test.sgc")
+    key = cache.cache_key(string)
+    assert cache.load(path, key) is None
+    cache.store(path, key, program)
+    assert cache.load(path, key) == program
+    # Another source, other passes or a broken file are misses
+    assert cache.load(path, cache.cache_key(string + " ")) is None
+    assert cache.cache_key(string, ["fold"]) != key
+    # Positions of the bytes are byte offsets
+    assert cache.cache_key(string.encode()) != key
+    (tmp_path / "test.sgc").write_bytes(b"broken")
+    assert cache.load(path, key) is None
+
+def test_cache_skips_parser(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "CACHE_MIN_SIZE", 0)
+    source = tmp_path / "test.sg"
+    string = "var a = 1 + 2"
+    source.write_text(string)
+    program = main.parse_cached(str(source), string, ["fold"])
+    assert (tmp_path / cache.CACHE_DIRECTORY).is_dir()
+    def fail(*args):
+        raise AssertionError("The program wasn't loaded from the cache")
+    monkeypatch.setattr(main, "parse", fail)
+    assert main.parse_cached(str(source), string, ["fold"]) == program
+    # The cache directory can be anywhere
+    directory = tmp_path / "cache"
+    monkeypatch.undo()
+    monkeypatch.setattr(main, "CACHE_MIN_SIZE", 0)
+    main.parse_cached(str(source), string, cache_dir=str(directory))
+    assert len(list(directory.iterdir())) == 1
+
+def test_cache_keeps_modes_apart(tmp_path, monkeypatch):
+    monkeypatch.setattr(main, "CACHE_MIN_SIZE", 0)
+    source = tmp_path / "test.sg"
+    string = 'var s = "ééééé" var x = 1'
+    source.write_text(string)
+    # The bytes parse has byte offsets, the str parse must not get them
+    main.parse_cached(str(source), string.encode())
+    assert main.parse_cached(str(source), string) == main.parse(string)
+    assert main.parse_cached(str(source), string.encode()) == \
+        main.parse(string.encode())
+
+def test_cache_skips_short_sources(tmp_path):
+    source = tmp_path / "test.sg"
+    string = "var a = 1 + 2"
+    source.write_text(string)
+    assert main.parse_cached(str(source), string) == main.parse(string)
+    assert not (tmp_path / cache.CACHE_DIRECTORY).exists()
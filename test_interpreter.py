@@ -1,9 +1,10 @@
+import io
 import pytest
 from typing import List
 from lexer import Token, Lexer, TokenType
 from logs import print_info, print_debug, print_error
 from parser import Parser
-from interpreter import Interpreter
+from interpreter import CONSOLE, Interpreter
 
 def lex_to_tokens(text) -> List[Token]:
     lexer = Lexer(text)
@@ -158,9 +159,84 @@ def test_interpreter_tokens():
     # Test input built in function
     string = 'var a = input("What\'s your name") print("Hello", a)'
     print_info(f"Testing string({string})")
-    interpret(string)
+    stdout = io.StringIO()
+    with CONSOLE.redirect(stdout, io.StringIO("Sagu\n")):
+        interpret(string)
+    assert stdout.getvalue() == "What's your nameHello Sagu\n"
 
+def test_interpreter_frames():
+    string = """
+    func outer(a) {
+        func inner(b) {
+            return b * 2
+        }
+        var c = inner(a) + 1
+        return c
+    }
+    var a = 1
+    var b = outer(20)
+    var c = outer(a)
+    """
+    interpreter = Interpreter(Parser(lex_to_tokens(string)).parse())
+    interpreter.interpret()
+    # Calls don't leak their variables or functions
+    assert interpreter.global_variables == {"a": 1, "b": 41, "c": 3}
+    assert list(interpreter.functions) == ["outer"]
+    assert interpreter.frame.variables is interpreter.global_variables
+    # Calls see the functions declared in them and where their function
+    # was declared, nested declarations don't replace the outer ones
+    string = """
+    func outer() {func g() {return 1} return g()}
+    func g() {return 2}
+    func count(n) {
+        var result = 0
+        if n > 0 {var result = count(n - 1) + 1}
+        return result
+    }
+    var a = outer() var b = g() var c = count(5)
+    """
+    interpreter = Interpreter(Parser(lex_to_tokens(string)).parse())
+    interpreter.interpret()
+    assert interpreter.global_variables == {"a": 1, "b": 2, "c": 5}
+    # The functions declared in another call are not seen
+    string = "func f() {func h() {return 1}} func g() {return h()} f() var a = g()"
+    with pytest.raises(Exception, match="no function named h"):
+        Interpreter(Parser(lex_to_tokens(string)).parse()).interpret()
+
+def test_interpreter_quickening():
+    string = """
+    func twice(a) {
+        return a + a
+    }
+    func next(a) {
+        return a + 1
+    }
+    var i = 0
+    var total = 0
+    while i < 40 {
+        var total = total + next(i) + twice(i)
+        if i == 19 {
+            func next(a) {
+                return a + 2
+            }
+        }
+        var i = i + 1
+    }
+    var word = twice("ab")
+    """
+    interpreter = Interpreter(Parser(lex_to_tokens(string)).parse())
+    interpreter.interpret()
+    # The call site finds the new next after it is declared
+    assert interpreter.global_variables == {
+            "i": 40, "total": 20 + 40 + 1560 + 780, "word": "abab"}
+    # Every int BinOp that ran 16 times is quickened, a + a of twice is
+    # deoptimized by the string
+    assert len(interpreter.quickened) == 7
+    twice = interpreter.functions["twice"].function_block.ast_list[0]
+    assert id(twice.expression) not in interpreter.quickened
 
 
 if __name__ == "__main__":
     test_interpreter_tokens()
+    test_interpreter_frames()
+    test_interpreter_quickening()
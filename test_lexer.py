@@ -1,5 +1,6 @@
 from typing import List
-from lexer import Token, Lexer, TokenType
+import mmap
+from lexer import Token, Lexer, BytesLexer, TokenType
 from logs import print_info
 def lex_to_tokens(text) -> List[Token]:
     lexer = Lexer(text)
@@ -134,6 +135,60 @@ def test_lexer_tokens():
     tokenize(string)
 
 
+def test_lexer_values():
+    string = 'var a1 = 12 == "x\\"y\\n" ,"z"'
+    tokens = [(token.token_type, token.token_value, token.position)
+              for token in lex_to_tokens(string)]
+    assert tokens == [
+            (TokenType.SETVAR, "var", 0),
+            (TokenType.WORD, "a1", 4),
+            (TokenType.SET, "=", 7),
+            (TokenType.INTEGER, 12, 9),
+            (TokenType.EQUALS, "==", 12),
+            (TokenType.STRING_LITERAL, 'x"y\n', 15),
+            (TokenType.SEP, ",", 24),
+            (TokenType.STRING_LITERAL, "z", 25),
+            ]
+
+    tokens = [token.token_type for token in lex_to_tokens("a[1, 2]")]
+    assert tokens == [TokenType.WORD, TokenType.LBRACKET, TokenType.INTEGER,
+                      TokenType.SEP, TokenType.INTEGER, TokenType.RBRACKET]
+
+    # Unterminated strings end with the text
+    assert lex_to_tokens('"abc')[0].token_value == "abc"
+
+    # The end of the text is always EOF
+    lexer = Lexer("a")
+    lexer.get_next_token()
+    assert lexer.get_next_token().token_type == TokenType.EOF
+    assert lexer.get_next_token().token_type == TokenType.EOF
+
+def test_bytes_lexer(tmp_path):
+    string = 'func çarp(a) {return a * 2} var b = "é\\n\\"x" print(çarp(3), b)'
+    values = [(token.token_type, token.token_value) for token in Lexer(string)]
+    path = tmp_path / "test.sg"
+    path.write_bytes(string.encode())
+    with open(path, "rb") as file:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            tokens = list(BytesLexer(buffer))
+    assert [(token.token_type, token.token_value) for token in tokens] == values
+    # Positions are byte offsets
+    assert tokens[2].position == len("func çarp".encode())
+
+def test_print_tokens_streams(tmp_path, capsys):
+    from main import print_the_tokens
+    path = tmp_path / "program.sg"
+    path.write_text("var a = 1 $")
+    for use_mmap in (False, True):
+        # The tokens before the error are printed before it is raised
+        try:
+            print_the_tokens(str(path), use_mmap)
+        except Exception:
+            pass
+        output = capsys.readouterr().out.splitlines()
+        assert output[0] == "TOKENS"
+        assert len(output) == 5, use_mmap
 
 if __name__ == "__main__":
     test_lexer_tokens()
+    test_lexer_values()
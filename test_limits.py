@@ -0,0 +1,85 @@
+import pytest
+from typing import List
+from lexer import Token, Lexer, TokenType
+from parser import Parser
+from interpreter import Interpreter
+from vm import VM
+from closure import ClosureInterpreter
+from transpiler import PythonInterpreter
+from limits import Budget, ExecutionLimitExceeded
+import limits
+
+ENGINES = [Interpreter, VM, ClosureInterpreter, PythonInterpreter]
+
+def lex_to_tokens(text) -> List[Token]:
+    lexer = Lexer(text)
+    token = lexer.get_next_token()
+    tokens = list([token])
+    while token.token_type != TokenType.EOF:
+        token = lexer.get_next_token()
+        tokens.append(token)
+    return tokens
+
+def run(engine, string, budget):
+    parser = Parser(lex_to_tokens(string))
+    interpreter = engine(parser.parse(), memo_size=0, budget=budget)
+    return interpreter.interpret(), interpreter.global_variables
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_limits_count_loops_and_calls(engine):
+    string = "func f(a) {return a + 1} var i = 0 while i < 10 {var i = f(i)}"
+    budget = Budget(max_steps=20)
+    assert run(engine, string, budget)[1]["i"] == 10
+    # Every iteration and every call is a step
+    assert budget.steps == 20
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_limits_max_steps(engine):
+    budget = Budget(max_steps=100)
+    with pytest.raises(ExecutionLimitExceeded) as error:
+        run(engine, "var i = 0 while true {var i = i + 1}", budget)
+    assert error.value.steps == 101
+    assert "101 steps" in str(error.value)
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_limits_recursion(engine):
+    if engine is Interpreter:
+        # Functions of the walker can't call themselves
+        return
+    string = "func f(a) {return f(a + 1)} var b = f(0)"
+    with pytest.raises(ExecutionLimitExceeded) as error:
+        run(engine, string, Budget(max_steps=50))
+    assert error.value.steps == 51
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_limits_timeout(engine, monkeypatch):
+    now = [0.0]
+    def clock():
+        now[0] += 1.0
+        return now[0]
+    monkeypatch.setattr(limits, "monotonic", clock)
+    monkeypatch.setattr(limits, "CLOCK_INTERVAL", 10)
+    budget = Budget(timeout=2.5)
+    with pytest.raises(ExecutionLimitExceeded) as error:
+        run(engine, "while true {}", budget)
+    # The clock is read when starting and every 10 steps
+    assert error.value.steps == 20
+    assert "2.5 seconds" in str(error.value)
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_limits_cancelled(engine, monkeypatch):
+    monkeypatch.setattr(limits, "CLOCK_INTERVAL", 10)
+    calls = list()
+    def cancelled():
+        calls.append(True)
+        return len(calls) > 3
+    with pytest.raises(ExecutionLimitExceeded) as error:
+        run(engine, "while true {}", Budget(cancelled=cancelled))
+    # It is called when starting and every 10 steps
+    assert error.value.steps == 30
+    assert "cancelled" in str(error.value)
+
+def test_limits_without_budget():
+    string = "var i = 0 while i < 1000 {var i = i + 1}"
+    for engine in ENGINES:
+        assert run(engine, string, None)[1] == {"i": 1000}
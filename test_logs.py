@@ -0,0 +1,76 @@
+import io
+import os
+import subprocess
+import sys
+from typing import List
+from lexer import Token, Lexer, TokenType
+import logs
+from parser import Parser
+from interpreter import Interpreter
+
+def lex_to_tokens(text) -> List[Token]:
+    lexer = Lexer(text)
+    token = lexer.get_next_token()
+    tokens = list([token])
+    while token.token_type != TokenType.EOF:
+        token = lexer.get_next_token()
+        tokens.append(token)
+    return tokens
+
+def test_trace_off():
+    logs.configure()
+    called = list()
+    logs.trace("walker", "error", lambda: called.append(True))
+    assert not called
+    parser = Parser(lex_to_tokens("var a = 1"))
+    assert "eat" not in vars(parser)
+    assert "walk" not in vars(Interpreter(parser.parse()))
+
+def test_trace_levels_and_categories():
+    logs.configure("info", ["cache"], buffer_size=10, echo=False)
+    try:
+        assert logs.enabled("cache", "info")
+        assert logs.enabled("cache", "error")
+        assert not logs.enabled("cache", "debug")
+        assert not logs.enabled("walker", "error")
+        logs.trace("cache", "debug", "hidden")
+        logs.trace("walker", "info", "hidden")
+        logs.trace("cache", "info", lambda: "shown", 1)
+        assert list(logs.BUFFER) == [("cache", "info", "shown 1")]
+    finally:
+        logs.configure()
+
+def test_trace_buffer():
+    logs.configure("debug", buffer_size=3, echo=False)
+    try:
+        interpreter = Interpreter(Parser(lex_to_tokens("var a = 1")).parse())
+        interpreter.interpret()
+        assert len(logs.BUFFER) == 3
+        output = io.StringIO()
+        logs.dump(output)
+        assert output.getvalue().splitlines() == [
+                "[DEBUG] walker: walk_Program",
+                "[DEBUG] walker: walk_SetVariable",
+                "[DEBUG] walker: walk_Integer",
+                ]
+        assert not logs.BUFFER
+    finally:
+        logs.configure()
+
+def test_trace_buffer_dumped_on_failure(tmp_path):
+    main = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+    good = tmp_path / "good.sg"
+    good.write_text("var a = 1")
+    bad = tmp_path / "bad.sg"
+    bad.write_text("print(b)")
+    def run(*arguments):
+        return subprocess.run([sys.executable, main, "--trace-buffer", "10",
+                               "--no-cache", *arguments],
+                              capture_output=True, text=True)
+    # A batch that succeeds exits with 0 and keeps its traces
+    result = run("--jobs", "1", str(good))
+    assert result.returncode == 0
+    assert "[DEBUG]" not in result.stderr
+    result = run(str(bad))
+    assert result.returncode != 0
+    assert "[DEBUG]" in result.stderr
@@ -0,0 +1,83 @@
+import pytest
+from typing import List
+from lexer import Token, Lexer, TokenType
+from logs import print_info
+from parser import Parser
+from memo import Memo, find_pure_functions
+from vm import VM
+from closure import ClosureInterpreter
+from transpiler import PythonInterpreter
+
+def lex_to_tokens(text) -> List[Token]:
+    lexer = Lexer(text)
+    token = lexer.get_next_token()
+    tokens = list([token])
+    while token.token_type != TokenType.EOF:
+        token = lexer.get_next_token()
+        tokens.append(token)
+    return tokens
+
+def parse(string):
+    print_info(f"Testing string({string})")
+    return Parser(lex_to_tokens(string)).parse()
+
+FIB = """
+func fib(n) {
+    var r = n
+    if n > 1 {
+        var r = fib(n - 1) + fib(n - 2)
+    }
+    return r
+}
+var a = fib(80)
+"""
+
+def test_pure_functions():
+    program = parse("""
+    func a(x) {return x * 2}
+    func b(x) {return a(x) + c(x)}
+    func c(x) {return x}
+    func d(x) {print(x)}
+    func e(x) {return d(x)}
+    func f(x) {func g(y) {return y} return x}
+    func h(x) {return h(x)}
+    func i(x) {return x}
+    func i(x) {return x + 1}
+    func j(x) {return k(x)}
+    """)
+    assert find_pure_functions(program) == {"a", "b", "c", "g", "h"}
+
+@pytest.mark.parametrize("engine", [VM, ClosureInterpreter, PythonInterpreter])
+def test_memoized_recursion(engine):
+    interpreter = engine(parse(FIB))
+    interpreter.interpret()
+    assert interpreter.global_variables["a"] == 23416728348467685
+    (name, hits, misses, size), = interpreter.memo.stats()
+    assert (name, hits, misses, size) == ("fib", 78, 81, 81)
+
+@pytest.mark.parametrize("engine", [VM, ClosureInterpreter, PythonInterpreter])
+def test_memo_types(engine):
+    # true and 1 are equal but they are not the same argument
+    interpreter = engine(parse("func f(x) {return x} var a = f(1) var b = f(true) var c = f(1)"))
+    interpreter.interpret()
+    assert interpreter.global_variables == {"a": 1, "b": True, "c": 1}
+    assert isinstance(interpreter.global_variables["b"], bool)
+    assert interpreter.memo.stats() == [("f", 1, 2, 2)]
+
+def test_memo_size():
+    memo = Memo(2)
+    calls = list()
+    square = memo.wrap("square", lambda x: calls.append(x) or x * x)
+    assert memo.wrap("square", None) is square
+    for x in (1, 2, 1, 3, 2, 1):
+        square(x)
+    # 2 is evicted by 3 since 1 is used after it
+    assert calls == [1, 2, 3, 2, 1]
+    assert memo.stats() == [("square", 1, 5, 2)]
+    # Unhashable arguments are not cached
+    assert memo.wrap("first", lambda x: x[0])([4]) == 4
+    assert Memo(0).wrap("square", abs) is abs
+
+if __name__ == "__main__":
+    test_pure_functions()
+    test_memo_size()
@@ -0,0 +1,96 @@
+from typing import List
+from lexer import Token, Lexer, TokenType
+from logs import print_info
+from parser import Parser, Integer, String, Bool, Block
+from interpreter import Interpreter
+from optimizer import PassManager, OPTIMIZATION_LEVELS, count_nodes
+
+def lex_to_tokens(text) -> List[Token]:
+    lexer = Lexer(text)
+    token = lexer.get_next_token()
+    tokens = list([token])
+    while token.token_type != TokenType.EOF:
+        token = lexer.get_next_token()
+        tokens.append(token)
+    return tokens
+
+def optimize(string, passes):
+    print_info(f"Testing string({string})")
+    program = Parser(lex_to_tokens(string)).parse()
+    pass_manager = PassManager(passes)
+    return pass_manager.run(program), pass_manager.stats
+
+def run(program):
+    interpreter = Interpreter(program)
+    interpreter.interpret()
+    return interpreter.global_variables
+
+def test_constant_folding():
+    program, stats = optimize('var a = 2 * (3 + 4) - -1 var b = "a" + "b" var c = 3 * true + false var d = 1 < 2', ["fold"])
+    a, b, c, d = program.ast_list
+    assert isinstance(a.expr, Integer) and a.expr.token.token_value == 15
+    assert isinstance(b.expr, String) and b.expr.token.token_value == "ab"
+    assert isinstance(c.expr, Integer) and c.expr.token.token_value == 3
+    assert isinstance(d.expr, Bool) and d.expr.token.token_type == TokenType.TRUE
+    assert stats[0][0] == "fold" and stats[0][1] > 0
+
+    # Failing operations are left for the engine
+    program, _ = optimize('var a = 1 / 0 var b = "a" - 1', ["fold"])
+    assert not isinstance(program.ast_list[0].expr, Integer)
+    assert not isinstance(program.ast_list[1].expr, String)
+
+def test_constant_propagation():
+    program, _ = optimize("var a = 2 var b = a * 3 var c = 1 var c = c + 1 func f(a) {var b = a}", ["propagate", "fold"])
+    assert program.ast_list[1].expr.token.token_value == 6
+    # Assigned twice
+    assert not isinstance(program.ast_list[3].expr, Integer)
+    # Parameters hide the variables of the program
+    function = program.ast_list[4]
+    assert not isinstance(function.function_block.ast_list[0].expr, Integer)
+
+def test_dead_branch_elimination():
+    program, _ = optimize("if false {var a = 1} elseif true {var a = 2} else {var a = 3} while false {var b = 1}", ["branches"])
+    assert len(program.ast_list) == 1 and isinstance(program.ast_list[0], Block)
+    assert program.ast_list[0].ast_list[0].expr.token.token_value == 2
+
+    program, _ = optimize("var a = true if false {var b = 1} elseif a {var b = 2} elseif false {var b = 3} elseif true {var b = 4} elseif a {var b = 5}", ["branches"])
+    flow = program.ast_list[1]
+    assert flow.elseif == []
+    assert flow.else_block.condition_block.ast_list[0].expr.token.token_value == 4
+
+def test_dead_function_elimination():
+    program, stats = optimize("func a() {var x = 1} func b() {var x = c()} func c() {var x = 1} func d() {var x = d()} var x = b()", ["functions"])
+    names = [ast.function_name.token_value for ast in program.ast_list[:-1]]
+    assert names == ["b", "c"]
+    assert stats == [("functions", count_nodes(Parser(lex_to_tokens("func a() {var x = 1} func d() {var x = d()}")).parse()) - 1)]
+
+def test_optimized_same_results():
+    strings = [
+        "var hesa = 3 * true + false",
+        "var hesa = true var mustafa = false if hesa {var a = 12} elseif mustafa {var b= 23}",
+        "var hesa = 1 + 2 * 3 if hesa < 7 {var a = 1} elseif hesa == 7 {var a = 2} else {var a = 3}",
+        "func hesa (a, b) {var a = 12 return 12} var a = hesa(12 + 23, true)",
+        """func sumn(count) {
+            var sum = 0
+            var counter = 0
+            while counter < count {
+                var counter = counter + 1
+                var sum = counter + sum
+            }
+            return sum
+        }
+        var limit = 5 * 2
+        var sum = sumn(limit)""",
+    ]
+    for string in strings:
+        expected = run(Parser(lex_to_tokens(string)).parse())
+        for level, passes in OPTIMIZATION_LEVELS.items():
+            program, _ = optimize(string, passes)
+            assert run(program) == expected, (level, string)
+
+if __name__ == "__main__":
+    test_constant_folding()
+    test_constant_propagation()
+    test_dead_branch_elimination()
+    test_dead_function_elimination()
+    test_optimized_same_results()
@@ -143,5 +143,16 @@ def test_lexer_tokens():
     print_info(f"Testing string({string})")
     parse(string)
 
+def test_parser_streaming():
+    string = "func hesa (a, b) {var a = 12 return a} var a = hesa(12 + 23, true) print(a)"
+    # The lexer is parsed while it lexes
+    streamed = Parser(Lexer(string)).parse()
+    assert streamed == Parser(lex_to_tokens(string)).parse()
+
+    # Token lists without EOF end like they have one
+    tokens = lex_to_tokens("var a = 1")[:-1]
+    assert Parser(tokens).parse() == Parser(Lexer("var a = 1")).parse()
+
 if __name__ == "__main__":
     test_lexer_tokens()
+    test_parser_streaming()
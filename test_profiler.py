@@ -0,0 +1,109 @@
+import json
+import pstats
+from typing import List
+from lexer import Token, Lexer, TokenType
+from logs import print_info
+from parser import Parser
+from profiler import Profiler
+from vm import VM
+
+def lex_to_tokens(text) -> List[Token]:
+    lexer = Lexer(text)
+    token = lexer.get_next_token()
+    tokens = list([token])
+    while token.token_type != TokenType.EOF:
+        token = lexer.get_next_token()
+        tokens.append(token)
+    return tokens
+
+def parse(string):
+    print_info(f"Testing string({string})")
+    return Parser(lex_to_tokens(string)).parse()
+
+PROGRAM = """func fib(n) {
+    var r = n
+    if n > 1 {
+        var r = fib(n - 1) + fib(n - 2)
+    }
+    return r
+}
+func loop(n) {
+    var i = 0
+    while i < n {
+        var i = i + 1
+    }
+    return fib(n)
+}
+var a = loop(5)
+"""
+
+class Clock:
+    # Every reading is one second after the last one
+    def __init__(self):
+        self.time = 0
+    def __call__(self):
+        self.time += 1
+        return self.time
+
+def profile(memo_size=0):
+    profiler = Profiler(Clock())
+    vm = VM(parse(PROGRAM), memo_size=memo_size, profiler=profiler)
+    vm.interpret()
+    return vm, profiler
+
+def by_name(profiler):
+    return {stats.name: stats for stats in profiler.functions.values()}
+
+def test_profile_off():
+    vm = VM(parse(PROGRAM))
+    assert "PROFILE" not in vm.code.disassemble()
+    assert "TAIL_CALL" in vm.code.disassemble()
+
+def test_profile_counts():
+    vm, profiler = profile()
+    assert vm.global_variables["a"] == 5
+    functions = by_name(profiler)
+    assert functions["<program>"].calls == 1
+    assert functions["loop"].calls == 1
+    assert functions["fib"].calls == 15
+    assert functions["fib"].primitive_calls == 1
+    assert functions["fib"].callers[("fib", functions["fib"].position)][0] \
+            == 14
+    assert profiler.line_hits(PROGRAM) == [(11, 5)]
+    # The clock ticks once for every enter and exit
+    assert functions["<program>"].inclusive == 33
+    assert functions["<program>"].exclusive == 2
+    assert functions["loop"].inclusive == 31
+    assert functions["loop"].exclusive == 2
+    assert functions["fib"].inclusive == 29
+    assert sum(stats.exclusive for stats in functions.values()) == 33
+
+def test_profile_memoized():
+    _, profiler = profile(memo_size=16)
+    # Cached calls don't run the function but they are calls
+    assert by_name(profiler)["fib"].calls == 9
+
+def test_profile_nested_functions():
+    string = ("func f() {func g() {return 1} return g()}"
+              " func h() {func g() {return 2} return g()}"
+              " var a = f() var b = h() var c = f()")
+    profiler = Profiler(Clock())
+    VM(parse(string), profiler=profiler).interpret()
+    # The two functions named g are counted apart
+    calls = sorted((stats.name, stats.calls)
+                   for stats in profiler.functions.values())
+    assert calls == [("<program>", 1), ("f", 2), ("g", 1), ("g", 2),
+                     ("h", 1)]
+
+def test_profile_output(tmp_path):
+    _, profiler = profile()
+    profiler.dump(str(tmp_path / "profile.json"), PROGRAM)
+    with open(tmp_path / "profile.json") as file:
+        data = json.load(file)
+    assert data["functions"][0]["name"] == "fib"
+    assert data["functions"][0]["line"] == 1
+    assert data["lines"] == [{"line": 11, "hits": 5}]
+    profiler.dump(str(tmp_path / "profile.prof"), PROGRAM)
+    stats = pstats.Stats(str(tmp_path / "profile.prof"))
+    assert stats.total_calls == 17
+    assert stats.prim_calls == 3
@@ -0,0 +1,58 @@
+import pytest
+from repl import Repl, brace_depth
+
+def test_brace_depth():
+    assert brace_depth("var a = 1") == 0
+    assert brace_depth("func f(a) {") == 1
+    assert brace_depth("while a < 1 { if a { var b = 1 }") == 1
+    assert brace_depth('var a = "{"') == 0
+    assert brace_depth("func f(a) {\n return a\n}") == 0
+
+def test_repl_keeps_state():
+    repl = Repl()
+    assert repl.execute("var a = 2") is None
+    assert repl.execute("func double(x) {return x * 2}") is None
+    assert repl.execute("double(a) + 1") == 5
+    assert repl.execute("var a = a + 1") is None
+    assert repl.execute("a") == 3
+    assert repl.global_variables == {"a": 3}
+    assert set(repl.functions) == {"double"}
+
+def test_repl_feed_blocks():
+    repl = Repl()
+    assert repl.feed("func add(a, b) {") == (False, None)
+    assert repl.feed("    return a + b") == (False, None)
+    assert repl.feed("}") == (True, None)
+    assert repl.feed("add(1, 2)") == (True, 3)
+
+def test_repl_errors_keep_state():
+    repl = Repl()
+    repl.execute("var a = 1")
+    with pytest.raises(Exception):
+        repl.execute("b")
+    with pytest.raises(Exception):
+        repl.execute("var b = missing(a)")
+    assert repl.execute("a") == 1
+    # The functions can be declared again
+    repl.execute("func f() {return 1}")
+    repl.execute("func f() {return 2}")
+    assert repl.execute("f()") == 2
+
+def test_repl_interrupt_keeps_session(monkeypatch, capsys):
+    lines = iter(["var a = 1", "func f() {return input()}", "var b = f()",
+                  "a + 1"])
+    def read(prompt=""):
+        if prompt == "":
+            # Ctrl-C while the input runs
+            raise KeyboardInterrupt
+        try:
+            return next(lines)
+        except StopIteration:
+            raise EOFError from None
+    monkeypatch.setattr("builtins.input", read)
+    repl = Repl()
+    repl.run()
+    output = capsys.readouterr().out
+    assert "Interrupted" in output
+    assert output.rstrip().endswith("2")
+    assert set(repl.functions) == {"f"}
@@ -0,0 +1,58 @@
+import pytest
+from typing import List
+from lexer import Token, Lexer, TokenType
+from logs import print_info
+from parser import Parser
+from resolver import resolve
+from interpreter import Interpreter
+from vm import VM
+from closure import ClosureInterpreter
+from transpiler import PythonInterpreter
+
+def lex_to_tokens(text) -> List[Token]:
+    lexer = Lexer(text)
+    token = lexer.get_next_token()
+    tokens = list([token])
+    while token.token_type != TokenType.EOF:
+        token = lexer.get_next_token()
+        tokens.append(token)
+    return tokens
+
+def parse(string):
+    print_info(f"Testing string({string})")
+    return Parser(lex_to_tokens(string)).parse()
+
+def test_resolver_slots():
+    program = parse("var a = 1 func f(x, y) {var z = x var x = y return z} var b = f(a, 2) var a = b")
+    resolution = resolve(program)
+    assert resolution.scope(program).names == ["a", "b"]
+    function = program.ast_list[1]
+    scope = resolution.scope(function)
+    assert scope.names == ["x", "y", "z"]
+    assert scope.parameters == ["x", "y"]
+    assert not scope.checked and not resolution.scope(program).checked
+
+def test_resolver_checked_reads():
+    # Only the reads that may run before the first set are checked
+    program = parse("var a = 1 if a {var b = 1 var c = b} else {var b = 2} var d = b while a < 3 {var e = a var a = a + 1} var f = e")
+    scope = resolve(program).scope(program)
+    assert len(scope.checked) == 1
+    program = parse("var a = 1 if a {var b = 1} var c = b")
+    assert len(resolve(program).scope(program).checked) == 1
+
+@pytest.mark.parametrize("engine", [Interpreter, VM, ClosureInterpreter, PythonInterpreter])
+def test_resolver_undefined(engine):
+    # Nothing runs when a variable is never set
+    program = parse('print("ran") var a = 1 func f(x) {var y = x + a}')
+    with pytest.raises(Exception, match="At position 46: variable a is never set"):
+        engine(program)
+
+@pytest.mark.parametrize("engine", [VM, ClosureInterpreter])
+def test_resolver_unset_slot(engine):
+    program = parse("var a = 1 if a < 1 {var b = 1} var c = b")
+    with pytest.raises(Exception, match="Variable b is read before it is set"):
+        engine(program).interpret()
+
+if __name__ == "__main__":
+    test_resolver_slots()
+    test_resolver_checked_reads()
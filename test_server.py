@@ -0,0 +1,102 @@
+import io
+import sys
+import json
+import socket
+import threading
+import pytest
+import client
+from client import request, parse_arguments
+from server import Server, DEFAULT_TIMEOUT
+
+@pytest.fixture
+def server(tmp_path):
+    path = str(tmp_path / "sagu.sock")
+    server = Server(path, concurrency=2)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server, path
+    server.shutdown()
+    server.server_close()
+    thread.join()
+
+def test_server_runs_source(server):
+    _, path = server
+    response = request(path, {"source": 'var a = input("") print(a + "!")',
+                              "stdin": "hello\n"})
+    assert response["status"] == 0
+    assert response["stdout"] == "hello!\n"
+    assert response["seconds"] >= 0
+
+def test_server_leaves_sys_alone(server, capsys):
+    _, path = server
+    streams = (sys.stdin, sys.stdout, sys.stderr)
+    response = request(path, {"source": 'print("request")'})
+    assert response["stdout"] == "request\n"
+    assert (sys.stdin, sys.stdout, sys.stderr) == streams
+    assert capsys.readouterr().out == ""
+
+def test_server_isolates_requests(server):
+    server, path = server
+    source = "func f(a) {return a * 2} var b = f(21) print(b)"
+    for engine in ("walker", "vm", "closure", "python"):
+        response = request(path, {"source": source, "engine": engine})
+        assert response["stdout"] == "42\n", engine
+    # The second run of the same source is not parsed again
+    assert server.programs.cache_info().hits == 3
+    response = request(path, {"source": "print(b)"})
+    assert response["status"] == 1
+    assert "variable b is never set" in response["stderr"]
+
+def test_server_runs_files(server, tmp_path):
+    _, path = server
+    program = tmp_path / "program.sg"
+    program.write_text("var a = 1 + 2 print(a)")
+    response = request(path, {"path": str(program), "engine": "vm"})
+    assert response == {"status": 0, "stdout": "3\n", "stderr": "",
+                        "result": None, "seconds": response["seconds"]}
+    response = request(path, {"path": str(tmp_path / "missing.sg")})
+    assert response["status"] == 2
+
+def test_server_limits_requests(server):
+    _, path = server
+    response = request(path, {"source": "while true {}", "max_steps": 10,
+                              "engine": "closure"})
+    assert response["status"] == 1
+    assert "ExecutionLimitExceeded" in response["stderr"]
+
+def test_server_cancels_disconnected_requests(server):
+    server, path = server
+    # Without limits of their own the requests get the default timeout
+    assert server.timeout == DEFAULT_TIMEOUT
+    for _ in range(2):
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+            connection.connect(path)
+            connection.sendall(json.dumps({"source": "while true {}"})
+                               .encode() + b"\n")
+    # Both slots are free again once the runaway requests see their
+    # clients are gone
+    response = request(path, {"source": "print(1)"})
+    assert response["stdout"] == "1\n"
+
+def test_client_takes_main_options():
+    payload, arguments = parse_arguments([
+            "sagu.sock", "-O2", "program.sg", "--passes=fold,",
+            "--max-steps", "10", "--timeout", "1.5", "--no-cache",
+            "--engine", "vm"])
+    assert arguments == ["sagu.sock", "program.sg"]
+    assert payload == {"optimization": 2, "passes": ["fold"],
+                       "max_steps": 10, "timeout": 1.5, "engine": "vm"}
+    with pytest.raises(ValueError):
+        parse_arguments(["--timeout"])
+    with pytest.raises(ValueError):
+        parse_arguments(["--unknown"])
+
+def test_client_runs_files(server, tmp_path, monkeypatch, capsys):
+    _, path = server
+    program = tmp_path / "program.sg"
+    program.write_text("var i = 0 while true {var i = i + 1}")
+    monkeypatch.setattr(sys, "argv", ["client.py", path, str(program),
+                                      "-O1", "--max-steps", "10"])
+    monkeypatch.setattr(sys, "stdin", io.StringIO())
+    assert client.main() == 1
+    assert "10 steps" in capsys.readouterr().err
@@ -0,0 +1,49 @@
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+# A run of a tiny file may take this many times as long as starting python
+# without doing anything, the best of RUNS runs of each is compared
+STARTUP_BUDGET = 15
+RUNS = 5
+# Modules that running a file with the default options must not import
+LAZY_MODULES = {"colorama", "argparse", "vm", "compiler", "closure",
+                "transpiler", "profiler", "json", "limits", "mmap", "glob",
+                "batch", "server", "repl", "cache", "arena", "hashlib",
+                "optimizer", "memo", "arrays", "threading"}
+
+def run_main(path, code="main.main()"):
+    script = ("import sys\n"
+              f"sys.path.insert(0, {ROOT!r})\n"
+              f"sys.argv = ['main.py', {str(path)!r}]\n"
+              "import main\n"
+              f"{code}\n")
+    return subprocess.run([sys.executable, "-c", script], check=True,
+                          capture_output=True, text=True).stdout
+
+def test_startup_imports(tmp_path):
+    path = tmp_path / "program.sg"
+    path.write_text("var a = 1\n")
+    output = run_main(path, "main.main()\nprint(*sys.modules)")
+    modules = set(output.split())
+    assert "interpreter" in modules
+    assert not modules & LAZY_MODULES
+
+def run_time(command):
+    start = time.perf_counter()
+    subprocess.run(command, check=True, stdout=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+def test_startup_time(tmp_path):
+    path = tmp_path / "program.sg"
+    path.write_text("var a = 1\n")
+    run = [sys.executable, os.path.join(ROOT, "main.py"), str(path)]
+    empty = [sys.executable, "-c", "pass"]
+    # Both are timed in turns so a busy machine slows them alike
+    times, empty_times = list(), list()
+    for _ in range(RUNS):
+        times.append(run_time(run))
+        empty_times.append(run_time(empty))
+    assert min(times) < STARTUP_BUDGET * min(empty_times), (times, empty_times)
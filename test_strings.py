@@ -0,0 +1,61 @@
+import pytest
+from main import parse, load_engine
+from resolver import resolve
+from strings import StringBuilder, concat, joined, length, substr, join
+
+ENGINES = ["walker", "vm", "closure", "python"]
+
+def run(engine, string):
+    interpreter = load_engine(engine)(parse(string))
+    interpreter.interpret()
+    return interpreter.global_variables
+
+def test_string_builder():
+    builder = concat("a", "b")
+    assert type(builder) is StringBuilder
+    assert concat(builder, "c") is builder
+    assert length(builder) == 3 and builder.parts == ["a", "b", "c"]
+    assert joined(builder) == "abc" and builder.parts == ["abc"]
+    assert concat(1, 2) == 3
+    with pytest.raises(TypeError):
+        concat(builder, 1)
+    assert substr(builder, 1) == "bc"
+    assert substr("hello", 1, 3) == "ell"
+    assert join([1, "a", True], ", ") == "1, a, True"
+
+def test_string_appends():
+    resolution = resolve(parse("""var s = "" var i = 0
+        while i < 3 {var s = s + "x" var i = i + 1}
+        var n = len(s) var t = s
+        func f(a) {var a = a + "x" return a}"""))
+    # Only s holds strings, the counter and the parameter are added
+    assert len(resolution.appends) == 1
+    # len reads the builder, t gets the string
+    assert len(resolution.joins) == 1
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_string_engines(engine):
+    string = """var report = "total:"
+    var i = 0
+    while i < 3 {
+        var report = report + " " + join([i, i * 2], "/")
+        var i = i + 1
+    }
+    var size = len(report)
+    var head = substr(report, 0, 6)
+    var copy = report
+    func line(n) {
+        var text = "#"
+        var k = 0
+        while k < n {var text = text + "=" var k = k + 1}
+        return text
+    }
+    var ruler = line(4)"""
+    assert run(engine, string) == {
+            "report": "total: 0/0 1/2 2/4",
+            "i": 3,
+            "size": 18,
+            "head": "total:",
+            "copy": "total: 0/0 1/2 2/4",
+            "ruler": "#====",
+            }
@@ -0,0 +1,124 @@
+from typing import List
+from lexer import Token, Lexer, TokenType
+from logs import print_info
+from parser import Parser
+from interpreter import Interpreter
+import pytest
+from transpiler import PythonInterpreter, Transpiler
+
+def lex_to_tokens(text) -> List[Token]:
+    lexer = Lexer(text)
+    token = lexer.get_next_token()
+    tokens = list([token])
+    while token.token_type != TokenType.EOF:
+        token = lexer.get_next_token()
+        tokens.append(token)
+    return tokens
+
+def run(engine, string):
+    parser = Parser(lex_to_tokens(string))
+    interpreter = engine(parser.parse())
+    result = interpreter.interpret()
+    return result, interpreter.global_variables
+
+def compare(string):
+    print_info(f"Testing string({string})")
+    expected = run(Interpreter, string)
+    assert run(PythonInterpreter, string) == expected, string
+
+def test_transpiler_same_as_interpreter():
+    compare("")
+    compare("123")
+    compare("1 + 2 - 3 / 4")
+    compare("-1 + +2")
+    compare("var hesa = 1")
+    compare("{var hesa = 12 + 21 var mustafa = 12 var hello = 2 * hesa + mustafa}")
+    compare("var hesa = 12 == 12")
+    compare("var hesa = 12 < 12")
+    compare("var hesa = 12 > 12")
+    compare("var hesa = 3 * true + false")
+    compare("var hesa = true if hesa {var a = 12}")
+    compare("var hesa = true var mustafa = false if hesa {var a = 12} elseif mustafa {var b= 23}")
+    compare("var hesa = false if hesa {var a = 12} else {var b = 23}")
+    compare("var a = false var c = true if a {var b = 1} elseif a {var b = 2} elseif c {var b = 3} elseif c {var b = 4} else {var b = 5}")
+    compare("func hesa (a, b) {var a = 12}")
+    compare("func lessthan (a, b) {var newxless = a < b} lessthan(12 + 23, 1)")
+    compare("func hesa (a, b) {var a = 12 return 12} var a = hesa(12 + 23, true)")
+    compare("""func sumn(count)
+        {
+            var sum = 0
+            var counter = 0
+            while counter < count {
+                var counter = counter + 1
+                var sum = counter + sum
+            }
+            return sum
+        }
+
+    var sum = sumn(10)
+""")
+    compare('var a = "Hello World"')
+    compare('var a = "Hello\n"+ "Hello"')
+    compare('print("Hello, World!")')
+    compare('var a = [1, 2 * 3, "x", [true]] var b = a[3][0] var c = "abc"[1]')
+    compare("var a = sort([3, 1, 2]) var b = addeach(a, [1, 1, 1]) var c = muleach(b, 2) var d = sum(c) + len(range(1, 4))")
+
+def test_transpiler_fib():
+    with open("examples/fib.sg") as file:
+        text = file.read().replace("print(bigone)", "")
+    assert run(PythonInterpreter, text) == run(Interpreter, text)
+
+def test_transpiler_source():
+    string = "func sumn(a, b) {var c = a + b return c} var d = sumn(1, 2)"
+    parser = Parser(lex_to_tokens(string))
+    program = Transpiler().transpile(parser.parse())
+    assert "def f_sumn(v_a, v_b, *_):" in program.source
+    assert "return v_c" in program.source
+    # The source map points at the first token of each statement
+    assert program.source_map == [5, 21, 38, 45]
+
+def test_transpiler_error_position():
+    string = 'func f(a) {\n  var b = a + "x"\n  return b\n}\nvar c = f(1)'
+    parser = Parser(lex_to_tokens(string))
+    interpreter = PythonInterpreter(parser.parse(), string)
+    with pytest.raises(Exception, match="line 2, column 7"):
+        interpreter.interpret()
+
+if __name__ == "__main__":
+    test_transpiler_same_as_interpreter()
+    test_transpiler_fib()
+    test_transpiler_source()
+    test_transpiler_error_position()
+
+def test_engines_arity_and_results():
+    from main import load_engine
+    from parser import Program
+    def run_returning(engine, text, expression):
+        # Programs only return through a ReturnStatement like the REPL
+        program = Parser(lex_to_tokens(text)).parse()
+        returned = Parser(lex_to_tokens(
+            "func main() {return " + expression + "}")).parse()
+        program = Program(program.ast_list +
+                          returned.ast_list[0].function_block.ast_list)
+        interpreter = load_engine(engine)(program)
+        return interpreter.interpret(), interpreter.global_variables
+    engines = ("walker", "vm", "closure", "python")
+    cases = [
+        ("func f(a) {return a * 2} var x = f(1, 2, 3)", "x + 1"),
+        ('func g(a, b) {var c = a + b return c}', 'g("a", "b", "c")'),
+        ("func h(a) {return 1 var a = a + 1 return a} var x = h(1, 0)",
+         "[x, h(3)]"),
+        ("var x = 1", "true"),
+        # A call before the nested declaration calls the outer function
+        ("func g() {return 2} func f() {var a = g() func g() {return 1}"
+         " var b = g() return a * 10 + b} var x = f()", "[x, g()]"),
+        ]
+    for text, expression in cases:
+        results = [run_returning(engine, text, expression)
+                   for engine in engines]
+        assert results == [results[0]] * len(engines), text
+    assert run_returning("python", *cases[0]) == (3, {"x": 2})
+    # Missing arguments are an error on every engine
+    for engine in engines:
+        with pytest.raises(Exception):
+            run_returning(engine, "func f(a, b) {return a + b}", "f(1)")
@@ -0,0 +1,106 @@
+from typing import List
+from lexer import Token, Lexer, TokenType
+from logs import print_info
+from parser import Parser
+from interpreter import Interpreter
+from vm import VM
+
+def lex_to_tokens(text) -> List[Token]:
+    lexer = Lexer(text)
+    token = lexer.get_next_token()
+    tokens = list([token])
+    while token.token_type != TokenType.EOF:
+        token = lexer.get_next_token()
+        tokens.append(token)
+    return tokens
+
+def run(engine, string):
+    parser = Parser(lex_to_tokens(string))
+    interpreter = engine(parser.parse())
+    result = interpreter.interpret()
+    return result, interpreter.global_variables
+
+def compare(string):
+    print_info(f"Testing string({string})")
+    expected = run(Interpreter, string)
+    assert run(VM, string) == expected, string
+
+def test_vm_same_as_interpreter():
+    compare("")
+    compare("123")
+    compare("1 + 2 - 3 / 4")
+    compare("-1 + +2")
+    compare("var hesa = 1")
+    compare("{var hesa = 12 + 21 var mustafa = 12 var hello = 2 * hesa + mustafa}")
+    compare("var hesa = 12 == 12")
+    compare("var hesa = 12 < 12")
+    compare("var hesa = 12 > 12")
+    compare("var hesa = 3 * true + false")
+    compare("var hesa = true if hesa {var a = 12}")
+    compare("var hesa = true var mustafa = false if hesa {var a = 12} elseif mustafa {var b= 23}")
+    compare("var hesa = false if hesa {var a = 12} else {var b = 23}")
+    compare("var a = false var c = true if a {var b = 1} elseif a {var b = 2} elseif c {var b = 3} elseif c {var b = 4} else {var b = 5}")
+    compare("func hesa (a, b) {var a = 12}")
+    compare("func lessthan (a, b) {var newxless = a < b} lessthan(12 + 23, 1)")
+    compare("func hesa (a, b) {var a = 12 return 12} var a = hesa(12 + 23, true)")
+    compare("func outer(n) {func sq(n) {return n * n} func f(n) {return sq(n) + 1} return f(n)} var a = outer(3) var b = outer(4)")
+    compare("func outer() {func g() {return 1} return g()} func g() {return 2} var a = outer() var b = g()")
+    compare("func outer(n) {func inner(n) {return n * 2} return sq(inner(n))} func sq(n) {return n * n} var a = outer(3)")
+    compare("""func sumn(count)
+        {
+            var sum = 0
+            var counter = 0
+            while counter < count {
+                var counter = counter + 1
+                var sum = counter + sum
+            }
+            return sum
+        }
+
+    var sum = sumn(10)
+""")
+    compare('var a = "Hello World"')
+    compare('var a = "Hello\n"+ "Hello"')
+    compare('print("Hello, World!")')
+    compare('var a = [1, 2 * 3, "x", [true]] var b = a[3][0] var c = "abc"[1]')
+    compare("var a = sort([3, 1, 2]) var b = addeach(a, [1, 1, 1]) var c = muleach(b, 2) var d = sum(c) + len(range(1, 4))")
+
+def test_vm_fib():
+    with open("examples/fib.sg") as file:
+        text = file.read().replace("print(bigone)", "")
+    assert run(VM, text) == run(Interpreter, text)
+
+def test_vm_deep_recursion():
+    text = """func count(n)
+        {
+            var result = 0
+            if n > 0 {var result = count(n - 1) + 1}
+            return result
+        }
+    var a = count(100000)
+"""
+    parser = Parser(lex_to_tokens(text))
+    vm = VM(parser.parse(), memo_size=0)
+    vm.interpret()
+    assert vm.global_variables["a"] == 100000
+
+def test_vm_tail_call():
+    text = """func add(a, b)
+        {
+            var a = a + b
+            return double(a)
+        }
+    func double(a) {return a * 2}
+    var a = add(1, 2)
+"""
+    parser = Parser(lex_to_tokens(text))
+    vm = VM(parser.parse())
+    assert "TAIL_CALL" in vm.code.disassemble()
+    vm.interpret()
+    assert vm.global_variables["a"] == 6
+
+if __name__ == "__main__":
+    test_vm_same_as_interpreter()
+    test_vm_fib()
+    test_vm_deep_recursion()
+    test_vm_tail_call()
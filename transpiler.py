@@ -0,0 +1,514 @@
+"""
+    Transpile the parsed program into python source code and run it
+    with the python interpreter
+"""
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import List, Optional, Set
+
+from parser import (
+        AST_COUNT, Bool, FunctionDecl, ReturnStatement, Void, first_position,
+        iter_nodes,
+        )
+from lexer import TokenType, get_line_column
+from interpreter import BUILT_IN_FUNCTIONS
+from resolver import resolve
+from memo import Memo, DEFAULT_MEMO_SIZE, find_pure_functions
+from limits import ExecutionLimitExceeded
+from strings import concat, joined
+import logs
+
+# pylint: disable=invalid-name
+# Sagu names can only be alphanumeric so these prefixes keep them apart
+# from each other and from the python keywords and builtins
+VARIABLE_PREFIX = "v_"
+FUNCTION_PREFIX = "f_"
+BUILT_IN_PREFIX = "b_"
+# Used when a function has a return that is not its last statement and
+# for the returned value of the program
+RETURN_NAME = "result"
+# Takes the arguments after the parameters, they are dropped like in the
+# other engines
+EXTRA_ARGUMENTS = "*_"
+INDENT = "    "
+# Wraps the pure functions with their caches
+MEMOIZE_NAME = "memoize"
+# Counts a step of the budget
+STEP_NAME = "step"
+# Append to and read the variables that build strings
+CONCAT_NAME = "concat"
+JOINED_NAME = "joined"
+FILENAME = "<sagu>"
+
+BINARY_OPERATORS = {
+        TokenType.PLUS: "+",
+        TokenType.MINUS: "-",
+        TokenType.MUL: "*",
+        TokenType.DIV: "//",
+        TokenType.LTHAN: "<",
+        TokenType.GTHAN: ">",
+        TokenType.EQUALS: "==",
+        }
+
+
+@lru_cache(maxsize=128)
+def compile_source(source, filename=FILENAME):
+    """
+        Compile the generated source, the same source is compiled once
+    """
+    return compile(source, filename, "exec")
+
+
+@dataclass
+class TranspiledProgram:
+    """
+        Container for the generated source
+        source_map[i] is the position of the Sagu token that line i + 1
+        of the source is generated from
+    """
+    source: str
+    source_map: List[Optional[int]]
+    filename: str = FILENAME
+
+    @property
+    def code(self):
+        """
+            Returns the compiled code object of the source
+        """
+        return compile_source(self.source, self.filename)
+
+    def annotated(self, text=None) -> str:
+        """
+            Returns the source with the Sagu position of every line
+        """
+        lines = list()
+        for line, position in zip(self.source.splitlines(), self.source_map):
+            if position is not None:
+                if text is not None:
+                    line_number, column = get_line_column(text, position)
+                    line += f"  # {line_number}:{column}"
+                else:
+                    line += f"  # {position}"
+            lines.append(line)
+        return "\n".join(lines)
+
+    def locate(self, error) -> Optional[int]:
+        """
+            Returns the Sagu position of the innermost generated line
+            in the traceback of the error
+        """
+        position = None
+        traceback = error.__traceback__
+        while traceback is not None:
+            if traceback.tb_frame.f_code.co_filename == self.filename:
+                position = self.source_map[traceback.tb_lineno - 1]
+            traceback = traceback.tb_next
+        return position
+
+
+def declared_names(ast_list) -> Set[str]:
+    """
+        Returns the names of the functions declared in the statements,
+        not in the functions they declare
+    """
+    return {
+            node.function_name.token_value
+            for node in iter_nodes(ast_list, enter_functions=False)
+            if isinstance(node, FunctionDecl)
+            }
+
+
+# Transpiler
+assert AST_COUNT == 19, "You've forgotten to transpile an AST"
+
+
+class Transpiler:
+    """
+        Generates python source from the AST, statement_ methods write
+        lines and expression_ methods return python expressions
+        The functions named in memoized are wrapped by memoize after
+        they are declared
+        When limited is True the loops and the functions call step first
+        The appends to strings of the resolution build them in place
+        A function declared in a function is a local of it named after
+        its depth, it is None until it is declared so a call tries the
+        innermost one first like the other engines
+    """
+    def __init__(self, memoized=(), limited=False, resolution=None):
+        self.memoized = memoized
+        self.limited = limited
+        self.resolution = resolution
+        # Names of the functions declared in the program and in every
+        # function around the AST that is being transpiled
+        self.declared: List[Set[str]] = list()
+        self.lines = list()
+        self.source_map = list()
+        self.indent = 0
+
+    def error(self, text):
+        """
+            Raise Error
+        """
+        raise Exception(text)
+
+    def transpile(self, ast) -> TranspiledProgram:
+        """
+            Transpile the whole program
+        """
+        self.declared = [declared_names(ast.ast_list)]
+        self.statement(ast)
+        source = "\n".join(self.lines) + "\n"
+        logs.trace("transpiler", "debug", source)
+        return TranspiledProgram(source, self.source_map)
+
+    def emit(self, line, ast=None):
+        """
+            Write a line for the AST
+        """
+        self.lines.append(INDENT * self.indent + line)
+        self.source_map.append(first_position(ast))
+
+    def statement(self, ast):
+        """
+            Write the lines of a statement
+        """
+        func = getattr(self, "statement_" + type(ast).__name__)
+        func(ast)
+
+    def expression(self, ast) -> str:
+        """
+            Returns the python expression of the AST
+        """
+        func = getattr(self, "expression_" + type(ast).__name__)
+        return func(ast)
+
+    def indented(self, ast_list):
+        """
+            Write an indented block of statements
+        """
+        self.indent += 1
+        before = len(self.lines)
+        for ast in ast_list:
+            self.statement(ast)
+        if len(self.lines) == before:
+            self.emit("pass")
+        self.indent -= 1
+
+    def emit_step(self, ast):
+        """
+            Write the step of the block that starts after the line of the
+            AST when limited
+        """
+        if self.limited:
+            self.indent += 1
+            self.emit(f"{STEP_NAME}()", ast)
+            self.indent -= 1
+
+    def statement_Program(self, ast):
+        """
+            Transpile Program AST
+        """
+        for program in ast.ast_list:
+            self.statement(program)
+        if not self.lines:
+            self.emit("pass")
+
+    def statement_Block(self, ast):
+        """
+            Transpile Block AST
+        """
+        for program in ast.ast_list:
+            self.statement(program)
+
+    def statement_Void(self, ast):
+        """
+            Transpile Void AST
+        """
+
+    def statement_SetVariable(self, ast):
+        """
+            Transpile SetVariable AST
+        """
+        var_name = VARIABLE_PREFIX + ast.token.token_value
+        if self.resolution is not None and self.resolution.is_append(ast):
+            right = self.expression(ast.expr.right_token)
+            self.emit(f"{var_name} = {CONCAT_NAME}({var_name}, {right})", ast)
+            return
+        self.emit(f"{var_name} = {self.expression(ast.expr)}", ast)
+
+    def statement_FunctionCall(self, ast):
+        """
+            Transpile FunctionCall AST that is used as a statement
+        """
+        self.emit(self.expression(ast), ast)
+
+    def statement_Condition(self, ast):
+        """
+            Transpile Condition AST
+        """
+        self.emit(f"if {self.expression(ast.condition_expr)}:", ast)
+        self.indented([ast.condition_block])
+
+    def statement_Flow(self, ast):
+        """
+            Transpile Flow AST
+        """
+        self.statement_Condition(ast.if_condition)
+        for elseif in ast.elseif:
+            expression = self.expression(elseif.condition_expr)
+            self.emit(f"elif {expression}:", elseif)
+            self.indented([elseif.condition_block])
+        else_condition = ast.else_block
+        else_expr = else_condition.condition_expr
+        always = isinstance(else_expr, Bool) and \
+            else_expr.token.token_type == TokenType.TRUE
+        if not always:
+            self.emit("else:", else_condition)
+            self.indented([else_condition])
+        elif not isinstance(else_condition.condition_block, Void):
+            self.emit("else:", else_condition)
+            self.indented([else_condition.condition_block])
+
+    def statement_While(self, ast):
+        """
+            Transpile While AST
+        """
+        self.emit(f"while {self.expression(ast.expression)}:", ast)
+        self.emit_step(ast)
+        self.indented([ast.block])
+
+    def function_name(self, name, depth) -> str:
+        """
+            Returns the python name of the function declared at the depth
+            the functions of the program are globals
+        """
+        if depth == 0:
+            return FUNCTION_PREFIX + name
+        return f"{FUNCTION_PREFIX}{depth}_{name}"
+
+    def statement_FunctionDecl(self, ast):
+        """
+            Transpile FunctionDecl AST
+        """
+        name = ast.function_name.token_value
+        function_name = self.function_name(name, len(self.declared) - 1)
+        parameters = ", ".join([
+                *(VARIABLE_PREFIX + place.token_value
+                  for place in ast.function_variables),
+                EXTRA_ARGUMENTS,
+                ])
+        self.emit(f"def {function_name}({parameters}):", ast)
+        self.emit_step(ast)
+        self.declared.append(declared_names(ast.function_block.ast_list))
+        try:
+            self.function_body(ast)
+        finally:
+            self.declared.pop()
+        if name in self.memoized:
+            self.emit(f"{function_name} = {MEMOIZE_NAME}({name!r},"
+                      f" {function_name})", ast)
+
+    def function_body(self, ast):
+        """
+            Write the body of the FunctionDecl AST
+            A return that is the last and only one becomes a python return
+            others only set the returned value like in the interpreter
+        """
+        ast_list = ast.function_block.ast_list
+        depth = len(self.declared) - 1
+        self.indent += 1
+        for name in sorted(self.declared[-1]):
+            self.emit(f"{self.function_name(name, depth)} = None")
+        self.indent -= 1
+        returns = [
+                statement for statement in ast_list
+                if isinstance(statement, ReturnStatement)
+                ]
+        if not returns:
+            self.indented(ast_list)
+            return
+        self.indent += 1
+        if len(returns) == 1 and ast_list[-1] is returns[0]:
+            for statement in ast_list[:-1]:
+                self.statement(statement)
+            expression = self.expression(returns[0].expression)
+            self.emit(f"return {expression}", returns[0])
+        else:
+            self.emit(f"{RETURN_NAME} = None")
+            for statement in ast_list:
+                self.statement(statement)
+            self.emit(f"return {RETURN_NAME}")
+        self.indent -= 1
+
+    def statement_ReturnStatement(self, ast):
+        """
+            Transpile ReturnStatement AST
+        """
+        self.emit(f"{RETURN_NAME} = {self.expression(ast.expression)}", ast)
+
+    def expression_Integer(self, ast):
+        """
+            Transpile Integer AST
+        """
+        value = ast.token.token_value
+        if value < 0:
+            return f"({value!r})"
+        return repr(value)
+
+    def expression_String(self, ast):
+        """
+            Transpile String AST
+        """
+        return repr(ast.token.token_value)
+
+    def expression_ListLiteral(self, ast):
+        """
+            Transpile ListLiteral AST
+        """
+        elements = ", ".join(
+                self.expression(element) for element in ast.elements)
+        return f"[{elements}]"
+
+    def expression_Index(self, ast):
+        """
+            Transpile Index AST
+        """
+        collection = self.expression(ast.collection)
+        return f"{collection}[{self.expression(ast.index)}]"
+
+    def expression_Bool(self, ast):
+        """
+            Transpile Bool AST
+        """
+        token_type = ast.token.token_type
+        if token_type == TokenType.TRUE:
+            return "True"
+        if token_type == TokenType.FALSE:
+            return "False"
+        return self.error("This is not a boolean")
+
+    def expression_Variable(self, ast):
+        """
+            Transpile Variable AST
+        """
+        var_name = VARIABLE_PREFIX + ast.token.token_value
+        if self.resolution is not None and self.resolution.is_join(ast):
+            return f"{JOINED_NAME}({var_name})"
+        return var_name
+
+    def expression_BinOp(self, ast):
+        """
+            Transpile BinOp AST
+        """
+        operator = BINARY_OPERATORS.get(ast.op_token.token_type)
+        if operator is None:
+            self.error(f"Something in wrong in BinOp {ast}")
+        left = self.expression(ast.left_token)
+        right = self.expression(ast.right_token)
+        return f"({left} {operator} {right})"
+
+    def expression_UnaryOp(self, ast):
+        """
+            Transpile UnaryOp AST
+        """
+        op_token = ast.op_token.token_type
+        right = self.expression(ast.right_token)
+        if op_token == TokenType.PLUS:
+            return right
+        if op_token == TokenType.MINUS:
+            return f"(-{right})"
+        return self.error(f"Something in wrong in UnaryOp {ast}")
+
+    def expression_FunctionCall(self, ast):
+        """
+            Transpile FunctionCall AST
+        """
+        function_name = ast.function_name.token_value
+        if function_name in BUILT_IN_FUNCTIONS:
+            function_name = BUILT_IN_PREFIX + function_name
+        else:
+            # The innermost function of the name that is declared is called
+            names = [
+                    self.function_name(function_name, depth)
+                    for depth in reversed(range(len(self.declared)))
+                    if function_name in self.declared[depth]
+                    ]
+            if not names:
+                function_name = FUNCTION_PREFIX + function_name
+            elif len(names) == 1:
+                function_name = names[0]
+            else:
+                function_name = f"({' or '.join(names)})"
+        arguments = ", ".join(
+                self.expression(expr)
+                for expr in ast.function_variables
+                )
+        return f"{function_name}({arguments})"
+
+
+class PythonInterpreter:
+    """
+        Runs the program with the same results as Interpreter by executing
+        the transpiled python code
+        text is only used to show the line and column of errors
+    """
+    def __init__(self, ast, text=None, memo_size=DEFAULT_MEMO_SIZE,
+                 budget=None):
+        self.ast = ast
+        self.text = text
+        self.budget = budget
+        # Reports the variables that are never set and finds the appends
+        # to strings, python keeps its own locals in slots
+        resolution = resolve(ast)
+        self.memo = Memo(memo_size)
+        memoized = find_pure_functions(ast) if self.memo.size > 0 else ()
+        self.program = Transpiler(memoized, budget is not None,
+                                  resolution).transpile(ast)
+        self.global_variables = dict()
+        self.functions = dict()
+
+    def error(self, error):
+        """
+            Returns an error that points at the Sagu code
+        """
+        position = self.program.locate(error)
+        if position is None:
+            return Exception(repr(error))
+        location = f"At position {position}"
+        if self.text is not None:
+            line, column = get_line_column(self.text, position)
+            location += f" (line {line}, column {column})"
+        return Exception(f"{location}: {error!r}")
+
+    def interpret(self):
+        """
+            Run the compiled code of the program
+        """
+        namespace = {
+                BUILT_IN_PREFIX + name: function
+                for name, function in BUILT_IN_FUNCTIONS.items()
+                }
+        namespace[MEMOIZE_NAME] = self.memo.wrap
+        namespace[CONCAT_NAME] = concat
+        namespace[JOINED_NAME] = joined
+        if self.budget is not None:
+            namespace[STEP_NAME] = self.budget.step
+            self.budget.start()
+        try:
+            exec(self.program.code, namespace)  # pylint: disable=exec-used
+        except ExecutionLimitExceeded:
+            # Callers catch it by its type, it is not wrapped
+            raise
+        except Exception as error:
+            raise self.error(error) from error
+        finally:
+            for name, value in namespace.items():
+                if name.startswith(VARIABLE_PREFIX):
+                    self.global_variables[name[len(VARIABLE_PREFIX):]] = \
+                        joined(value)
+                elif name.startswith(FUNCTION_PREFIX):
+                    self.functions[name[len(FUNCTION_PREFIX):]] = value
+        if logs.VERBOSITY:
+            print("Variables:", self.global_variables)
+            print("Functions:", self.functions.keys())
+        return namespace.get(RETURN_NAME)
@@ -0,0 +1,267 @@
+"""
+    Stack based virtual machine that runs the compiled bytecode
+"""
+from compiler import (
+        Compiler,
+        LOAD_FAST, LOAD_CONST, STORE_FAST, POP_JUMP_IF_FALSE, JUMP,
+        BINARY_ADD, BINARY_SUB, COMPARE_LT, COMPARE_GT, COMPARE_EQ,
+        BINARY_MUL, BINARY_DIV, UNARY_NEGATIVE, LOAD_CHECKED, CALL_FUNCTION,
+        TAIL_CALL, CALL_BUILTIN, BINARY_SUBSCR, BUILD_LIST, POP_TOP,
+        STORE_RETURN, MAKE_FUNCTION, RETURN, INPLACE_ADD, LOAD_JOINED,
+        PROFILE_ENTER, PROFILE_EXIT, PROFILE_LINE, CHECK_BUDGET, OPCODE_COUNT,
+        )
+from resolver import UNDEFINED, resolve
+from interpreter import Declarations
+from strings import StringBuilder, concat
+from memo import (
+        Memo, DEFAULT_MEMO_SIZE, MISSING, find_pure_functions, memo_key,
+        )
+import logs
+
+# pylint: disable=too-many-branches
+# pylint: disable=too-many-statements
+assert OPCODE_COUNT == 29, "You've forgotten to run an opcode"
+
+
+class VM:
+    """
+        Runs the program with the same results as Interpreter but walks
+        the AST only once to compile it
+        Like in Interpreter a call sees the functions declared in it and
+        in the calls its function was declared in
+        Calls don't use the python stack, the frames of the callers are
+        kept in a list so recursion is only limited by memory
+        The program is compiled with the PROFILE_ opcodes when a
+        profiler is given and with CHECK_BUDGET when a budget is given
+    """
+    def __init__(self, ast, memo_size=DEFAULT_MEMO_SIZE, profiler=None,
+                 budget=None):
+        self.profiler = profiler
+        self.budget = budget
+        # Variables live in slots while running, this is filled after
+        self.global_variables = dict()
+        self.functions = dict()
+        self.memo = Memo(memo_size)
+        # Result caches of the pure functions that are declared
+        self.caches = dict()
+        self.load(ast)
+
+    def load(self, ast):
+        """
+            Compile the program that interpret runs next, it starts with
+            the variables and the functions the programs before it left
+        """
+        self.ast = ast
+        self.resolution = resolve(ast, self.global_variables)
+        self.scope = self.resolution.scope(ast)
+        self.code = Compiler(self.resolution, self.profiler is not None,
+                             self.budget is not None).compile(ast)
+        self.pure = find_pure_functions(ast)
+
+    def error(self, text):
+        """
+            Raise Error
+        """
+        raise Exception(text)
+
+    def interpret(self):
+        """
+            Run the compiled program
+        """
+        variables = self.scope.new_variables()
+        # The variables that are set before are the first slots
+        for slot, name in enumerate(self.scope.parameters):
+            variables[slot] = self.global_variables[name]
+        if self.budget is not None:
+            self.budget.start()
+        try:
+            to_return = self.run(self.code, variables)
+        finally:
+            if self.profiler is not None:
+                self.profiler.finish()
+            self.global_variables = self.scope.to_dict(variables)
+        if logs.VERBOSITY:
+            print("Variables:", self.global_variables)
+            print("Functions:", self.functions.keys())
+        return to_return
+
+    def run(self, code, variables):
+        """
+            The dispatch loop, runs the code until its RETURN
+            A call saves the state of the caller in frames and runs the
+            function in the same loop, RETURN restores it
+            pending is the cache and the key that the result of the
+            running call is saved to
+        """
+        declarations = Declarations(self.functions)
+        caches = self.caches
+        profiler = self.profiler
+        budget = self.budget
+        frames = list()
+        ops = code.ops
+        args = code.args
+        consts = code.consts
+        names = code.names
+        stack = list()
+        push = stack.append
+        pop = stack.pop
+        to_return = None
+        pending = None
+        position = 0
+        while True:
+            op = ops[position]
+            arg = args[position]
+            position += 1
+            if op == LOAD_FAST:
+                push(variables[arg])
+            elif op == LOAD_CONST:
+                push(consts[arg])
+            elif op == STORE_FAST:
+                variables[arg] = pop()
+            elif op == POP_JUMP_IF_FALSE:
+                if not pop():
+                    position = arg
+            elif op == JUMP:
+                position = arg
+            elif op == BINARY_ADD:
+                right = pop()
+                stack[-1] = stack[-1] + right
+            elif op == BINARY_SUB:
+                right = pop()
+                stack[-1] = stack[-1] - right
+            elif op == COMPARE_LT:
+                right = pop()
+                stack[-1] = stack[-1] < right
+            elif op == COMPARE_GT:
+                right = pop()
+                stack[-1] = stack[-1] > right
+            elif op == COMPARE_EQ:
+                right = pop()
+                stack[-1] = stack[-1] == right
+            elif op == BINARY_MUL:
+                right = pop()
+                stack[-1] = stack[-1] * right
+            elif op == BINARY_DIV:
+                right = pop()
+                stack[-1] = stack[-1] // right
+            elif op == UNARY_NEGATIVE:
+                stack[-1] = -stack[-1]
+            elif op == LOAD_CHECKED:
+                value = variables[arg]
+                if value is UNDEFINED:
+                    self.error(f"Variable {names[arg]} is read before it"
+                               " is set")
+                push(value)
+            elif op == CALL_FUNCTION or op == TAIL_CALL:
+                function_name, argc = consts[arg]
+                arguments = stack[len(stack) - argc:]
+                del stack[len(stack) - argc:]
+                function, declared = declarations.find(function_name)
+                if function is None:
+                    self.error(f"There's no function named {function_name}")
+                parameter_count = len(function.parameters)
+                if argc < parameter_count:
+                    self.error(f"Function {function_name} takes"
+                               f" {parameter_count} arguments but {argc}"
+                               " were given")
+                # Parameters are the first slots, extra arguments are
+                # dropped
+                del arguments[parameter_count:]
+                cache = caches.get(function_name)
+                callee_pending = None
+                if cache is not None:
+                    key = memo_key(arguments)
+                    try:
+                        value = cache.get(key)
+                    except TypeError:
+                        # Unhashable arguments are not cached
+                        value = MISSING
+                    else:
+                        if value is MISSING:
+                            callee_pending = (cache, key)
+                    if value is not MISSING:
+                        if profiler is not None:
+                            # A cached call is counted as a call, the
+                            # first op of a profiled function enters it
+                            profiler.enter(*function.consts[function.args[0]])
+                            profiler.exit()
+                        push(value)
+                        continue
+                if op == CALL_FUNCTION or pending is not None:
+                    frames.append((ops, args, consts, names, variables,
+                                   declarations, stack, push, pop, position,
+                                   to_return, pending))
+                    stack = list()
+                    push = stack.append
+                    pop = stack.pop
+                # A tail call replaces the frame of the caller, the value
+                # of the function is the value of the caller
+                ops = function.ops
+                args = function.args
+                consts = function.consts
+                names = function.names
+                arguments += [UNDEFINED] * (len(names) - parameter_count)
+                variables = arguments
+                # A function that declares nothing sees what its
+                # declaration sees
+                if function.declares:
+                    declarations = Declarations(parent=declared)
+                else:
+                    declarations = declared
+                to_return = None
+                pending = callee_pending
+                position = 0
+            elif op == CALL_BUILTIN:
+                builtin, argc = consts[arg]
+                arguments = stack[len(stack) - argc:]
+                del stack[len(stack) - argc:]
+                push(builtin(*arguments))
+            elif op == BINARY_SUBSCR:
+                index = pop()
+                stack[-1] = stack[-1][index]
+            elif op == BUILD_LIST:
+                values = stack[len(stack) - arg:]
+                del stack[len(stack) - arg:]
+                push(values)
+            elif op == INPLACE_ADD:
+                right = pop()
+                stack[-1] = concat(stack[-1], right)
+            elif op == LOAD_JOINED:
+                value = variables[arg]
+                if type(value) is StringBuilder:
+                    value = value.flatten()
+                elif value is UNDEFINED:
+                    self.error(f"Variable {names[arg]} is read before it"
+                               " is set")
+                push(value)
+            elif op == POP_TOP:
+                pop()
+            elif op == STORE_RETURN:
+                to_return = pop()
+            elif op == MAKE_FUNCTION:
+                function = consts[arg]
+                declarations.declare(function.name, function)
+                if function.name in self.pure:
+                    cache = self.memo.cache(function.name)
+                    if cache is not None:
+                        caches[function.name] = cache
+            elif op == RETURN:
+                if pending is not None:
+                    cache, key = pending
+                    cache.put(key, to_return)
+                if not frames:
+                    return to_return
+                value = to_return
+                (ops, args, consts, names, variables, declarations, stack,
+                 push, pop, position, to_return, pending) = frames.pop()
+                push(value)
+            elif op == PROFILE_LINE:
+                profiler.line(arg)
+            elif op == PROFILE_ENTER:
+                profiler.enter(*consts[arg])
+            elif op == PROFILE_EXIT:
+                profiler.exit()
+            elif op == CHECK_BUDGET:
+                budget.step()
+            else:
+                self.error(f"Unknown opcode {op}")